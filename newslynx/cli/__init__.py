@@ -9,7 +9,7 @@ import argparse
 
 from colorama import Fore
 
-from newslynx.cli import api, version, dev, init, debug, cron
+from newslynx.cli import api, version, dev, init, debug, cron, flusher, partitions, rollups
 from newslynx.cli.common import echo, echo_error, parse_runtime_args
 
 MODULES = [
@@ -17,6 +17,9 @@ MODULES = [
     dev,
     init,
     cron,
+    flusher,
+    partitions,
+    rollups,
     version,
     debug
 ]
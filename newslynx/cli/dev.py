@@ -32,17 +32,16 @@ def run_flush_comparison_cache(opts, **kwargs):
     """
     Flush the comparison cache.
     """
-    ComparisonsCache.flush()
-    echo('Compaison cache flushed.', no_color=opts.no_color)
+    n = ComparisonsCache.flush().get()
+    echo('Compaison cache flushed. Removed {} keys.'.format(n), no_color=opts.no_color)
 
 def run_flush_extract_cache(opts, **kwargs):
     """
     Flush the extraction cache.
     """
-    URLCache.flush()
-    ExtractCache.flush()
-    ThumbnailCache.flush()
-    echo('Extraction caches flushed.', no_color=opts.no_color)
+    reapers = [URLCache.flush(), ExtractCache.flush(), ThumbnailCache.flush()]
+    n = sum([r.get() for r in reapers])
+    echo('Extraction caches flushed. Removed {} keys.'.format(n), no_color=opts.no_color)
 
 
 
@@ -0,0 +1,34 @@
+import sys
+import os
+
+from colorama import Fore
+import argparse
+
+from newslynx.tasks.buffer_metric import MetricBufferFlusher
+from newslynx import settings
+from newslynx.cli.common import echo
+
+
+class CLIMetricBufferFlusher(MetricBufferFlusher):
+    def __init__(self, opts, **kwargs):
+        kwargs.update(opts.__dict__)
+        MetricBufferFlusher.__init__(self, **kwargs)
+        self.opts = opts
+
+    def log(self, msg):
+        return echo(msg, color=Fore.BLUE, no_color=self.opts.no_color)
+
+
+def setup(parser):
+    """
+    Install this parser. Basic for now.
+    """
+    flusher_parser = parser.add_parser(
+        "flusher", help="Spawns the daemon which flushes the metric write-behind buffer.")
+    flusher_parser.add_argument('-s', '--max-staleness', dest='max_staleness',
+        type=int, default=settings.METRIC_BUFFER_MAX_STALENESS)
+    return 'flusher', run
+
+def run(opts, **kwargs):
+    flusher = CLIMetricBufferFlusher(opts, **kwargs)
+    flusher.run()
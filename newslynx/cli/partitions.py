@@ -0,0 +1,36 @@
+from colorama import Fore
+
+from newslynx.tasks import partition_metric
+from newslynx import settings
+from newslynx.cli.common import echo
+
+
+def setup(parser):
+    """
+    Install this parser. Basic for now.
+    """
+    partitions_parser = parser.add_parser(
+        "partitions", help="Creates future content timeseries partitions and downsamples old ones.")
+    partitions_parser.add_argument('-m', '--months-ahead', dest='months_ahead',
+        type=int, default=settings.METRIC_PARTITION_MONTHS_AHEAD,
+        help='The number of future monthly partitions to create.')
+    partitions_parser.add_argument('-o', '--older-than', dest='older_than',
+        type=int, default=settings.METRIC_DOWNSAMPLE_AFTER_DAYS,
+        help='Downsample partitions which ended more than this many days ago.')
+    return 'partitions', run
+
+def run(opts, **kwargs):
+    """
+    Maintain the content timeseries partitions.
+    """
+    res = partition_metric.maintain(
+        months_ahead=opts.months_ahead, older_than=opts.older_than)
+    for name in res['created']:
+        echo('Partition {} is ready.'.format(name),
+            color=Fore.BLUE, no_color=opts.no_color)
+    if res['migrated']:
+        echo('Moved {} rows into partitions.'.format(res['migrated']),
+            color=Fore.BLUE, no_color=opts.no_color)
+    for name in res['downsampled']:
+        echo('Downsampled {} to daily buckets.'.format(name),
+            color=Fore.BLUE, no_color=opts.no_color)
@@ -0,0 +1,31 @@
+from colorama import Fore
+
+from newslynx.core import db
+from newslynx.models import Org
+from newslynx.tasks import rollup_metric
+from newslynx.cli.common import echo
+
+
+def setup(parser):
+    """
+    Install this parser. Basic for now.
+    """
+    rollups_parser = parser.add_parser(
+        "rollups", help="Refreshes the daily and monthly timeseries rollups.")
+    rollups_parser.add_argument('-b', '--backfill', dest='backfill',
+        action='store_true', default=False,
+        help='Queue every day which already has hourly rows first.')
+    return 'rollups', run
+
+def run(opts, **kwargs):
+    """
+    Refresh queued rollups one org at a time.
+    """
+    if opts.backfill:
+        n = rollup_metric.backfill_rollups()
+        echo('Queued {} days for rollup.'.format(n),
+            color=Fore.BLUE, no_color=opts.no_color)
+    for org in Org.query.all():
+        rollup_metric.timeseries_to_rollups(session=db.session, org_id=org.id)
+        echo('Refreshed rollups for org {}.'.format(org.slug),
+            color=Fore.BLUE, no_color=opts.no_color)
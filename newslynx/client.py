@@ -68,8 +68,14 @@ class BaseClient(object):
         if url.startswith(self._format_url('orgs')):
             kw['params'].pop('org')
 
-        # dump json
-        if kw.get('data'):
+        # dump json. bulk endpoints accept newline-delimited json
+        # which the api can parse incrementally.
+        if kw.pop('ndjson', False):
+            kw.setdefault('headers', {})
+            kw['headers']['Content-Type'] = 'application/x-ndjson'
+            kw['data'] = "".join(obj_to_json(d) + "\n" for d in kw['data'])
+
+        elif kw.get('data'):
             kw['data'] = obj_to_json(kw['data'])
 
         # execute
@@ -312,7 +318,7 @@ class Orgs(BaseClient):
         kw = self._check_bulk_kw(kw)
         kw, params = self._split_auth_params_from_data(kw)
         url = self._format_url('orgs', org, 'timeseries', 'bulk')
-        return self._request('POST', url, params=params, data=kw['data'])
+        return self._request('POST', url, params=params, data=kw['data'], ndjson=True)
 
     def get_summary(self, id=None, **kw):
         """
@@ -538,7 +544,7 @@ class Events(BaseClient):
         kw, params = self._split_auth_params_from_data(
             kw, kw_incl=['must_link'])
         url = self._format_url('events', 'bulk')
-        return self._request('POST', url, params=params, data=data)
+        return self._request('POST', url, params=params, data=data, ndjson=True)
 
     def get(self, id, **kw):
         """
@@ -621,7 +627,7 @@ class Content(BaseClient):
         """
         kw, params = self._split_auth_params_from_data(kw, kw_incl=['extract'])
         url = self._format_url('content', 'bulk')
-        return self._request('POST', url, params=params, data=data)
+        return self._request('POST', url, params=params, data=data, ndjson=True)
 
     def update(self, id=None, **kw):
         """
@@ -645,6 +651,13 @@ class Content(BaseClient):
         url = self._format_url('content', id, 'timeseries')
         return self._request('GET', url, params=kw)
 
+    def list_timeseries(self, **kw):
+        """
+        Get the timeseries of many content items at once.
+        """
+        url = self._format_url('content', 'timeseries')
+        return self._request('GET', url, params=kw)
+
     def create_timeseries(self, id=None, **kw):
         """
         Create timeseries metric(s) for a content item.
@@ -659,7 +672,7 @@ class Content(BaseClient):
         """
         kw, params = self._split_auth_params_from_data(kw)
         url = self._format_url('content', 'timeseries', 'bulk')
-        return self._request('POST', url, params=params, data=data)
+        return self._request('POST', url, params=params, data=data, ndjson=True)
 
     def get_summary(self, id=None, **kw):
         """
@@ -682,7 +695,7 @@ class Content(BaseClient):
         """
         kw, params = self._split_auth_params_from_data(kw)
         url = self._format_url('content', 'summary', 'bulk')
-        return self._request('POST', url, params=params, data=data)
+        return self._request('POST', url, params=params, data=data, ndjson=True)
 
     def refresh_summaries(self, **kw):
         """
@@ -27,6 +27,10 @@ METRIC_TS_UNITS = [
     'hour', 'day', 'month'
 ]
 
+METRIC_TS_TRANSFORMS = [
+    'cumulative', 'roll_avg', 'per_change', 'avg', 'median'
+]
+
 CONTENT_METRIC_COMPARISONS = [
     'all', 'types', 'impact_tags', 'subject_tags'
 ]
@@ -23,27 +23,73 @@ SQLALCHEMY_ECHO = False
 # TASK QUEUE
 REDIS_URL = "redis://localhost:6379/0"
 
+# METRIC WRITE-BEHIND BUFFER
+METRIC_BUFFER_ENABLED = False
+METRIC_BUFFER_PREFIX = "newslynx-metric-buffer"
+METRIC_BUFFER_MAX_STALENESS = 300 # 5 MINUTES
+METRIC_BUFFER_FLUSH_SIZE = 10000
+
+# METRIC PARTITIONS
+METRIC_PARTITION_MONTHS_AHEAD = 3
+METRIC_DOWNSAMPLE_AFTER_DAYS = 365
+
+# TIMESERIES + COMPARISON QUERIES
+QUERY_PLAN_CACHE_SIZE = 1000
+QUERY_PREPARED_STATEMENTS = True
+QUERY_STREAM_BATCH_SIZE = 1000
+
+# BULK UPLOADS
+BULK_SHARD_SIZE = 1000
+
+# CACHES
+CACHE_INVALIDATION_CHANNEL = "newslynx-cache-invalidation"
+CACHE_REAP_BATCH_SIZE = 500 # keys scanned per step
+CACHE_REAP_PAUSE = 0.01 # seconds between steps
+CACHE_LOCK_TTL = 120 # seconds a single-flight lock is held at most
+CACHE_LOCK_WAIT = 30 # seconds to wait on another worker before giving up
+CACHE_LOCK_POLL = 0.1 # seconds between checks while waiting
+
 # URL CACHE
 URL_CACHE_PREFIX = "newslynx-url-cache"
 URL_CACHE_TTL = 1209600 # 14 DAYS
+URL_CACHE_LOCAL_SIZE = 10000 # in-process entries
+URL_CACHE_LOCAL_TTL = 3600 # 1 HOUR
+URL_CACHE_NEGATIVE_TTL = 3600 # remember failures for 1 HOUR
 URL_CACHE_POOL_SIZE = 5
 
 # EXTRACTION CACHE
 EXTRACT_CACHE_PREFIX = "newslynx-extract-cache"
 EXTRACT_CACHE_TTL = 259200 # 3 DAYS
+EXTRACT_CACHE_NEGATIVE_TTL = 3600 # remember failures for 1 HOUR
+
+# PAGE CACHE
+PAGE_CACHE_PREFIX = "newslynx-page-cache"
+PAGE_CACHE_TTL = 600 # 10 MINUTES
+PAGE_CACHE_NEGATIVE_TTL = 60 # remember error responses for 1 MINUTE
 
 # THUMBNAIL SETTINGS
 THUMBNAIL_CACHE_PREFIX = "newslynx-thumbnail-cache"
 THUMBNAIL_CACHE_TTL = 1209600 # 14 DAYS
+THUMBNAIL_CACHE_LOCAL_SIZE = 500 # in-process entries
+THUMBNAIL_CACHE_LOCAL_TTL = 3600 # 1 HOUR
+THUMBNAIL_CACHE_NEGATIVE_TTL = 3600 # remember failures for 1 HOUR
 THUMBNAIL_SIZE = [150, 150]
 THUMBNAIL_DEFAULT_FORMAT = "PNG"
 
 # COMPARISON CACHE
 COMPARISON_CACHE_PREFIX = "newslynx-comparison-cache"
 COMPARISON_CACHE_TTL = 86400 # 1 day
+COMPARISON_CACHE_STALE_TTL = 3600 # serve expired comparisons for 1 hour while refreshing
+COMPARISON_POOL_SIZE = 8 # facets compared concurrently across every comparison, keep below the db pool size
 COMPARISON_PERCENTILES = [2.5, 5.0, 10.0, 25.0, 75.0, 90.0, 95.0, 97.5]
 COMPARISON_FUNCTIONS = ['min', 'max', 'avg', 'median'] # TODO, make this actually modify data.
 
+# METRIC CATALOG CACHE
+METRIC_CATALOG_CACHE_PREFIX = "newslynx-metric-catalog"
+METRIC_CATALOG_CACHE_TTL = 86400 # 1 day
+METRIC_CATALOG_CACHE_LOCAL_SIZE = 1000 # in-process catalogs + versions
+METRIC_CATALOG_CACHE_LOCAL_TTL = 60 # 1 MINUTE
+
 # MERLYNNE KWARGS PREFIX
 MERLYNNE_KWARGS_PREFIX = "newslynx-merlynne-kwargs"
 MERLYNNE_KWARGS_TTL = 60
@@ -60,5 +106,12 @@ BROWSER_WAIT = 1
 BROWSER_BACKOFF = 2
 BROWSER_MAX_RETRIES = 5
 
+# network
+NETWORK_POOL_HOSTS = 100 # hosts with pooled connections
+NETWORK_MAX_PER_HOST = 10 # connections + concurrent requests per host
+NETWORK_MAX_CONCURRENCY = 100 # concurrent requests per process
+NETWORK_HOST_RATE = 5 # requests per second per domain
+NETWORK_HOST_BURST = 10 # requests a domain can burst to
+
 # pandoc
 PANDOC_PATH = "/usr/local/bin/pandoc"
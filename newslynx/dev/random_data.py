@@ -158,6 +158,7 @@ def gen_built_in_recipes(org):
                 metrics.append(m)
                 db_session.add(m)
                 db_session.commit()
+    MetricCatalogCache().bump(org.id)
     return recipes, metrics
 
 
@@ -403,6 +404,7 @@ def main(
     # rollup metrics
     if verbose:
         print "rolling up metrics"
+    rollup_metric.timeseries_to_rollups(org_id=org.id)
     rollup_metric.content_timeseries_to_summary(org)
     rollup_metric.event_tags_to_summary(org)
 
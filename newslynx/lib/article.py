@@ -37,8 +37,9 @@ def extract(source_url):
     8. If authors aren't detcted from meta tags, detect them in article body.
     """
 
-    # fetch page
-    page_html = network.get(source_url)
+    # fetch page, likely already fetched by canonicalization.
+    page = network.get_page(source_url)
+    page_html = page['html'] if page else None
 
     # something failed.
     if not page_html:
@@ -3,7 +3,6 @@ import base64
 import mimetypes
 from urlparse import urljoin
 
-import requests
 from bs4 import BeautifulSoup
 from PIL import Image, ImageOps
 
@@ -72,7 +71,7 @@ def get_url(img_url):
     Fetch an image and detect its filetype
     """
     fmt = None
-    r = requests.get(img_url, **network.get_request_kwargs())
+    r = network.request('GET', img_url, **network.get_request_kwargs())
     mimetype = r.headers.get('content-type', None)
     if mimetype:
         fmt = extension_from_mimetype(mimetype)
@@ -3,10 +3,18 @@ All things related to network requests
 """
 
 from functools import wraps
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from cookielib import DefaultCookiePolicy
+from urlparse import urlparse
 import logging
 import time
+import os
 
+import gevent
+from gevent.event import Event
 import requests
+from requests.adapters import HTTPAdapter
 
 from newslynx import settings
 from newslynx.lib.serialize import json_to_obj
@@ -17,6 +25,267 @@ log = logging.getLogger(__name__)
 FAIL_ENCODING = 'ISO-8859-1'
 
 
+def host_key(url):
+    """
+    The domain a request is scheduled under.
+    """
+    host = urlparse(url).netloc.lower().split(':')[0]
+    if host.startswith('www.'):
+        host = host[4:]
+    return host
+
+
+class TokenBucket(object):
+
+    """
+    Allow `rate` requests a second, in bursts of up to `capacity`.
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = self.capacity
+        self.updated = time.time()
+
+    def take(self):
+        """
+        Take a token, returning 0 or the seconds until one is available.
+        """
+        now = time.time()
+        self.tokens = min(self.capacity,
+                          self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate
+
+    @property
+    def full(self):
+        """
+        Whether the bucket has refilled, ie: is no different from a new one.
+        """
+        tokens = self.tokens + (time.time() - self.updated) * self.rate
+        return tokens >= self.capacity
+
+
+class FetchScheduler(object):
+
+    """
+    Hand out request slots per domain: each domain is rate limited
+    by a token bucket and capped at `max_per_host` concurrent requests,
+    and domains with waiting requests take turns so one large
+    publisher can't starve the rest.
+    """
+
+    def __init__(self, **kw):
+        self.max_per_host = kw.get('max_per_host', settings.NETWORK_MAX_PER_HOST)
+        self.max_concurrency = kw.get(
+            'max_concurrency', settings.NETWORK_MAX_CONCURRENCY)
+        self.rate = kw.get('rate', settings.NETWORK_HOST_RATE)
+        self.burst = kw.get('burst', settings.NETWORK_HOST_BURST)
+        self.queues = {}
+        self.turns = deque()
+        self.buckets = {}
+        self.active = defaultdict(int)
+        self.timer = None
+        self.timer_due = None
+        self.pruned = time.time()
+
+    @property
+    def waiting(self):
+        return sum([len(q) for q in self.queues.values()])
+
+    def bucket(self, host):
+        b = self.buckets.get(host)
+        if b is None:
+            self.prune()
+            b = TokenBucket(self.rate, self.burst)
+            self.buckets[host] = b
+        return b
+
+    def prune(self, every=1):
+        """
+        At most once every `every` seconds, forget the buckets of
+        idle hosts which have refilled, since a new one starts full.
+        """
+        now = time.time()
+        if now - self.pruned < every:
+            return
+        self.pruned = now
+        for host, b in self.buckets.items():
+            if b.full and host not in self.queues and host not in self.active:
+                self.buckets.pop(host)
+
+    def schedule(self, wait):
+        """
+        Dispatch again in `wait` seconds, unless we already will sooner.
+        """
+        due = time.time() + wait
+        timer = self.timer
+        if timer is not None and not timer.ready() and \
+           timer is not gevent.getcurrent():
+            if due >= self.timer_due:
+                return
+            timer.kill(block=False)
+        self.timer = gevent.spawn_later(wait, self.dispatch)
+        self.timer_due = due
+
+    def dispatch(self):
+        """
+        Grant slots, one per domain per turn, until none can proceed.
+        """
+        wait = None
+        progress = True
+        while progress:
+            progress = False
+            for _ in xrange(len(self.turns)):
+                if sum(self.active.values()) >= self.max_concurrency:
+                    return
+                host = self.turns.popleft()
+                queue = self.queues[host]
+                if len(queue) and self.active.get(host, 0) < self.max_per_host:
+                    w = self.bucket(host).take()
+                    if not w:
+                        queue.popleft().set()
+                        self.active[host] += 1
+                        progress = True
+                    elif wait is None or w < wait:
+                        wait = w
+                if len(queue):
+                    self.turns.append(host)
+                else:
+                    self.queues.pop(host)
+
+        # come back when the next token is available.
+        if wait is not None:
+            self.schedule(wait)
+
+    def release(self, host):
+        self.active[host] -= 1
+        if not self.active[host]:
+            self.active.pop(host, None)
+        self.dispatch()
+
+    @contextmanager
+    def slot(self, url):
+        """
+        Wait for our turn to request a url.
+        """
+        host = host_key(url)
+        ev = Event()
+        if host not in self.queues:
+            self.queues[host] = deque()
+            self.turns.append(host)
+        self.queues[host].append(ev)
+        self.dispatch()
+        try:
+            ev.wait()
+        except BaseException:
+            # we were killed while waiting.
+            if ev.is_set():
+                self.release(host)
+            elif ev in self.queues.get(host, []):
+                self.queues[host].remove(ev)
+            raise
+        try:
+            yield
+        finally:
+            self.release(host)
+
+
+class HTTPClient(object):
+
+    """
+    A process-wide, pooled HTTP client. Connections are kept
+    alive per host and requests are paced by a `FetchScheduler`.
+    """
+
+    def __init__(self, **kw):
+        self.max_hosts = kw.get('max_hosts', settings.NETWORK_POOL_HOSTS)
+        self.max_per_host = kw.get('max_per_host', settings.NETWORK_MAX_PER_HOST)
+        self.max_concurrency = kw.get(
+            'max_concurrency', settings.NETWORK_MAX_CONCURRENCY)
+        self.pid = None
+        self.reset()
+
+    def reset(self):
+        """
+        (Re)build the session, eg: after forking.
+        """
+        self.pid = os.getpid()
+        self.session = requests.Session()
+        # every request starts without cookies, as it did
+        # with a session per request. redirects still carry them.
+        self.session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        adapter = HTTPAdapter(
+            pool_connections=self.max_hosts,
+            pool_maxsize=self.max_per_host)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.adapter = adapter
+        self.scheduler = FetchScheduler(
+            max_per_host=self.max_per_host,
+            max_concurrency=self.max_concurrency)
+        self.counts = defaultdict(int)
+
+    def request(self, method, url, **kw):
+        """
+        Issue a request through the pool.
+        """
+        if self.pid != os.getpid():
+            self.reset()
+        with self.scheduler.slot(url):
+            self.counts['requests'] += 1
+            try:
+                return self.session.request(method, url, **kw)
+            except Exception:
+                self.counts['errors'] += 1
+                raise
+
+    def stats(self):
+        """
+        Counters for pool usage.
+        """
+        pools = self.adapter.poolmanager.pools
+        connections = 0
+        pool_requests = 0
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            connections += pool.num_connections
+            pool_requests += pool.num_requests
+        return {
+            'requests': self.counts['requests'],
+            'errors': self.counts['errors'],
+            'waiting': self.scheduler.waiting,
+            'active': sum(self.scheduler.active.values()),
+            'active_hosts': dict(self.scheduler.active),
+            'pooled_hosts': len(pools),
+            'connections_opened': connections,
+            'connections_reused': max(pool_requests - connections, 0)
+        }
+
+
+# the client for this process.
+client = HTTPClient()
+
+
+def request(method, url, **kw):
+    """
+    Issue a request through this process's pooled client.
+    """
+    return client.request(method, url, **kw)
+
+
+def stats():
+    """
+    Pool usage counters for this process.
+    """
+    return client.stats()
+
+
 def retry(*dargs, **dkwargs):
     """A decorator for performing http requests and catching all concievable errors.
        Useful for including in scrapers for unreliable webservers.
@@ -116,13 +385,12 @@ def get(_u, **params):
     to ISO-8859-1 if it doesn't find one. This results in incorrect character
     encoding in a lot of cases.
     """
-    session = requests.Session()
+    response = request('GET', _u, params=params, **get_request_kwargs())
+    return _response_html(response)
 
-    FAIL_ENCODING = 'ISO-8859-1'
 
+def _response_html(response):
     html = None
-    response = session.get(
-        url=_u, params=params, **get_request_kwargs())
     if response.encoding != FAIL_ENCODING:
         html = response.text
     else:
@@ -132,12 +400,48 @@ def get(_u, **params):
     return html
 
 
+@retry(attempts=settings.BROWSER_MAX_RETRIES)
+def fetch_page(_u):
+    """
+    Fetch a page with its final url, status,
+    headers, and redirect chain.
+    """
+    response = request('GET', _u, **get_request_kwargs())
+    return {
+        'url': response.url,
+        'status_code': response.status_code,
+        'headers': dict(response.headers),
+        'history': [r.url for r in response.history],
+        'html': _response_html(response)
+    }
+
+
+def get_page(_u):
+    """
+    Fetch a page at most once in a short window, so canonicalization,
+    extraction, and thumbnail discovery for one item share a single
+    request. Returns None for non-2xx responses.
+    """
+    from newslynx.models.work_cache import PageCache
+
+    return PageCache().get(_u).value
+
+
+def alias_page(page, *urls):
+    """
+    Point more urls (eg: a canonical url) at a cached page.
+    """
+    from newslynx.models.work_cache import PageCache
+
+    PageCache().alias(page, *urls)
+
+
 @retry(attempts=settings.BROWSER_MAX_RETRIES)
 def get_location(url):
     """
     most efficient method for unshortening a url.
     """
-    r = requests.head(url)
+    r = request('HEAD', url, timeout=settings.BROWSER_TIMEOUT)
     if r.status_code / 100 == 3 and 'Location' in r.headers:
         return r.headers['Location']
     return url
@@ -148,8 +452,7 @@ def get_json(_u, **params):
     """
     Fetches json from a url.
     """
-    session = requests.Session()
-    response = session.get(url=_u, params=params, **get_request_kwargs())
+    response = request('GET', _u, params=params, **get_request_kwargs())
     obj = None
     if response.encoding != FAIL_ENCODING:
         content = response.text
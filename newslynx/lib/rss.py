@@ -20,6 +20,7 @@ from newslynx.lib import article
 from newslynx.lib import network
 from newslynx.lib import image
 from newslynx.util import uniq
+from newslynx import settings
 from newslynx.exc import RequestError
 
 # JSONPATH CANDIDATES
@@ -57,16 +58,49 @@ TAG_CANDIDATE_JSONPATH = [
 ]
 
 
-def get_entries(feed_url, domains=[]):
+def fetch(feed_url, validators=None):
     """
-    Parser entries from an rss feed.
+    Fetch + parse a feed, sending the ETag / Last-Modified `validators`
+    from the last time it was fetched. Returns the parsed feed, or None
+    if it hasn't changed, along with the validators for the next fetch.
     """
-    f = FeedExtractor(feed_url, domains)
+    validators = validators or {}
+
+    kw = network.get_request_kwargs()
+    if validators.get('etag'):
+        kw['headers']['If-None-Match'] = validators['etag']
+    if validators.get('modified'):
+        kw['headers']['If-Modified-Since'] = validators['modified']
+
+    r = network.request('GET', feed_url, **kw)
+    if r.status_code == 304:
+        return None, validators
+    if not 200 <= r.status_code < 300:
+        raise RequestError('Feed {} returned status code {}'
+                           .format(feed_url, r.status_code))
+
+    validators = {'size': len(r.content)}
+    if r.headers.get('etag'):
+        validators['etag'] = r.headers['etag']
+    if r.headers.get('last-modified'):
+        validators['modified'] = r.headers['last-modified']
+
+    headers = {k.lower(): v for k, v in r.headers.items()}
+    headers.setdefault('content-location', r.url)
+    return feedparser.parse(r.content, response_headers=headers), validators
+
+
+def get_entries(feed_url, domains=[], feed=None):
+    """
+    Parser entries from an rss feed. Nothing is
+    yielded if the feed hasn't changed.
+    """
+    f = feed or FeedExtractor(feed_url, domains)
     parsed = False
     for entry in f.run():
         parsed = True
         yield entry
-    if not parsed:
+    if not parsed and f.status != 'unchanged':
         raise RequestError('No entries found for {}'.format(feed_url))
 
 
@@ -77,7 +111,7 @@ def extract_entries(feed_url, domains=[]):
     """
     entries = get_entries(feed_url, domains)
     urls = [e['url'] for e in entries if e.get('url')]
-    p = Pool(len(urls))
+    p = Pool(settings.NETWORK_MAX_CONCURRENCY)
     for i, a in enumerate(p.imap_unordered(article.extract, urls)):
         yield a
 
@@ -89,16 +123,23 @@ def extract_articles(feed_url, domains=[]):
     """
     entries = FeedExtractor(feed_url, domains).run()
     urls = [e['url'] for e in entries if url.is_article(e.get('url'))]
-    p = Pool(len(entries))
+    p = Pool(settings.NETWORK_MAX_CONCURRENCY)
     for i, a in enumerate(p.imap_unordered(article.extract, urls)):
         yield a
 
 
 class FeedExtractor(object):
 
-    def __init__(self, feed_url, domains):
+    def __init__(self, feed_url, domains, validators=None):
         self.feed_url = feed_url
         self.domains = domains
+        # the validators from the last fetch, if any. these are
+        # replaced by the ones for the next fetch once we've fetched.
+        self.validators = validators or {}
+        # 'changed' or 'unchanged' once fetched, and
+        # the size of the feed we didn't download.
+        self.status = None
+        self.bytes_saved = 0
 
     def get_jsonpath(self, obj, path, null=[]):
         """
@@ -280,12 +321,20 @@ class FeedExtractor(object):
         }
 
     def fetch_feed(self):
-        return feedparser.parse(self.feed_url)
+        f, self.validators = fetch(self.feed_url, self.validators)
+        if f is None:
+            self.status = 'unchanged'
+            self.bytes_saved = int(self.validators.get('size', 0))
+        else:
+            self.status = 'changed'
+        return f
 
     def run(self):
         """
         Parse an Rss Feed.
         """
-        f = feedparser.parse(self.feed_url)
+        f = self.fetch_feed()
+        if f is None:
+            return
         for entry in f.entries:
             yield self.parse_entry(entry)
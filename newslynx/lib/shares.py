@@ -12,9 +12,8 @@ from gevent.pool import Pool
 
 from copy import copy
 
-import requests
-
 from newslynx.lib import network
+from newslynx import settings
 from newslynx.lib.serialize import json_to_obj, obj_to_json
 
 
@@ -199,7 +198,8 @@ class GooglePlus(ShareCount):
 
     def fetch(self, body):
         try:
-            r = requests.post(self.endpoint, data=body)
+            r = network.request('POST', self.endpoint, data=body,
+                                timeout=settings.BROWSER_TIMEOUT)
             return r.json()
         except Exception:
             return None
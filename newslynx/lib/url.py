@@ -91,18 +91,27 @@ def prepare(url, source=None, canonicalize=True, expand=True, keep_params=('id',
             if not is_abs(url):
                 url = urljoin(source, url)
 
-    # check short urls
-    if expand:
-        if is_shortened(url):
-            url = unshorten(url, attempts=1)
+    shortened = expand and is_shortened(url)
+
+    # check short urls. when canonicalizing, fetching
+    # the page follows its redirects for us.
+    if shortened and not canonicalize:
+        url = unshorten(url, attempts=1)
 
     # canonicalize
     if canonicalize:
-        page_html = network.get(url)
-        if page_html:
-            soup = BeautifulSoup(page_html)
+        page = network.get_page(url)
+        if shortened:
+            if page and not is_shortened(page['url']):
+                url = page['url']
+            else:
+                url = unshorten(url, attempts=1)
+        if page and page['html']:
+            soup = BeautifulSoup(page['html'])
             canonical = meta.canonical_url(soup)
             if canonical:
+                # so extraction reads the same page.
+                network.alias_page(page, canonical)
                 return canonical
 
     # if it got converted to None, return
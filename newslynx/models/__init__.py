@@ -11,7 +11,8 @@ from .content_item import ContentItem
 from .content_metric import ContentMetricTimeseries, ContentMetricSummary
 from .user import User
 from .sous_chef import SousChef
-from .work_cache import URLCache, ExtractCache, ThumbnailCache
+from .work_cache import URLCache, ExtractCache, ThumbnailCache, PageCache
+from .metric_catalog import MetricCatalogCache
 from .compare_cache import (
     ComparisonsCache, AllContentComparisonCache,
     SubjectTagsComparisonCache, ContentTypeComparisonCache,
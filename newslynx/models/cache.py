@@ -1,9 +1,111 @@
+import os
+import re
+import time
 from hashlib import md5
+from collections import OrderedDict
+
+import gevent
+from gevent.pool import Pool
 
 from newslynx.core import rds
 from newslynx.lib import dates
 from newslynx.lib.serialize import (
     obj_to_pickle, pickle_to_obj)
+from newslynx.util import gen_uuid
+from newslynx import settings
+
+# the fields of a cache entry.
+ENTRY_FIELDS = ('value', 'last_modified', 'expires', 'error')
+
+# only release a lock we still hold.
+_release_lock = rds.register_script("""
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+""")
+
+
+class LocalCache(object):
+
+    """
+    A bounded, in-process LRU with a ttl.
+    Values are shared, so only use it for immutable ones.
+    """
+
+    def __init__(self, size, ttl):
+        self.size = size
+        self.ttl = ttl
+        self._items = OrderedDict()
+
+    def get(self, key):
+        item = self._items.pop(key, None)
+        if item is None:
+            return None
+        if item[0] < time.time():
+            return None
+        # mark as most recently used.
+        self._items[key] = item
+        return item[1]
+
+    def set(self, key, value):
+        self._items.pop(key, None)
+        self._items[key] = (time.time() + self.ttl, value)
+        while len(self._items) > self.size:
+            self._items.popitem(last=False)
+
+    def drop(self, prefix):
+        """
+        Remove every key starting with a prefix.
+        """
+        for k in [k for k in self._items if k.startswith(prefix)]:
+            self._items.pop(k, None)
+
+
+# key_prefix => LocalCache for this process.
+_local_tiers = {}
+
+# key_prefix => (namespace version, expires) for this process.
+_namespaces = {}
+
+# the pid our invalidation listener runs in.
+_listener = {'pid': None}
+
+
+def _drop_local(prefix):
+    for tier in _local_tiers.values():
+        tier.drop(prefix)
+    # a flush publishes its key_prefix.
+    for ns in [ns for ns in _namespaces if ns.startswith(prefix)]:
+        _namespaces.pop(ns, None)
+
+
+def _listen():
+    """
+    Drop local entries invalidated by any process.
+    """
+    while True:
+        try:
+            pubsub = rds.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(settings.CACHE_INVALIDATION_CHANNEL)
+            for msg in pubsub.listen():
+                _drop_local(msg['data'])
+        except Exception:
+            # we may have missed invalidations.
+            _drop_local('')
+            gevent.sleep(1)
+
+
+def _ensure_listener():
+    """
+    Start listening for invalidations once per process,
+    including processes forked from one which was listening.
+    """
+    pid = os.getpid()
+    if _listener['pid'] != pid:
+        _listener['pid'] = pid
+        _drop_local('')
+        gevent.spawn(_listen)
 
 
 class CacheResponse(object):
@@ -12,11 +114,12 @@ class CacheResponse(object):
     A class that we return from a cache request.
     """
 
-    def __init__(self, key, value, last_modified, is_cached):
+    def __init__(self, key, value, last_modified, is_cached, error=None):
         self.key = key
         self.value = value
         self.last_modified = last_modified
         self.is_cached = is_cached
+        self.error = error
 
     @property
     def age(self):
@@ -29,7 +132,8 @@ class CacheResponse(object):
             'key': self.key,
             'last_modified': self.last_modified,
             'age': self.age,
-            'is_cached': self.is_cached
+            'is_cached': self.is_cached,
+            'error': self.error
         }
 
 
@@ -42,6 +146,25 @@ class Cache(object):
     ttl = 84600  # 1 day
     key_prefix = None
 
+    # an optional in-process tier in front of redis.
+    local_size = 0
+    local_ttl = 60
+
+    # concurrent work for misses in `get_many`.
+    pool_size = 5
+
+    # let one caller at a time do the work for a key,
+    # optionally serving expired values while it does.
+    single_flight = False
+    stale_ttl = 0
+    lock_ttl = settings.CACHE_LOCK_TTL
+    lock_wait = settings.CACHE_LOCK_WAIT
+
+    # optionally remember failed work for a while,
+    # under a reason code.
+    negative_ttl = 0
+    negative_reason = 'no_result'
+
     def __init__(self, debug=False):
         self.debug = debug
 
@@ -65,23 +188,92 @@ class Cache(object):
         """
         raise NotImplemented
 
+    @property
+    def local(self):
+        """
+        This class's in-process tier, if it has one.
+        """
+        if not self.local_size or self.debug:
+            return None
+        _ensure_listener()
+        tier = _local_tiers.get(self.key_prefix)
+        if tier is None:
+            tier = LocalCache(self.local_size, self.local_ttl)
+            _local_tiers[self.key_prefix] = tier
+        return tier
+
+    @classmethod
+    def namespace(cls):
+        """
+        The current namespace version, embedded in every key.
+        Only caches with a local tier listen for flushes, so
+        only they keep the version in-process, re-reading it
+        every `local_ttl` in case they missed one.
+        """
+        key = "{}:namespace".format(cls.key_prefix)
+        if not cls.local_size:
+            return int(cls.redis.get(key) or 0)
+        _ensure_listener()
+        v = _namespaces.get(cls.key_prefix)
+        if v is None or v[1] < time.time():
+            v = (int(cls.redis.get(key) or 0), time.time() + cls.local_ttl)
+            _namespaces[cls.key_prefix] = v
+        return v[0]
+
     @classmethod
     def flush(cls):
         """
-        Flush this cache.
+        Flush this cache by moving to a new namespace. Keys in
+        old namespaces are deleted in the background, returning
+        the greenlet doing so.
+        """
+        cls.redis.incr("{}:namespace".format(cls.key_prefix))
+        _drop_local(cls.key_prefix)
+        cls.redis.publish(settings.CACHE_INVALIDATION_CHANNEL, cls.key_prefix)
+        return gevent.spawn(cls.reap)
+
+    @classmethod
+    def reap(cls, batch_size=settings.CACHE_REAP_BATCH_SIZE):
+        """
+        Incrementally delete keys from old namespaces.
         """
-        for k in cls.redis.keys():
-            if k.startswith(cls.key_prefix):
-                cls.redis.delete(k)
+        current = "{}:v{}:".format(cls.key_prefix, cls.namespace())
+        # versioned keys, and those from before keys were versioned.
+        re_key = re.compile(r'^{}:(v\d+:|[0-9a-f]{{32}}(:last_modified)?$)'
+                            .format(re.escape(cls.key_prefix)))
+        n = 0
+        cursor = 0
+        while True:
+            cursor, keys = cls.redis.scan(
+                cursor, match="{}:*".format(cls.key_prefix), count=batch_size)
+            stale = [k for k in keys
+                     if re_key.match(k) and not k.startswith(current)]
+            if len(stale):
+                cls.redis.delete(*stale)
+                n += len(stale)
+            if not int(cursor):
+                break
+            gevent.sleep(settings.CACHE_REAP_PAUSE)
+        return n
 
     def exists(self, *args, **kw):
-        return self.redis.get(self.format_key(*args, **kw)) is not None
+        return bool(self.redis.exists(self.format_key(*args, **kw)))
 
     def invalidate(self, *args, **kw):
         """
         Remove a key from the cache.
         """
-        self.redis.delete(self.format_key(*args, **kw))
+        key = self.format_key(*args, **kw)
+        if self.stale_ttl:
+            # keep serving it while it's recomputed.
+            pipe = self.redis.pipeline(transaction=True)
+            pipe.hset(key, 'expires', 0)
+            pipe.expire(key, self.stale_ttl)
+            pipe.execute()
+        else:
+            self.redis.delete(key)
+        if self.local_size:
+            self.redis.publish(settings.CACHE_INVALIDATION_CHANNEL, key)
 
     def format_key(self, *args, **kw):
         """
@@ -92,8 +284,13 @@ class Cache(object):
 
     def _format_key(self, *args, **kw):
         """
-        Format a unique key for redis.
+        Format a unique key for redis. Pass `namespace__` to
+        skip looking up the namespace for each key.
         """
+        namespace = kw.pop('namespace__', None)
+        if namespace is None:
+            namespace = self.namespace()
+
         hash_keys = []
         for a in sorted(args):
             hash_keys.append(str(a))
@@ -101,55 +298,187 @@ class Cache(object):
             hash_keys.append(str(v))
 
         hash_str = md5("".join(hash_keys)).hexdigest()
-        return "{}:{}".format(self.key_prefix, hash_str)
+        return "{}:v{}:{}".format(self.key_prefix, namespace, hash_str)
 
-    def get(self, *args, **kw):
+    def _load(self, entry):
         """
-        The main get/cache function.
+        Parse a (value, last_modified, fresh, error) entry from redis.
         """
-        # get a custom ttl, fallback on default
-        ttl = kw.pop('ttl', self.ttl)
-
-        # format the key
-        key = self.format_key(*args, **kw)
-
-        # last modified key
-        lm_key = "{}:last_modified".format(key)
-
-        # attempt to get the object from redis
-        if not self.debug:
-            obj = self.redis.get(key)
-        else:
-            obj = None
+        # entries written before they were hashes come back as errors.
+        if isinstance(entry, Exception) or not entry:
+            return None
+        value, last_modified, expires, error = entry
+        if value is None and error is None:
+            return None
+        if value is not None:
+            value = self.deserialize(value)
+        fresh = expires is None or float(expires) > time.time()
+        return value, dates.parse_iso(last_modified), fresh, error
+
+    def _response(self, key, hit):
+        return CacheResponse(key, hit[0], hit[1], True, error=hit[3])
+
+    def _store(self, key, obj, ttl):
+        """
+        Write an entry's value + metadata as a single hash.
+        """
+        last_modified = dates.now()
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.delete(key)
+        pipe.hmset(key, {
+            'value': self.serialize(obj),
+            'last_modified': last_modified.isoformat(),
+            'expires': time.time() + ttl
+        })
+        pipe.expire(key, ttl + self.stale_ttl)
+        pipe.execute()
+        return last_modified
+
+    def _store_negative(self, key):
+        """
+        Remember that the work for a key failed.
+        """
+        last_modified = dates.now()
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.delete(key)
+        pipe.hmset(key, {
+            'error': self.negative_reason,
+            'last_modified': last_modified.isoformat(),
+            'expires': time.time() + self.negative_ttl
+        })
+        pipe.expire(key, self.negative_ttl)
+        pipe.execute()
+        return last_modified
+
+    def _work(self, key, args, kw, ttl):
+        """
+        Do the work for a key and cache the result.
+        """
+        obj = self.work(*args, **kw)
 
-        # if it doesn't exist, proceed with work
+        # if the worker returns None, only cache the failure.
         if not obj:
-
-            # not cached
-            is_cached = False
-
-            obj = self.work(*args, **kw)
-
-            # if the worker returns None, break out
-            if not obj:
+            if not self.negative_ttl:
                 return CacheResponse(key, obj, None, False)
+            last_modified = self._store_negative(key)
+            return CacheResponse(key, obj, last_modified, False,
+                                 error=self.negative_reason)
 
-            # set the object in redis at the specified
-            # key with the specified ttl
-            self.redis.set(key, self.serialize(obj), ex=ttl)
+        last_modified = self._store(key, obj, ttl)
+        if self.local is not None:
+            self.local.set(key, (obj, last_modified))
+        return CacheResponse(key, obj, last_modified, False)
 
-            # set the last modified time
-            last_modified = dates.now()
-            self.redis.set(lm_key, last_modified.isoformat(), ex=ttl)
+    def _fill(self, key, args, kw, ttl, stale=None):
+        """
+        Do the work for a missing or expired key. With `single_flight`,
+        the first caller takes a lock while the rest serve `stale`,
+        or wait for the winner's result.
+        """
+        if not self.single_flight or self.debug:
+            return self._work(key, args, kw, ttl)
+
+        lock_key = "{}:lock".format(key)
+        token = gen_uuid()
+        if self.redis.set(lock_key, token, nx=True, ex=self.lock_ttl):
+            try:
+                return self._work(key, args, kw, ttl)
+            finally:
+                _release_lock(keys=[lock_key], args=[token])
+
+        # someone else is on it.
+        if stale is not None:
+            return CacheResponse(key, stale[0], stale[1], True)
+
+        deadline = time.time() + self.lock_wait
+        while time.time() < deadline:
+            gevent.sleep(settings.CACHE_LOCK_POLL)
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.hmget(key, *ENTRY_FIELDS)
+            pipe.exists(lock_key)
+            entry, locked = pipe.execute(raise_on_error=False)
+            hit = self._load(entry)
+            if hit is not None and hit[2]:
+                return self._response(key, hit)
+            if not locked:
+                # the winner gave up or had nothing to cache.
+                break
+        return self._work(key, args, kw, ttl)
 
-        else:
-            # is cached
-            is_cached = True
+    def get(self, *args, **kw):
+        """
+        The main get/cache function.
+        """
+        return self.get_many([args], **kw)[0]
 
-            # if it does exist, deserialize it.
-            obj = self.deserialize(obj)
+    def get_many(self, items, **kw):
+        """
+        Get/cache many entries with a single round trip to redis,
+        doing the work for misses concurrently. Each item is an
+        argument or a tuple of arguments to `work`. Responses are
+        returned in the order of `items`. Pass `retry_failed=True`
+        to redo work which recently failed.
+        """
+        # get a custom ttl, fallback on default
+        ttl = kw.pop('ttl', self.ttl)
+        retry_failed = kw.pop('retry_failed', False)
+
+        # format the keys, doing the work for duplicates once.
+        namespace = self.namespace()
+        lookup = OrderedDict()
+        keys = []
+        for args in items:
+            if not isinstance(args, tuple):
+                args = (args,)
+            key = self.format_key(*args, namespace__=namespace, **kw)
+            lookup.setdefault(key, args)
+            keys.append(key)
+
+        responses = {}
+        stale = {}
+
+        # check this process first.
+        local = self.local
+        if local is not None:
+            for key in lookup:
+                hit = local.get(key)
+                if hit is not None:
+                    responses[key] = CacheResponse(key, hit[0], hit[1], True)
+
+        # then redis.
+        pending = [k for k in lookup if k not in responses]
+        if len(pending) and not self.debug:
+            pipe = self.redis.pipeline(transaction=False)
+            for key in pending:
+                pipe.hmget(key, *ENTRY_FIELDS)
+            for key, entry in zip(pending, pipe.execute(raise_on_error=False)):
+                hit = self._load(entry)
+                if hit is None:
+                    continue
+                if hit[3] is not None:
+                    # a recent failure.
+                    if hit[2] and not retry_failed:
+                        responses[key] = self._response(key, hit)
+                    continue
+                if not hit[2]:
+                    stale[key] = hit
+                    continue
+                responses[key] = self._response(key, hit)
+                if local is not None:
+                    local.set(key, hit[:2])
+
+        # and do the work for whatever's left.
+        misses = [k for k in lookup if k not in responses]
+
+        def fx(key):
+            return key, self._fill(key, lookup[key], kw, ttl, stale.get(key))
+
+        if len(misses) == 1:
+            results = [fx(misses[0])]
+        else:
+            results = Pool(self.pool_size).imap_unordered(fx, misses)
 
-            # get the cached last modified time
-            last_modified = dates.parse_iso(self.redis.get(lm_key))
+        for key, response in results:
+            responses[key] = response
 
-        return CacheResponse(key, obj, last_modified, is_cached)
+        return [responses[k] for k in keys]
@@ -5,7 +5,7 @@ from gevent.pool import Pool
 
 from sqlalchemy import func
 
-from newslynx.core import db
+from newslynx.core import db, gen_session
 from newslynx.tasks.compare_metric import ContentComparison
 from newslynx import settings
 from newslynx.models import (
@@ -17,14 +17,21 @@ from newslynx.models.relations import (
 from newslynx.models.cache import Cache
 
 
+# every facet of every comparison shares one pool, so comparing
+# all types at once holds at most this many sessions.
+facet_pool = Pool(settings.COMPARISON_POOL_SIZE)
+
+
 class ComparisonCache(Cache):
     key_prefix = settings.COMPARISON_CACHE_PREFIX
-    tll = settings.COMPARISON_CACHE_TTL
+    ttl = settings.COMPARISON_CACHE_TTL
+    stale_ttl = settings.COMPARISON_CACHE_STALE_TTL
+    single_flight = True
 
     def get_facets(self, org, **kw):
         raise NotImplemented
 
-    def get_content_item_ids(self, org, facet, **kw):
+    def get_content_item_ids(self, org, facet, session, **kw):
         raise NotImplemented
 
     def format_comparisons(self, comparisons):
@@ -35,15 +42,51 @@ class ComparisonCache(Cache):
         kw.update({'name__': self.name})
         return self._format_key(*args, **kw)
 
-    # TODO: Pooled Exectution
+    def facet_key(self, org_id, facet):
+        """
+        Each facet is cached on its own so it
+        can outlive invalidations of the whole set.
+        """
+        return "{}:facet:{}".format(self.format_key(org_id), facet)
+
+    def compare(self, org, facet, **kw):
+        """
+        Compare a facet in its own session, reusing the cached
+        comparison if its members haven't changed.
+        """
+        session = gen_session()
+        session.execute('SET TIMEZONE TO UTC')
+        try:
+            ids = self.get_content_item_ids(org, facet, session, **kw)
+            if not len(ids):
+                return None
+            cc = ContentComparison(org, ids)
+            key = self.facet_key(org.id, facet)
+            fingerprint = cc.fingerprint(session=session)
+            if not self.debug:
+                cached = self.redis.get(key)
+                if cached:
+                    cached = self.deserialize(cached)
+                    if cached['fingerprint'] == fingerprint:
+                        return cached['comparisons']
+            comparisons = list(cc.execute(session=session))
+            obj = {'fingerprint': fingerprint, 'comparisons': comparisons}
+            self.redis.set(key, self.serialize(obj), ex=self.ttl)
+            return comparisons
+        finally:
+            session.remove()
+
     def work(self, org_id, **kw):
         org = Org.query.get(org_id)
+
+        def fx(facet):
+            return facet, self.compare(org, facet, **kw)
+
         comparisons = {}
-        for facet in self.get_facets(org, **kw):
-            ids = self.get_content_item_ids(org, facet, **kw)
-            if len(ids):
-                cc = ContentComparison(org, ids)
-                comparisons[facet] = list(cc.execute())
+        facets = self.get_facets(org, **kw)
+        for facet, comps in facet_pool.imap_unordered(fx, facets):
+            if comps is not None:
+                comparisons[facet] = comps
         return self.format_comparisons(comparisons)
 
 
@@ -54,6 +97,8 @@ class ComparisonsCache(Cache):
     """
     key_prefix = settings.COMPARISON_CACHE_PREFIX
     ttl = settings.COMPARISON_CACHE_TTL
+    stale_ttl = settings.COMPARISON_CACHE_STALE_TTL
+    single_flight = True
     pool_size = 4
 
     @property
@@ -71,7 +116,7 @@ class ComparisonsCache(Cache):
         """
         for cache in self.comparison_lookup.values():
             cache.invalidate(*args, **kwargs)
-        self.redis.delete(self.format_key(*args, **kwargs))
+        super(ComparisonsCache, self).invalidate(*args, **kwargs)
 
     def work(self, org_id):
 
@@ -98,8 +143,11 @@ class AllContentComparisonCache(ComparisonCache):
     def get_facets(self, org, **kw):
         return ["all"]
 
-    def get_content_item_ids(self, org, facet, **kw):
-        return org.content_item_ids
+    def get_content_item_ids(self, org, facet, session, **kw):
+        content_items = session.query(ContentItem.id)\
+            .filter_by(org_id=org.id)\
+            .all()
+        return [c[0] for c in content_items]
 
     def format_comparisons(self, comparisons):
         return comparisons
@@ -119,11 +167,11 @@ class SubjectTagsComparisonCache(ComparisonCache):
             .all()
         return [t[0] for t in tag_ids]
 
-    def get_content_item_ids(self, org, tag_id, **kw):
+    def get_content_item_ids(self, org, tag_id, session, **kw):
         """
         Get all content item ids for a Tag.
         """
-        content_items = db.session\
+        content_items = session\
             .query(func.distinct(content_items_tags.c.content_item_id))\
             .filter(content_items_tags.c.tag_id == tag_id)\
             .all()
@@ -144,11 +192,11 @@ class ImpactTagsComparisonCache(ComparisonCache):
             .all()
         return [t[0] for t in tag_ids]
 
-    def get_content_item_ids(self, org, tag_id, **kw):
+    def get_content_item_ids(self, org, tag_id, session, **kw):
         """
         Get all content item ids for a Tag.
         """
-        content_items = db.session\
+        content_items = session\
             .query(func.distinct(content_items_events.c.content_item_id))\
             .join(Event)\
             .filter(Event.tags.any(Tag.id == tag_id))\
@@ -166,8 +214,8 @@ class ContentTypeComparisonCache(ComparisonCache):
             .all()
         return [t[0] for t in types]
 
-    def get_content_item_ids(self, org, type, **kw):
-        content_items = db.session.query(func.distinct(ContentItem.id))\
+    def get_content_item_ids(self, org, type, session, **kw):
+        content_items = session.query(func.distinct(ContentItem.id))\
             .filter_by(org_id=org.id)\
             .filter_by(type=type)\
             .all()
@@ -1,4 +1,4 @@
-from sqlalchemy.dialects.postgresql import JSON
+from sqlalchemy.dialects.postgresql import JSONB
 
 from newslynx.lib import dates
 from newslynx.core import db
@@ -18,7 +18,7 @@ class ContentMetricTimeseries(db.Model):
         db.Integer, db.ForeignKey('orgs.id'), index=True, primary_key=True)
     content_item_id = db.Column(db.Integer, db.ForeignKey('content.id'), index=True, primary_key=True)
     datetime = db.Column(db.DateTime(timezone=True), primary_key=True)
-    metrics = db.Column(JSON)
+    metrics = db.Column(JSONB)
     updated = db.Column(db.DateTime(timezone=True), onupdate=dates.now, default=dates.now)
 
     def __init__(self, **kw):
@@ -44,7 +44,8 @@ class ContentMetricSummary(db.Model):
     org_id = db.Column(
         db.Integer, db.ForeignKey('orgs.id'), index=True, primary_key=True)
     content_item_id = db.Column(db.Integer, db.ForeignKey('content.id'), index=True, primary_key=True)
-    metrics = db.Column(JSON)
+    metrics = db.Column(JSONB)
+    updated = db.Column(db.DateTime(timezone=True), onupdate=dates.now, default=dates.now)
 
     def __init__(self, **kw):
         self.org_id = kw.get('org_id')
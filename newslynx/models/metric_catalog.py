@@ -0,0 +1,192 @@
+"""
+A per-org catalog of metrics, cached in-process and in redis.
+"""
+from newslynx import settings
+from .cache import Cache
+from .metric import Metric
+
+
+def _levels(m, attr):
+    return m.get(attr) or []
+
+
+def _content(m, *levels):
+    return all([l in _levels(m, 'content_levels') for l in levels])
+
+
+def _org(m, *levels):
+    return all([l in _levels(m, 'org_levels') for l in levels])
+
+
+def _computed(m):
+    return m['type'] == 'computed'
+
+
+# a lookup of catalog view => (filter, names only?)
+# each view mirrors a metrics property on `Org`.
+CATALOG_VIEWS = {
+
+    # content timeseries
+    'content_timeseries_metrics': (
+        lambda m: _content(m, 'timeseries') and not _computed(m),
+        False),
+    'content_timeseries_metric_names': (
+        lambda m: _content(m, 'timeseries') and not _computed(m) and
+        not m['faceted'],
+        True),
+    'content_timeseries_metric_rollups': (
+        lambda m: _content(m, 'timeseries', 'summary') and not m['faceted'],
+        False),
+    'computed_content_timeseries_metrics': (
+        lambda m: _content(m, 'timeseries') and _computed(m) and
+        not m['faceted'],
+        False),
+
+    # content summary
+    'content_summary_metrics': (
+        lambda m: _content(m, 'summary'),
+        False),
+    'content_summary_metric_names': (
+        lambda m: _content(m, 'summary'),
+        True),
+    'computed_content_summary_metrics': (
+        lambda m: _content(m, 'summary') and _computed(m) and
+        not m['faceted'],
+        False),
+    'computed_content_summary_metric_names': (
+        lambda m: _content(m, 'summary') and _computed(m) and
+        not m['faceted'],
+        True),
+    'computable_content_summary_metrics': (
+        lambda m: _content(m, 'summary') and not _computed(m) and
+        not m['faceted'],
+        False),
+    'computable_content_summary_metrics_names': (
+        lambda m: _content(m, 'summary') and not _computed(m) and
+        not m['faceted'],
+        True),
+    'content_summary_metric_sorts': (
+        lambda m: _content(m, 'summary') and not m['faceted'],
+        False),
+    'content_summary_metric_sort_names': (
+        lambda m: _content(m, 'summary') and not m['faceted'],
+        True),
+    'content_metric_comparisons': (
+        lambda m: _content(m, 'summary', 'comparison') and not m['faceted'],
+        False),
+    'content_metric_comparison_names': (
+        lambda m: _content(m, 'summary', 'comparison') and not m['faceted'],
+        True),
+    'content_faceted_metric_names': (
+        lambda m: _content(m, 'summary') and m['faceted'],
+        True),
+
+    # org timeseries
+    'timeseries_metrics': (
+        lambda m: _org(m, 'timeseries') and not m['faceted'],
+        False),
+    'timeseries_metric_names': (
+        lambda m: _org(m, 'timeseries') and not m['faceted'],
+        True),
+    'computed_timeseries_metrics': (
+        lambda m: _org(m, 'timeseries') and
+        not _content(m, 'timeseries') and _computed(m),
+        False),
+    'computed_timeseries_metrics_names': (
+        lambda m: _org(m, 'timeseries') and
+        not _content(m, 'timeseries') and _computed(m),
+        True),
+
+    # org summary
+    'summary_metrics': (
+        lambda m: (_org(m, 'summary') or
+                   _content(m, 'timeseries') and _org(m, 'timeseries')) and
+        not m['faceted'],
+        False),
+    'summary_metric_names': (
+        lambda m: _org(m, 'summary') and not m['faceted'],
+        True)
+}
+
+
+def build_catalog(metrics):
+    """
+    Build every catalog view from a list of metric dictionaries.
+    """
+    catalog = {}
+    for view, (fx, names_only) in CATALOG_VIEWS.items():
+        matches = [m for m in metrics if fx(m)]
+        if names_only:
+            catalog[view] = [m['name'] for m in matches]
+        else:
+            catalog[view] = {m['name']: m for m in matches}
+    return catalog
+
+
+def copy_view(obj):
+    """
+    Copy a catalog view, which is only ever lists,
+    dicts, and immutable values, without `deepcopy`'s
+    bookkeeping.
+    """
+    if isinstance(obj, dict):
+        return {k: copy_view(v) for k, v in obj.iteritems()}
+    if isinstance(obj, list):
+        return [copy_view(v) for v in obj]
+    return obj
+
+
+class MetricCatalogCache(Cache):
+
+    """
+    A cache of all of an org's metric views. Keys embed a per-org
+    version which is bumped whenever one of its metrics changes.
+    Catalogs and versions are kept in-process and dropped
+    everywhere on a bump.
+    """
+    key_prefix = settings.METRIC_CATALOG_CACHE_PREFIX
+    ttl = settings.METRIC_CATALOG_CACHE_TTL
+    local_size = settings.METRIC_CATALOG_CACHE_LOCAL_SIZE
+    local_ttl = settings.METRIC_CATALOG_CACHE_LOCAL_TTL
+    version_key = "{}:version:{}"
+
+    def version(self, org_id):
+        """
+        The current catalog version for an org.
+        """
+        key = self.version_key.format(self.key_prefix, org_id)
+        local = self.local
+        if local is not None:
+            v = local.get(key)
+            if v is not None:
+                return v
+        v = int(self.redis.get(key) or 0)
+        if local is not None:
+            local.set(key, v)
+        return v
+
+    def bump(self, org_id):
+        """
+        Invalidate an org's catalog everywhere.
+        """
+        key = self.version_key.format(self.key_prefix, org_id)
+        v = self.redis.incr(key)
+        if self.local is not None:
+            self.local.drop(key)
+        self.redis.publish(settings.CACHE_INVALIDATION_CHANNEL, key)
+        return v
+
+    # add the version for hashing.
+    def format_key(self, *args, **kw):
+        kw.update({'version__': self.version(args[0])})
+        return self._format_key(*args, **kw)
+
+    def work(self, org_id):
+        metrics = Metric.query.filter_by(org_id=org_id).all()
+        return build_catalog([m.to_dict() for m in metrics])
+
+    def catalog(self, org_id):
+        """
+        Fetch an org's catalog, checking this process first.
+        """
+        return self.get(org_id).value
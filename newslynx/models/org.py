@@ -1,6 +1,6 @@
 import copy
 
-from sqlalchemy import and_, or_, func
+from sqlalchemy import func
 from sqlalchemy.dialects.postgresql import ENUM, ARRAY
 
 from slugify import slugify
@@ -9,9 +9,11 @@ from newslynx.core import db
 from newslynx.lib import dates
 from newslynx.lib.serialize import json_to_obj
 from .relations import orgs_users
-from .metric import Metric
+from .metric_catalog import MetricCatalogCache, copy_view
 from .content_item import ContentItem
 
+metric_catalog_cache = MetricCatalogCache()
+
 
 class Org(db.Model):
 
@@ -128,7 +130,10 @@ class Org(db.Model):
         """
         An array of an org's content item IDs.
         """
-        return [c.id for c in self.content_items]
+        ids = db.session.query(ContentItem.id)\
+            .filter_by(org_id=self.id)\
+            .all()
+        return [i[0] for i in ids]
 
     @property
     def simple_content_items(self):
@@ -142,6 +147,19 @@ class Org(db.Model):
 
     # METRICS
 
+    def metric_catalog(self, view):
+        """
+        A copy of a view of this org's cached metric catalog.
+        """
+        return copy_view(metric_catalog_cache.catalog(self.id)[view])
+
+    @property
+    def metric_catalog_version(self):
+        """
+        Bumped whenever one of this org's metrics changes.
+        """
+        return metric_catalog_cache.version(self.id)
+
     ## CONTENT TIMESERIES METRICS
 
     @property
@@ -149,24 +167,14 @@ class Org(db.Model):
         """
         Content metrics that can exist in the content timeseries store.
         """
-        metrics = self.metrics\
-            .filter(Metric.content_levels.contains(['timeseries']))\
-            .filter(Metric.type != 'computed')\
-            .all()
-        return {m.name: m.to_dict() for m in metrics}
+        return self.metric_catalog('content_timeseries_metrics')
 
     @property
     def content_timeseries_metric_names(self):
         """
         The names of metrics that can exist in the content timeseries store.
         """
-        metrics = self.metrics\
-            .filter(Metric.content_levels.contains(['timeseries']))\
-            .filter(Metric.type != 'computed')\
-            .filter(~Metric.faceted)\
-            .with_entities(Metric.name)\
-            .all()
-        return [m[0] for m in metrics]
+        return self.metric_catalog('content_timeseries_metric_names')
 
     @property
     def content_timeseries_metric_rollups(self):
@@ -175,23 +183,14 @@ class Org(db.Model):
         Computed timeseries metrics can and should be summarized for ease of
         generating comparisons on these metrics.
         """
-        metrics = self.metrics\
-            .filter(Metric.content_levels.contains(['timeseries', 'summary']))\
-            .filter(~Metric.faceted)\
-            .all()
-        return {m.name: m.to_dict() for m in metrics}
+        return self.metric_catalog('content_timeseries_metric_rollups')
 
     @property
     def computed_content_timeseries_metrics(self):
         """
         Metrics to compute on top of the timeseries store.
         """
-        metrics = self.metrics\
-            .filter(Metric.content_levels.contains(['timeseries']))\
-            .filter(Metric.type == 'computed')\
-            .filter(~Metric.faceted)\
-            .all()
-        return {m.name: m.to_dict() for m in metrics}
+        return self.metric_catalog('computed_content_timeseries_metrics')
 
     ## CONTENT SUMMARY METRICS
 
@@ -200,129 +199,77 @@ class Org(db.Model):
         """
         Content metrics that can exist in the content summary store.
         """
-        metrics = self.metrics\
-            .filter(Metric.content_levels.contains(['summary']))\
-            .all()
-        return {m.name: m.to_dict() for m in metrics}
+        return self.metric_catalog('content_summary_metrics')
 
     @property
     def content_summary_metric_names(self):
         """
         The names of metrics that can exist in the content summary store.
         """
-        metrics = self.metrics\
-            .filter(Metric.content_levels.contains(['summary']))\
-            .with_entities(Metric.name)\
-            .all()
-        return [m[0] for m in metrics]
+        return self.metric_catalog('content_summary_metric_names')
 
     @property
     def computed_content_summary_metrics(self):
         """
         Metrics to compute on top of the content summary store.
         """
-        metrics = self.metrics\
-            .filter(Metric.content_levels.contains(['summary']))\
-            .filter(Metric.type == 'computed')\
-            .filter(~Metric.faceted)\
-            .all()
-        return {m.name: m.to_dict() for m in metrics}
+        return self.metric_catalog('computed_content_summary_metrics')
 
     @property
     def computed_content_summary_metric_names(self):
         """
         The names of metrics to compute on top of the content summary store.
         """
-        metrics = self.metrics\
-            .filter(Metric.content_levels.contains(['summary']))\
-            .filter(Metric.type == 'computed')\
-            .filter(~Metric.faceted)\
-            .with_entities(Metric.name)\
-            .all()
-        return [m[0] for m in metrics]
+        return self.metric_catalog('computed_content_summary_metric_names')
 
     @property
     def computable_content_summary_metrics(self):
         """
         The names of metrics which can be used in computed summary metrics.
         """
-        metrics = self.metrics\
-            .filter(Metric.content_levels.contains(['summary']))\
-            .filter(Metric.type != 'computed')\
-            .filter(~Metric.faceted)\
-            .all()
-        return {m.name: m.to_dict() for m in metrics}
+        return self.metric_catalog('computable_content_summary_metrics')
 
     @property
     def computable_content_summary_metrics_names(self):
         """
         The names of metrics which can be used in computed summary metrics.
         """
-        metrics = self.metrics\
-            .filter(Metric.content_levels.contains(['summary']))\
-            .filter(Metric.type != 'computed')\
-            .filter(~Metric.faceted)\
-            .with_entities(Metric.name)\
-            .all()
-        return [m[0] for m in metrics]
+        return self.metric_catalog('computable_content_summary_metrics_names')
 
     @property
     def content_summary_metric_sorts(self):
         """
         The names of metrics that can can be used to sort content items.
         """
-        metrics = self.metrics\
-            .filter(Metric.content_levels.contains(['summary']))\
-            .filter(~Metric.faceted)\
-            .all()
-        return {m.name: m.to_dict() for m in metrics}
+        return self.metric_catalog('content_summary_metric_sorts')
 
     @property
     def content_summary_metric_sort_names(self):
         """
         The names of metrics that can can be used to sort content items.
         """
-        metrics = self.metrics\
-            .filter(Metric.content_levels.contains(['summary']))\
-            .filter(~Metric.faceted)\
-            .with_entities(Metric.name)\
-            .all()
-        return {m.name: m.to_dict() for m in metrics}
+        return self.metric_catalog('content_summary_metric_sort_names')
 
     @property
     def content_metric_comparisons(self):
         """
         Content summary metrics that should be used to generate comparisons.
         """
-        metrics = self.metrics\
-            .filter(Metric.content_levels.contains(['summary', 'comparison']))\
-            .filter(~Metric.faceted)\
-            .all()
-        return {m.name: m.to_dict() for m in metrics}
+        return self.metric_catalog('content_metric_comparisons')
 
     @property
     def content_metric_comparison_names(self):
         """
         The names of content summary metrics that should be used to generate comparisons.
         """
-        metrics = self.metrics\
-            .filter(Metric.content_levels.contains(['summary', 'comparison']))\
-            .filter(~Metric.faceted)\
-            .with_entities(Metric.name)\
-            .all()
-        return [m[0] for m in metrics]
+        return self.metric_catalog('content_metric_comparison_names')
 
     @property
     def content_faceted_metric_names(self):
         """
         The names of faceted content metrics.
         """
-        metrics = self.metrics\
-            .filter(Metric.faceted)\
-            .filter(Metric.content_levels.contains(['summary']))\
-            .with_entities(Metric.name)\
-            .all()
-        return [m[0] for m in metrics]
+        return self.metric_catalog('content_faceted_metric_names')
 
     ## ORG TIMESERIES METRICS
 
@@ -334,15 +281,7 @@ class Org(db.Model):
 
         Computed metrics should be rolled-up to the org timeseries.
         """
-        metrics = self.metrics\
-            .filter(
-                or_(Metric.org_levels.contains(['timeseries']),
-                    and_(Metric.content_levels.contains(['timeseries']),
-                         Metric.org_levels.contains(['timeseries']))
-                    ))\
-            .filter(~Metric.faceted)\
-            .all()
-        return {m.name: m.to_dict() for m in metrics}
+        return self.metric_catalog('timeseries_metrics')
 
     @property
     def timeseries_metric_names(self):
@@ -350,41 +289,21 @@ class Org(db.Model):
         The names of org timeseries metrics and content timeseries metrics
         which can exist in the org timeseries.
         """
-        metrics = self.metrics\
-            .filter(
-                or_(Metric.org_levels.contains(['timeseries']),
-                    and_(Metric.content_levels.contains(['timeseries']),
-                         Metric.org_levels.contains(['timeseries']))
-                    ))\
-            .filter(~Metric.faceted)\
-            .with_entities(Metric.name)\
-            .all()
-        return [m[0] for m in metrics]
+        return self.metric_catalog('timeseries_metric_names')
 
     @property
     def computed_timeseries_metrics(self):
         """
         Org-specific computed timeseries metrics.
         """
-        metrics = self.metrics\
-            .filter(Metric.org_levels.contains(['timeseries']))\
-            .filter(~Metric.content_levels.contains(['timeseries']))\
-            .filter(Metric.type == 'computed')\
-            .all()
-        return {m.name: m.to_dict() for m in metrics}
+        return self.metric_catalog('computed_timeseries_metrics')
 
     @property
     def computed_timeseries_metrics_names(self):
         """
         The names of metrics which can be used in computed summary metrics.
         """
-        metrics = self.metrics\
-            .filter(Metric.org_levels.contains(['timeseries']))\
-            .filter(~Metric.content_levels.contains(['timeseries']))\
-            .filter(Metric.type == 'computed')\
-            .with_entities(Metric.name)\
-            .all()
-        return [m[0] for m in metrics]
+        return self.metric_catalog('computed_timeseries_metrics_names')
 
     @property
     def computable_timeseries_metrics(self):
@@ -405,31 +324,14 @@ class Org(db.Model):
         """
         Metrics which can exist in the org summary store.
         """
-        metrics = self.metrics\
-            .filter(
-                or_(Metric.org_levels.contains(['summary']),
-                    and_(Metric.content_levels.contains(['timeseries']),
-                         Metric.org_levels.contains(['timeseries']))
-                    ))\
-            .filter(~Metric.faceted)\
-            .all()
-        return {m.name: m.to_dict() for m in metrics}
+        return self.metric_catalog('summary_metrics')
 
     @property
     def summary_metric_names(self):
         """
         Metrics which can exist in the org summary store.
         """
-        metrics = self.metrics\
-            .filter(
-                or_(Metric.org_levels.contains(['summary']),
-                    and_(Metric.content_levels.contains(['summary']),
-                         Metric.org_levels.contains(['summary']))
-                    ))\
-            .filter(~Metric.faceted)\
-            .with_entities(Metric.name)\
-            .all()
-        return [m[0] for m in metrics]
+        return self.metric_catalog('summary_metric_names')
 
     def to_dict(self, **kw):
 
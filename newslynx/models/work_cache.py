@@ -1,5 +1,6 @@
 from newslynx import settings
 from newslynx.lib import url
+from newslynx.lib import network
 from newslynx.lib import article
 from newslynx.lib import image
 
@@ -13,6 +14,11 @@ class URLCache(Cache):
     """
     key_prefix = settings.URL_CACHE_PREFIX
     ttl = settings.URL_CACHE_TTL
+    local_size = settings.URL_CACHE_LOCAL_SIZE
+    local_ttl = settings.URL_CACHE_LOCAL_TTL
+    pool_size = settings.URL_CACHE_POOL_SIZE
+    negative_ttl = settings.URL_CACHE_NEGATIVE_TTL
+    negative_reason = 'canonicalize_failed'
 
     def work(self, raw_url):
         """
@@ -27,6 +33,38 @@ class URLCache(Cache):
         return url.prepare(raw_url, source=source, canonicalize=True, expand=True)
 
 
+class PageCache(Cache):
+
+    """
+    A short-lived redis cache of url => fetched page.
+    """
+    key_prefix = settings.PAGE_CACHE_PREFIX
+    ttl = settings.PAGE_CACHE_TTL
+    single_flight = True
+    negative_ttl = settings.PAGE_CACHE_NEGATIVE_TTL
+    negative_reason = 'fetch_failed'
+
+    def work(self, page_url):
+        """
+        Fetch a page, caching it under every url which led to it.
+        Error responses are only remembered as failures.
+        """
+        page = network.fetch_page(page_url)
+        if not page or not 200 <= page['status_code'] < 300:
+            return None
+        self.alias(page, page['url'], *page['history'])
+        return page
+
+    def alias(self, page, *urls):
+        """
+        Cache a page under more urls, eg: its canonical url.
+        """
+        namespace = self.namespace()
+        for u in set(urls):
+            self._store(self.format_key(u, namespace__=namespace),
+                        page, self.ttl)
+
+
 class ExtractCache(Cache):
 
     """
@@ -34,6 +72,9 @@ class ExtractCache(Cache):
     """
     key_prefix = settings.EXTRACT_CACHE_PREFIX
     ttl = settings.EXTRACT_CACHE_TTL
+    single_flight = True
+    negative_ttl = settings.EXTRACT_CACHE_NEGATIVE_TTL
+    negative_reason = 'extract_failed'
 
     def work(self, url, type='article'):
         """
@@ -58,6 +99,10 @@ class ThumbnailCache(Cache):
     """
     key_prefix = settings.THUMBNAIL_CACHE_PREFIX
     ttl = settings.THUMBNAIL_CACHE_TTL
+    local_size = settings.THUMBNAIL_CACHE_LOCAL_SIZE
+    local_ttl = settings.THUMBNAIL_CACHE_LOCAL_TTL
+    negative_ttl = settings.THUMBNAIL_CACHE_NEGATIVE_TTL
+    negative_reason = 'thumbnail_failed'
 
     def work(self, img_url):
         """
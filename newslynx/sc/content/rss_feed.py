@@ -17,6 +17,8 @@ class Article(ContentSousChef):
         else:
             self.max_date_last_run = None
         self.publish_dates = []
+        # ETag / Last-Modified from this recipe's last successful run.
+        self.feed_validators = self.last_job.get('feed_validators', {})
 
     def run(self):
         """
@@ -27,9 +29,12 @@ class Article(ContentSousChef):
         domains = self.org.get('domains', [''])
         if feed_domain:
             domains.append(feed_domain)
-        
-        # iterate through RSS entries.
-        for article in rss.get_entries(feed_url, domains):
+        self.feed = rss.FeedExtractor(
+            feed_url, domains, validators=self.feed_validators)
+
+        # iterate through RSS entries. nothing comes
+        # back if the feed hasn't changed since the last run.
+        for article in rss.get_entries(feed_url, domains, feed=self.feed):
             article['type'] = 'article'  # set this type as article.
 
             # since we poll often, we can assume this is a good
@@ -51,3 +56,18 @@ class Article(ContentSousChef):
         if len(self.publish_dates):
             max_date_last_run = max(self.publish_dates).isoformat()
             self.next_job['max_date_last_run'] = max_date_last_run
+        elif self.max_date_last_run:
+            self.next_job['max_date_last_run'] = self.max_date_last_run.isoformat()
+
+        # track how often the feed was unchanged + what that saved us.
+        unchanged_runs = self.last_job.get('feed_unchanged_runs', 0)
+        bytes_saved = self.last_job.get('feed_bytes_saved', 0)
+        if self.feed.status == 'unchanged':
+            unchanged_runs += 1
+            bytes_saved += self.feed.bytes_saved
+        # teardown only runs once every article has loaded, so
+        # an unchanged feed never hides ones we failed to create.
+        self.next_job['feed_validators'] = self.feed.validators
+        self.next_job['feed_status'] = self.feed.status
+        self.next_job['feed_unchanged_runs'] = unchanged_runs
+        self.next_job['feed_bytes_saved'] = bytes_saved
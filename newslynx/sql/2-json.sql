@@ -13,18 +13,23 @@ SELECT COALESCE(
 )::json
 $function$;
 
+--- merge jsonb objects (keys in right win)
+CREATE OR REPLACE FUNCTION jsonb_merge("left" jsonb, "right" jsonb)
+  RETURNS jsonb
+  LANGUAGE sql
+  IMMUTABLE
+AS $function$
+SELECT COALESCE("left", '{}'::jsonb) || COALESCE("right", '{}'::jsonb)
+$function$;
+
 --- merge json objects
-CREATE OR REPLACE FUNCTION json_merge(left JSON, right JSON)
-RETURNS JSON AS $$
-  import json
-  l, r = json.loads(left), json.loads(right)
-  if not l:
-      return json.dumps(r)
-  if not r:
-      return json.dumps(l)
-  l.update(r)
-  return json.dumps(l)
-$$ LANGUAGE PLPYTHONU;
+CREATE OR REPLACE FUNCTION json_merge("left" json, "right" json)
+  RETURNS json
+  LANGUAGE sql
+  IMMUTABLE
+AS $function$
+SELECT jsonb_merge("left"::jsonb, "right"::jsonb)::json
+$function$;
 
 --- delete an individual key
 CREATE OR REPLACE FUNCTION "json_del_key"(
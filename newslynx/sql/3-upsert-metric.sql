@@ -11,7 +11,7 @@ BEGIN
     LOOP
         -- first try to update the row
         UPDATE content_metric_timeseries 
-        SET metrics = json_merge(metrics, "_metrics"::json),
+        SET metrics = jsonb_merge(metrics, "_metrics"::jsonb),
             updated = current_timestamp
         WHERE
             org_id = "_org_id" AND
@@ -26,7 +26,7 @@ BEGIN
         -- we could get a unique-key failure
         BEGIN
             INSERT INTO content_metric_timeseries
-            VALUES ("_org_id", "_content_item_id", "_datetime", "_metrics"::json, current_timestamp);
+            VALUES ("_org_id", "_content_item_id", "_datetime", "_metrics"::jsonb, current_timestamp);
             RETURN;
         EXCEPTION WHEN unique_violation THEN
             -- do nothing, and loop to try the UPDATE again
@@ -36,6 +36,48 @@ END;
 $$
 LANGUAGE plpgsql;
 
+-- merge a staged batch of content metrics timeseries.
+-- expects a (temporary) content_metric_timeseries_staging table
+-- with one row per org_id / content_item_id / datetime.
+CREATE OR REPLACE FUNCTION "bulk_upsert_content_metric_timeseries"()
+RETURNS VOID AS
+$$
+BEGIN
+    LOOP
+        -- update existing rows and insert the rest in one statement.
+        -- if someone else inserts the same key concurrently,
+        -- we could get a unique-key failure
+        BEGIN
+            WITH updated AS (
+                UPDATE content_metric_timeseries t
+                SET metrics = jsonb_merge(t.metrics, s.metrics::jsonb),
+                    updated = current_timestamp
+                FROM content_metric_timeseries_staging s
+                WHERE
+                    t.org_id = s.org_id AND
+                    t.datetime = s.datetime AND
+                    t.content_item_id = s.content_item_id
+                RETURNING t.org_id, t.content_item_id, t.datetime
+            )
+            INSERT INTO content_metric_timeseries
+            SELECT s.org_id, s.content_item_id, s.datetime, s.metrics::jsonb, current_timestamp
+            FROM content_metric_timeseries_staging s
+            WHERE NOT EXISTS (
+                SELECT 1 FROM updated u
+                WHERE
+                    u.org_id = s.org_id AND
+                    u.datetime = s.datetime AND
+                    u.content_item_id = s.content_item_id
+            );
+            RETURN;
+        EXCEPTION WHEN unique_violation THEN
+            -- do nothing, and loop to try again
+        END;
+    END LOOP;
+END;
+$$
+LANGUAGE plpgsql;
+
 -- upsert content metrics summary
 CREATE OR REPLACE FUNCTION "upsert_content_metric_summary"(
     "_org_id" INT,
@@ -48,7 +90,7 @@ BEGIN
     LOOP
         -- first try to update the row
         UPDATE content_metric_summary 
-        SET metrics = json_merge(metrics, "_metrics"::json)
+        SET metrics = jsonb_merge(metrics, "_metrics"::jsonb)
         WHERE
             org_id = "_org_id" AND
             content_item_id = "_content_item_id";
@@ -61,7 +103,7 @@ BEGIN
         -- we could get a unique-key failure
         BEGIN
             INSERT INTO content_metric_summary
-            VALUES ("_org_id", "_content_item_id", "_metrics"::json);
+            VALUES ("_org_id", "_content_item_id", "_metrics"::jsonb);
             RETURN;
         EXCEPTION WHEN unique_violation THEN
             -- do nothing, and loop to try the UPDATE again
@@ -83,7 +125,7 @@ BEGIN
     LOOP
         -- first try to update the row
         UPDATE org_metric_timeseries 
-        SET metrics = json_merge(metrics, "_metrics"::json),
+        SET metrics = jsonb_merge(metrics, "_metrics"::jsonb),
             updated = current_timestamp
         WHERE
             org_id = "_org_id" AND
@@ -97,7 +139,7 @@ BEGIN
         -- we could get a unique-key failure
         BEGIN
             INSERT INTO org_metric_timeseries
-            VALUES ("_org_id", "_datetime", "_metrics"::json, current_timestamp);
+            VALUES ("_org_id", "_datetime", "_metrics"::jsonb, current_timestamp);
             RETURN;
         EXCEPTION WHEN unique_violation THEN
             -- do nothing, and loop to try the UPDATE again
@@ -119,7 +161,7 @@ BEGIN
     LOOP
         -- first try to update the row
         UPDATE org_metric_summary 
-        SET metrics = json_merge(metrics, "_metrics"::json)
+        SET metrics = jsonb_merge(metrics, "_metrics"::jsonb)
         WHERE org_id = "_org_id";
 
         IF found THEN
@@ -130,7 +172,7 @@ BEGIN
         -- we could get a unique-key failure
         BEGIN
             INSERT INTO org_metric_summary
-            VALUES ("_org_id", "_metrics"::json);
+            VALUES ("_org_id", "_metrics"::jsonb);
             RETURN;
         EXCEPTION WHEN unique_violation THEN
             -- do nothing, and loop to try the UPDATE again
@@ -0,0 +1,25 @@
+-- Migrate metric stores created before metrics were stored as jsonb.
+-- This is a no-op for tables which have already been migrated.
+DO $$
+DECLARE
+  tbl text;
+BEGIN
+  FOREACH tbl IN ARRAY ARRAY[
+    'content_metric_timeseries',
+    'content_metric_summary',
+    'org_metric_timeseries',
+    'org_metric_summary'
+  ]
+  LOOP
+    IF EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_name = tbl AND
+              column_name = 'metrics' AND
+              data_type = 'json'
+    ) THEN
+      EXECUTE 'ALTER TABLE ' || quote_ident(tbl) ||
+              ' ALTER COLUMN metrics TYPE jsonb USING metrics::jsonb';
+    END IF;
+  END LOOP;
+END
+$$;
@@ -0,0 +1,111 @@
+-- Partition content_metric_timeseries by month.
+-- Each partition inherits from content_metric_timeseries and carries
+-- a CHECK constraint on its month so the planner can skip it.
+
+-- the name of the partition a datetime belongs in.
+CREATE OR REPLACE FUNCTION content_metric_timeseries_partition(
+    "_datetime" timestamp with time zone
+)
+RETURNS TEXT AS
+$$
+  SELECT 'content_metric_timeseries_' ||
+         to_char("_datetime" AT TIME ZONE 'UTC', '"y"YYYY"m"MM');
+$$
+LANGUAGE SQL IMMUTABLE;
+
+-- create the partition for the month a datetime falls in.
+-- this is a no-op if it already exists.
+CREATE OR REPLACE FUNCTION create_content_metric_timeseries_partition(
+    "_datetime" timestamp with time zone
+)
+RETURNS TEXT AS
+$$
+DECLARE
+    tbl TEXT := content_metric_timeseries_partition("_datetime");
+    start_dt timestamp with time zone :=
+        date_trunc('month', "_datetime" AT TIME ZONE 'UTC') AT TIME ZONE 'UTC';
+    end_dt timestamp with time zone :=
+        (date_trunc('month', "_datetime" AT TIME ZONE 'UTC') + interval '1 month') AT TIME ZONE 'UTC';
+BEGIN
+    IF to_regclass(tbl::cstring) IS NOT NULL THEN
+        RETURN tbl;
+    END IF;
+    BEGIN
+        EXECUTE format(
+            'CREATE TABLE %I (
+                PRIMARY KEY (org_id, content_item_id, datetime),
+                CHECK (datetime >= %L AND datetime < %L)
+             ) INHERITS (content_metric_timeseries)',
+             tbl, start_dt, end_dt);
+    EXCEPTION WHEN duplicate_table THEN
+        -- someone else created it concurrently.
+        RETURN tbl;
+    END;
+    EXECUTE format('CREATE INDEX %I ON %I (content_item_id)',
+                   tbl || '_content_item_id_idx', tbl);
+    EXECUTE format('CREATE INDEX %I ON %I (updated)',
+                   tbl || '_updated_idx', tbl);
+    -- see 8-rollup-metric.sql
+    PERFORM create_content_metric_rollup_triggers(tbl);
+    RETURN tbl;
+END;
+$$
+LANGUAGE plpgsql;
+
+-- route inserts on the parent table to their partition.
+CREATE OR REPLACE FUNCTION content_metric_timeseries_insert()
+RETURNS TRIGGER AS
+$$
+DECLARE
+    tbl TEXT := create_content_metric_timeseries_partition(NEW.datetime);
+BEGIN
+    EXECUTE format('INSERT INTO %I SELECT ($1).*', tbl) USING NEW;
+    RETURN NULL;
+END;
+$$
+LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS content_metric_timeseries_insert_trigger
+    ON content_metric_timeseries;
+CREATE TRIGGER content_metric_timeseries_insert_trigger
+    BEFORE INSERT ON content_metric_timeseries
+    FOR EACH ROW EXECUTE PROCEDURE content_metric_timeseries_insert();
+
+-- move rows written before partitioning into their partitions.
+CREATE OR REPLACE FUNCTION migrate_content_metric_timeseries()
+RETURNS BIGINT AS
+$$
+DECLARE
+    n BIGINT;
+BEGIN
+    WITH moved AS (
+        DELETE FROM ONLY content_metric_timeseries
+        RETURNING *
+    )
+    INSERT INTO content_metric_timeseries
+    SELECT * FROM moved;
+    GET DIAGNOSTICS n = ROW_COUNT;
+    RETURN n;
+END;
+$$
+LANGUAGE plpgsql;
+
+-- list every partition with its month and whether it's been downsampled.
+CREATE OR REPLACE FUNCTION content_metric_timeseries_partitions()
+RETURNS TABLE (
+    name TEXT,
+    month timestamp with time zone,
+    downsampled BOOLEAN
+) AS
+$$
+  SELECT
+    c.relname::text,
+    to_date(substring(c.relname from '_y(\d{4}m\d{2})$'), 'YYYY"m"MM')
+        ::timestamp AT TIME ZONE 'UTC',
+    coalesce(obj_description(c.oid, 'pg_class') = 'downsampled', false)
+  FROM pg_inherits i
+  JOIN pg_class c ON c.oid = i.inhrelid
+  WHERE i.inhparent = 'content_metric_timeseries'::regclass
+  ORDER BY 2;
+$$
+LANGUAGE SQL STABLE;
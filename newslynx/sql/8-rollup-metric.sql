@@ -0,0 +1,135 @@
+-- Daily and monthly rollups of the hourly timeseries stores.
+-- Hourly writes queue the (UTC) day they touch and
+-- `newslynx.tasks.rollup_metric.timeseries_to_rollups`
+-- recomputes the queued day + month buckets.
+
+CREATE TABLE IF NOT EXISTS content_metric_rollup_day (
+    org_id INT NOT NULL,
+    content_item_id INT NOT NULL,
+    datetime timestamp with time zone NOT NULL,
+    metrics jsonb,
+    updated timestamp with time zone DEFAULT current_timestamp,
+    PRIMARY KEY (org_id, content_item_id, datetime)
+);
+CREATE INDEX IF NOT EXISTS content_metric_rollup_day_content_item_id_idx
+    ON content_metric_rollup_day (content_item_id);
+
+CREATE TABLE IF NOT EXISTS content_metric_rollup_month (
+    org_id INT NOT NULL,
+    content_item_id INT NOT NULL,
+    datetime timestamp with time zone NOT NULL,
+    metrics jsonb,
+    updated timestamp with time zone DEFAULT current_timestamp,
+    PRIMARY KEY (org_id, content_item_id, datetime)
+);
+CREATE INDEX IF NOT EXISTS content_metric_rollup_month_content_item_id_idx
+    ON content_metric_rollup_month (content_item_id);
+
+CREATE TABLE IF NOT EXISTS org_metric_rollup_day (
+    org_id INT NOT NULL,
+    datetime timestamp with time zone NOT NULL,
+    metrics jsonb,
+    updated timestamp with time zone DEFAULT current_timestamp,
+    PRIMARY KEY (org_id, datetime)
+);
+
+CREATE TABLE IF NOT EXISTS org_metric_rollup_month (
+    org_id INT NOT NULL,
+    datetime timestamp with time zone NOT NULL,
+    metrics jsonb,
+    updated timestamp with time zone DEFAULT current_timestamp,
+    PRIMARY KEY (org_id, datetime)
+);
+
+-- days which need to be rolled up.
+-- `id` is a content_item_id or an org_id depending on the level.
+CREATE TABLE IF NOT EXISTS metric_rollup_queue (
+    level TEXT NOT NULL,
+    org_id INT NOT NULL,
+    id INT NOT NULL,
+    datetime timestamp with time zone NOT NULL,
+    PRIMARY KEY (level, id, datetime)
+);
+
+CREATE OR REPLACE FUNCTION queue_content_metric_rollup()
+RETURNS TRIGGER AS
+$$
+BEGIN
+    INSERT INTO metric_rollup_queue
+    VALUES ('content', NEW.org_id, NEW.content_item_id, date_trunc('day', NEW.datetime AT TIME ZONE 'UTC') AT TIME ZONE 'UTC')
+    ON CONFLICT DO NOTHING;
+    RETURN NULL;
+END;
+$$
+LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION queue_org_metric_rollup()
+RETURNS TRIGGER AS
+$$
+BEGIN
+    INSERT INTO metric_rollup_queue
+    VALUES ('org', NEW.org_id, NEW.org_id, date_trunc('day', NEW.datetime AT TIME ZONE 'UTC') AT TIME ZONE 'UTC')
+    ON CONFLICT DO NOTHING;
+    RETURN NULL;
+END;
+$$
+LANGUAGE plpgsql;
+
+-- queue every day which already has hourly rows.
+-- see `newslynx rollups --backfill`.
+CREATE OR REPLACE FUNCTION backfill_metric_rollup_queue()
+RETURNS BIGINT AS
+$$
+DECLARE
+    n BIGINT;
+    m BIGINT;
+BEGIN
+    INSERT INTO metric_rollup_queue
+    SELECT DISTINCT 'content', org_id, content_item_id, date_trunc('day', datetime AT TIME ZONE 'UTC') AT TIME ZONE 'UTC'
+    FROM content_metric_timeseries
+    ON CONFLICT DO NOTHING;
+    GET DIAGNOSTICS n = ROW_COUNT;
+
+    INSERT INTO metric_rollup_queue
+    SELECT DISTINCT 'org', org_id, org_id, date_trunc('day', datetime AT TIME ZONE 'UTC') AT TIME ZONE 'UTC'
+    FROM org_metric_timeseries
+    ON CONFLICT DO NOTHING;
+    GET DIAGNOSTICS m = ROW_COUNT;
+    RETURN n + m;
+END;
+$$
+LANGUAGE plpgsql;
+
+-- queue rollups for writes to a content timeseries table.
+-- updates which don't touch `updated` (eg: deleting a metric) are ignored.
+CREATE OR REPLACE FUNCTION create_content_metric_rollup_triggers(tbl TEXT)
+RETURNS VOID AS
+$$
+BEGIN
+    EXECUTE format('DROP TRIGGER IF EXISTS queue_rollup_insert_trigger ON %I', tbl);
+    EXECUTE format('CREATE TRIGGER queue_rollup_insert_trigger
+                    AFTER INSERT ON %I
+                    FOR EACH ROW EXECUTE PROCEDURE queue_content_metric_rollup()', tbl);
+    EXECUTE format('DROP TRIGGER IF EXISTS queue_rollup_update_trigger ON %I', tbl);
+    EXECUTE format('CREATE TRIGGER queue_rollup_update_trigger
+                    AFTER UPDATE ON %I
+                    FOR EACH ROW WHEN (OLD.updated IS DISTINCT FROM NEW.updated)
+                    EXECUTE PROCEDURE queue_content_metric_rollup()', tbl);
+END;
+$$
+LANGUAGE plpgsql;
+
+-- the parent table and every existing partition.
+SELECT create_content_metric_rollup_triggers('content_metric_timeseries');
+SELECT create_content_metric_rollup_triggers(name)
+FROM content_metric_timeseries_partitions();
+
+DROP TRIGGER IF EXISTS queue_rollup_insert_trigger ON org_metric_timeseries;
+CREATE TRIGGER queue_rollup_insert_trigger
+    AFTER INSERT ON org_metric_timeseries
+    FOR EACH ROW EXECUTE PROCEDURE queue_org_metric_rollup();
+DROP TRIGGER IF EXISTS queue_rollup_update_trigger ON org_metric_timeseries;
+CREATE TRIGGER queue_rollup_update_trigger
+    AFTER UPDATE ON org_metric_timeseries
+    FOR EACH ROW WHEN (OLD.updated IS DISTINCT FROM NEW.updated)
+    EXECUTE PROCEDURE queue_org_metric_rollup();
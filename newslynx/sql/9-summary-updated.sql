@@ -0,0 +1,33 @@
+-- Track when each content item's summary metrics last changed
+-- so comparison facets can tell whether their members have moved.
+
+DO $$
+BEGIN
+  IF NOT EXISTS (
+      SELECT 1 FROM information_schema.columns
+      WHERE table_name = 'content_metric_summary' AND
+            column_name = 'updated'
+  ) THEN
+    ALTER TABLE content_metric_summary
+      ADD COLUMN updated timestamp with time zone DEFAULT current_timestamp;
+  END IF;
+END
+$$;
+
+CREATE OR REPLACE FUNCTION touch_content_metric_summary()
+RETURNS TRIGGER AS
+$$
+BEGIN
+    NEW.updated := current_timestamp;
+    RETURN NEW;
+END;
+$$
+LANGUAGE plpgsql;
+
+-- upserts merge into `metrics` without touching `updated`.
+DROP TRIGGER IF EXISTS touch_content_metric_summary_trigger
+    ON content_metric_summary;
+CREATE TRIGGER touch_content_metric_summary_trigger
+    BEFORE UPDATE ON content_metric_summary
+    FOR EACH ROW WHEN (OLD.metrics IS DISTINCT FROM NEW.metrics)
+    EXECUTE PROCEDURE touch_content_metric_summary();
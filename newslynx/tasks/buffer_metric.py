@@ -0,0 +1,183 @@
+"""
+A write-behind buffer for hot content timeseries metrics.
+
+Incoming metrics are merged per (content_item_id, hour) bucket in redis
+and periodically flushed to postgres in bulk.
+"""
+import gevent
+import gevent.monkey
+gevent.monkey.patch_all()
+
+import signal
+import time
+
+from redis.exceptions import ResponseError
+
+from newslynx.core import rds, gen_session
+from newslynx.lib import dates
+from newslynx.lib.serialize import obj_to_json, json_to_obj
+from newslynx.util import gen_uuid, chunk
+from newslynx import settings
+from . import ingest_metric
+from . import rollup_metric
+
+PREFIX = settings.METRIC_BUFFER_PREFIX
+PENDING_KEY = "{}:pending".format(PREFIX)
+BUCKET_PREFIX = "{}:content:".format(PREFIX)
+
+
+def _bucket_key(record):
+    return "{}{org_id}:{content_item_id}:{datetime}"\
+        .format(BUCKET_PREFIX, **record)
+
+
+def _parse_bucket_key(key):
+    org_id, content_item_id, dt = key[len(BUCKET_PREFIX):].split(':', 2)
+    return {
+        'org_id': int(org_id),
+        'content_item_id': int(content_item_id),
+        'datetime': dt
+    }
+
+
+def content_timeseries(records):
+    """
+    Merge validated content timeseries records into their buckets.
+    """
+    pipe = rds.pipeline(transaction=True)
+    n = 0
+    for r in records:
+        if not len(r['metrics']):
+            continue
+        key = _bucket_key(r)
+        pipe.hmset(key, {k: obj_to_json(v) for k, v in r['metrics'].items()})
+        pipe.sadd(PENDING_KEY, key)
+        n += 1
+    if n:
+        pipe.execute()
+    return n
+
+
+def _restore(records):
+    """
+    Put records we failed to write back into their buckets without
+    clobbering anything buffered for them since we read them.
+    """
+    pipe = rds.pipeline(transaction=True)
+    for r in records:
+        key = _bucket_key(r)
+        for k, v in r['metrics'].items():
+            pipe.hsetnx(key, k, obj_to_json(v))
+        pipe.sadd(PENDING_KEY, key)
+    pipe.execute()
+
+
+def flush(session=None, batch_size=settings.METRIC_BUFFER_FLUSH_SIZE):
+    """
+    Write all buffered buckets to the timeseries store.
+    """
+    # claim the current set of pending buckets. anything
+    # buffered from here on lands in a fresh pending set.
+    flushing_key = "{}:flushing:{}".format(PREFIX, gen_uuid())
+    try:
+        rds.rename(PENDING_KEY, flushing_key)
+    except ResponseError:
+        # nothing is pending.
+        return 0
+
+    if session is None:
+        session = gen_session()
+
+    try:
+        n = _flush(session, flushing_key, batch_size)
+        rollup_metric.timeseries_to_rollups(session=session)
+    finally:
+        session.remove()
+    return n
+
+
+def _flush(session, flushing_key, batch_size):
+    """
+    Write claimed buckets in batches.
+    """
+    n = 0
+    for keys in chunk(rds.smembers(flushing_key), batch_size):
+
+        # read + clear buckets atomically.
+        pipe = rds.pipeline(transaction=True)
+        for k in keys:
+            pipe.hgetall(k)
+            pipe.delete(k)
+        res = pipe.execute()
+
+        records = []
+        for k, metrics in zip(keys, res[::2]):
+            if not metrics:
+                continue
+            r = _parse_bucket_key(k)
+            r['metrics'] = {m: json_to_obj(v) for m, v in metrics.items()}
+            records.append(r)
+
+        try:
+            ingest_metric.bulk_content_timeseries(records, session=session)
+            session.commit()
+        except Exception:
+            # put everything we haven't written back
+            # so we can try again on the next flush.
+            session.rollback()
+            _restore(records)
+            rds.sunionstore(PENDING_KEY, [PENDING_KEY, flushing_key])
+            rds.delete(flushing_key)
+            raise
+        n += len(records)
+
+    rds.delete(flushing_key)
+    return n
+
+
+class MetricBufferFlusher(object):
+
+    """
+    A daemon which flushes the metric buffer at least
+    every `max_staleness` seconds, and once more on shutdown.
+    """
+
+    def __init__(self, **kw):
+        self.max_staleness = float(
+            kw.get('max_staleness', settings.METRIC_BUFFER_MAX_STALENESS))
+
+    def log(self, msg):
+        print msg
+
+    def flush(self):
+        start = time.time()
+        try:
+            n = flush()
+        except Exception as e:
+            # everything unwritten is back in the buffer,
+            # so just try again on the next tick.
+            self.log('Error flushing metric buffer at {}: {}'
+                     .format(dates.now(), e))
+            return 0
+        if n:
+            self.log('Flushed {} metric buckets in {} seconds at {}'
+                     .format(n, round(time.time() - start, 2), dates.now()))
+        return n
+
+    def stop(self, *args):
+        raise SystemExit
+
+    def run(self):
+        """
+        Flush the buffer until we're told to stop.
+        """
+        signal.signal(signal.SIGTERM, self.stop)
+        self.log('Starting metric buffer flusher at {} with max staleness of {} seconds'
+                 .format(dates.now(), self.max_staleness))
+        try:
+            while True:
+                time.sleep(self.max_staleness)
+                self.flush()
+        finally:
+            self.log('Flushing metric buffer before shutdown.')
+            self.flush()
@@ -1,9 +1,11 @@
-from gevent.pool import Pool 
+from hashlib import md5
 
-from newslynx.util import gen_uuid
 from newslynx.core import db
 from newslynx import settings
-from .util import ResultIter
+from .util import ResultIter, PlanCache, execute_prepared
+
+# compiled comparison queries.
+plan_cache = PlanCache()
 
 
 class ContentComparison(object):
@@ -15,9 +17,9 @@ class ContentComparison(object):
         self.org = org
         if not isinstance(ids, list):
             ids = [ids]
-        self.ids = ids
-        self.bulk_size = kw.get('bulk_size', 1000)
-        self.pool = Pool(kw.get('pool_size', 20))
+        self.ids = [int(i) for i in ids]
+        # drop zeros (and nulls) from every statistic, not
+        # just the percentiles.
         self.rm_null = kw.get('rm_null', False)
         self.percentiles = kw.get(
             'percentiles', settings.COMPARISON_PERCENTILES)
@@ -25,93 +27,144 @@ class ContentComparison(object):
 
     @property
     def ids_array(self):
-        return "ARRAY[{}]".format(",".join([str(i) for i in self.ids]))
+        return "CAST(:ids AS INT[])"
 
-    def select_metric(self, metric):
-        return "(metrics ->> '{name}')::text::numeric as metric".format(**metric)
+    @property
+    def params(self):
+        return {'ids': self.ids}
 
-    def null_metric(self, metric):
-        return "AND (metrics ->> '{name}')::text::numeric IS NOT NULL".format(**metric)
+    @property
+    def plan_key(self):
+        return (
+            self.__class__.__name__,
+            self.org.id,
+            self.org.metric_catalog_version,
+            self.rm_null,
+            tuple(self.percentiles)
+        )
 
-    def init_query(self, metric):
-        select = self.select_metric(metric)
-        null_metric = self.null_metric(metric)
-        if not self.rm_null:
-            null_metric = ""
-        return \
-            """SELECT {select}
-               FROM {table}
-               WHERE {id_col} in (select unnest({ids_array}))
-               {null_metric}
-               """\
-            .format(select=select, table=self.table,
-                    id_col=self.id_col, ids_array=self.ids_array,
-                    null_metric=null_metric)
-
-    def metric_summary_query(self, metric):
-        return \
-            """ SELECT array_agg(metric) as metric_arr,
-                       ROUND(avg(metric), 2) as mean,
-                       ROUND(min(metric), 2) as min,
-                       ROUND(median(metric), 2) as median,
-                       ROUND(max(metric), 2) as max
-                       FROM ({}) AS "{}"
-            """.format(self.init_query(metric), gen_uuid())
-
-    def select_percentile(self, per):
+    @property
+    def metric_names_array(self):
+        names = ", ".join(["'{}'".format(n) for n in sorted(self.metrics.keys())])
+        return "ARRAY[{}]::text[]".format(names)
+
+    @property
+    def percentiles_array(self):
+        """
+        Each percentile, as fractions.
+        """
+        fracs = [per / 100.0 for per in self.percentiles]
+        return "ARRAY[{}]::float8[]".format(", ".join([repr(f) for f in fracs]))
+
+    def percentile_col(self, per):
         per_col = "per_" + str(per).replace('.', '_')
         if per_col.endswith('_0'):
             per_col = per_col[:-2]
-        return "percentile(metric_arr, {}) as {}".format(per, per_col)
+        return per_col
+
+    def select_percentile(self, i, per):
+        # percentiles skip zeros, but are zero when every value is.
+        return "ROUND((CASE WHEN n > 0 THEN COALESCE(pers[{}], 0) END)::numeric, 2) as {}"\
+            .format(i + 1, self.percentile_col(per))
 
     @property
     def select_percentiles(self):
         ss = []
-        for per in self.percentiles:
-            ss.append(self.select_percentile(per))
+        for i, per in enumerate(self.percentiles):
+            ss.append(self.select_percentile(i, per))
         return ",\n".join(ss)
 
-    def metric_query(self, metric):
-        kw = {
-            'name': metric.get('name'),
-            'percentiles': self.select_percentiles,
-            'summary_query': self.metric_summary_query(metric),
-            'alias': gen_uuid()
-        }
+    @property
+    def init_query(self):
+        """
+        Unnest every comparison metric from a single scan of the summaries.
+        """
+        rm_null = ""
+        if self.rm_null:
+            rm_null = "AND m.value IS NOT NULL"
+        return \
+            """SELECT m.key as metric, m.value::numeric as value
+               FROM {table}, jsonb_each_text(metrics) m
+               WHERE {id_col} = ANY({ids_array})
+               AND m.key = ANY({names_array})
+               {rm_null}
+            """.format(table=self.table, id_col=self.id_col,
+                       ids_array=self.ids_array,
+                       names_array=self.metric_names_array,
+                       rm_null=rm_null)
+
+    @property
+    def summary_query(self):
+        return \
+            """SELECT names.metric,
+                      avg(value) as mean,
+                      min(value) as min,
+                      max(value) as max,
+                      count(value) as n,
+                      percentile_cont(0.5)
+                        WITHIN GROUP (ORDER BY value::float8) as median,
+                      percentile_cont({percentiles_array})
+                        WITHIN GROUP (ORDER BY value::float8)
+                        FILTER (WHERE value <> 0) as pers
+               FROM unnest({names_array}) AS names(metric)
+               LEFT JOIN ({init_query}) AS "init"
+                    ON "init".metric = names.metric
+               GROUP BY names.metric
+            """.format(percentiles_array=self.percentiles_array,
+                       names_array=self.metric_names_array,
+                       init_query=self.init_query)
+
+    @property
+    def metric_query(self):
         return \
-            """SELECT '{name}' as metric,
-                      mean, median, min, max,
+            """SELECT metric,
+                      ROUND(mean, 2) as mean,
+                      ROUND(median::numeric, 2) as median,
+                      ROUND(min, 2) as min,
+                      ROUND(max, 2) as max,
                       {percentiles}
-               FROM (\n{summary_query}\n) AS "{alias}"
-            """.format(**kw)
+               FROM (\n{summary_query}\n) AS "summary"
+            """.format(percentiles=self.select_percentiles,
+                       summary_query=self.summary_query)
 
     @property
     def queries(self):
         """
-        Chunk queries.
+        Compiled queries, compiled once per plan key.
+        """
+        return plan_cache.get(self.plan_key, self.compile)
+
+    def compile(self):
         """
-        queries = []
-        for metric in self.metrics.values():
-            queries.append(self.metric_query(metric))
-            if len(queries)  % self.bulk_size == 0:
-                yield "\nUNION ALL\n".join(queries)
-        yield "\nUNION ALL\n".join(queries)
-
-    def _execute_one(self, query):
+        One query which summarizes every metric.
         """
-        Execute the chunked queries stream the results.
+        if not len(self.metrics):
+            return []
+        return [self.metric_query]
+
+    def fingerprint(self, session=None):
         """
-        res = db.session.execute(query)
-        if res:
-            for r in ResultIter(res):
-                if r:
-                    yield r
-    
-    def execute(self):
+        A hash of the members of this comparison and when their
+        summaries last changed.
+        """
+        if session is None:
+            session = db.session
+        q = """SELECT string_agg({id_col} || ':' || coalesce(updated::text, ''),
+                                 ',' ORDER BY {id_col})
+               FROM {table}
+               WHERE {id_col} = ANY({ids_array})
+            """.format(id_col=self.id_col, table=self.table,
+                       ids_array=self.ids_array)
+        state = session.execute(q, self.params).scalar() or ""
+        key = "{}{}".format(self.plan_key, state)
+        return md5(key.encode("utf-8")).hexdigest()
+
+    def execute(self, session=None):
         """
-        pooled execution.
+        Execute the comparison and stream the results.
         """
         for query in self.queries:
-            results = ResultIter(db.session.execute(query))
+            results = ResultIter(
+                execute_prepared(query, self.params, session=session))
             for r in results:
                 yield r
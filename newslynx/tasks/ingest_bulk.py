@@ -12,26 +12,32 @@ from newslynx.core import queues, db
 from newslynx.core import rds, gen_session
 from newslynx.exc import (
     RequestError, InternalServerError)
-from newslynx.util import gen_uuid
+from newslynx.util import gen_uuid, chunk
+from newslynx import settings
 from newslynx.lib.serialize import (
     pickle_to_obj, obj_to_pickle)
 
 from . import ingest_content_item
 from . import ingest_event
 from . import ingest_metric
+from . import buffer_metric
+from . import rollup_metric
 
 
 class BulkLoader(object):
 
     __module__ = 'newslynx.tasks.bulk'
 
-    returns = None  # either "model" or "query"
+    returns = None  # either "model", "query", or "records"
     timeout = 1000  # seconds
     result_ttl = 60  # seconds
     kwargs_ttl = 1000  # in case there is a backup in the queue
     max_workers = 7
     concurrent = True
     kwargs_key = 'rq:kwargs:{}'
+    shards_key = 'rq:shards:{}'
+    shard_size = settings.BULK_SHARD_SIZE
+    requires = []
     q = queues.get('bulk')
     redis = rds
 
@@ -41,6 +47,18 @@ class BulkLoader(object):
         """
         raise NotImplemented
 
+    def load_records(self, session, records):
+        """
+        The method to overwrite when `returns` is "records".
+        """
+        raise NotImplemented
+
+    def after_commit(self, session):
+        """
+        The method to overwrite to run something once a shard is committed.
+        """
+        pass
+
     def _load_one(self, item, **kw):
         """
         A wrapper which will catch errors
@@ -58,28 +76,52 @@ class BulkLoader(object):
             'There was an error while bulk uploading: '
             '{}'.format(errors[0].message))
 
-    def load_all(self, kwargs_key):
+    def load_all(self, data_key, kwargs_key, shards_key=None):
+        """
+        Do the work, recording progress on the parent job
+        if this is one of many shards.
+        """
+        # keep shared keys alive while shards work through the queue.
+        self.redis.expire(kwargs_key, self.kwargs_ttl)
+        if shards_key:
+            self.redis.hincrby(shards_key, 'started', 1)
+            self.redis.expire(shards_key, self.kwargs_ttl + self.result_ttl)
+
+        try:
+            rv = self._load_all(data_key, kwargs_key)
+        except Exception as e:
+            rv = e
+
+        if shards_key:
+            if rv is not True:
+                self.redis.hset(
+                    shards_key, 'error', getattr(rv, 'message', str(rv)))
+            self.redis.hincrby(shards_key, 'finished', 1)
+        return rv
+
+    def _load_all(self, data_key, kwargs_key):
         """
-        Do the work.
+        Load one shard of data.
         """
         start = time.time()
         try:
             # create a session specific to this task
             session = gen_session()
 
-            # get the inputs from redis
-            kwargs = self.redis.get(kwargs_key)
-            if not kwargs:
+            # get the inputs from redis. the kwargs are shared
+            # by every shard of a job, so we let them expire.
+            data = self.redis.get(data_key)
+            kw = self.redis.get(kwargs_key)
+            if not data or not kw:
                 raise InternalServerError(
                     'An unexpected error occurred while processing bulk upload.'
                 )
 
-            kwargs = pickle_to_obj(kwargs)
-            data = kwargs.get('data')
-            kw = kwargs.get('kw')
+            data = pickle_to_obj(data)
+            kw = pickle_to_obj(kw)
 
             # delete them
-            self.redis.delete(kwargs_key)
+            self.redis.delete(data_key)
 
             outputs = []
             errors = []
@@ -124,8 +166,18 @@ class BulkLoader(object):
                         except Exception as e:
                             self._handle_errors(e)
 
+            # load all records in one go
+            elif self.returns == 'records':
+                records = [r for r in outputs if r is not None]
+                if len(records):
+                    try:
+                        self.load_records(session, records)
+                    except Exception as e:
+                        self._handle_errors(e)
+
             try:
                 session.commit()
+                self.after_commit(session)
 
             except Exception as e:
                 session.rollback()
@@ -142,6 +194,19 @@ class BulkLoader(object):
                 'Bulk loading timed out after {} seconds'
                 .format(end-start))
 
+    def _check_requires(self, item):
+        """
+        Make sure a record has all required keys before we queue it.
+        """
+        if not isinstance(item, dict):
+            raise RequestError(
+                "Bulk endpoints require a list of json objects.")
+        for k in self.requires:
+            if k not in item:
+                raise RequestError(
+                    'You must pass in a {} with each record.'.format(k))
+        return item
+
     def run(self, data, **kw):
 
         # store the data + kwargs in redis temporarily
@@ -152,31 +217,99 @@ class BulkLoader(object):
         # json serializable
         job_id = gen_uuid()
         kwargs_key = self.kwargs_key.format(job_id)
-        kwargs = {'data': data, 'kw': kw}
-        self.redis.set(kwargs_key, obj_to_pickle(kwargs), ex=self.kwargs_ttl)
+        shards_key = self.shards_key.format(job_id)
+        self.redis.set(kwargs_key, obj_to_pickle(kw), ex=self.kwargs_ttl)
+
+        # split the (possibly streaming) data into shards. every shard
+        # is validated and staged before any is queued so a bad record
+        # late in the stream doesn't leave part of the upload applied.
+        data = (self._check_requires(item) for item in data)
+        data_keys = []
+        try:
+            for shard in chunk(data, self.shard_size):
+                data_key = self.kwargs_key.format(gen_uuid())
+                self.redis.set(data_key, obj_to_pickle(shard), ex=self.kwargs_ttl)
+                data_keys.append(data_key)
+        except Exception:
+            self.redis.delete(kwargs_key, *data_keys)
+            raise
+
+        if not len(data_keys):
+            self.redis.delete(kwargs_key)
+            raise RequestError(
+                "Bulk endpoints require at least one json object.")
+
+        # the total is only known once staging is done.
+        self.redis.hset(shards_key, 'total', len(data_keys))
+        self.redis.expire(shards_key, self.kwargs_ttl + self.result_ttl)
+
+        # send the jobs to the task queue
+        for data_key in data_keys:
+            self.q.enqueue(
+                self.load_all, data_key, kwargs_key, shards_key,
+                job_id=data_key.split(':')[-1], timeout=self.timeout,
+                result_ttl=self.result_ttl)
+        return job_id
 
-        # send the job to the task queue
-        self.q.enqueue(
-            self.load_all, kwargs_key,
-            job_id=job_id, timeout=self.timeout,
-            result_ttl=self.result_ttl)
 
-        return job_id
+def status(job_id):
+    """
+    The status of a sharded bulk job, or None if
+    no such job exists.
+    """
+    shards = rds.hgetall(BulkLoader.shards_key.format(job_id))
+    if not shards:
+        return None
+
+    total = int(shards.get('total', 0))
+    started = int(shards.get('started', 0))
+    finished = int(shards.get('finished', 0))
+    ret = {
+        'shards': total,
+        'finished_shards': finished
+    }
+    if shards.get('error'):
+        ret['status'] = 'error'
+        ret['message'] = shards['error']
+    elif finished >= total:
+        ret['status'] = 'success'
+    elif started > 0:
+        ret['status'] = 'running'
+    else:
+        ret['status'] = 'queued'
+    return ret
 
 
 class ContentTimeseriesBulkLoader(BulkLoader):
 
-    returns = 'query'
+    returns = 'records'
     timeout = 240
+    requires = ['content_item_id']
+    # validation is cpu-bound and record order
+    # matters when coalescing duplicate buckets.
+    concurrent = False
 
     def load_one(self, item, **kw):
-        return ingest_metric.content_timeseries(item, **kw)
+        kw.pop('commit', None)
+        return ingest_metric.content_timeseries_record(item, **kw)
+
+    def load_records(self, session, records):
+        if settings.METRIC_BUFFER_ENABLED:
+            return buffer_metric.content_timeseries(records)
+        return ingest_metric.bulk_content_timeseries(records, session=session)
+
+    def after_commit(self, session):
+        # the flusher rolls up buffered records once they're written.
+        if settings.METRIC_BUFFER_ENABLED:
+            return
+        return rollup_metric.timeseries_to_rollups(session=session)
 
 
 class ContentSummaryBulkLoader(BulkLoader):
 
     returns = 'query'
     timeout = 480
+    requires = ['content_item_id']
 
     def load_one(self, item, **kw):
         return ingest_metric.content_summary(item, **kw)
@@ -190,6 +323,9 @@ class OrgTimeseriesBulkLoader(BulkLoader):
     def load_one(self, item, **kw):
         return ingest_metric.org_timeseries(item, **kw)
 
+    def after_commit(self, session):
+        return rollup_metric.timeseries_to_rollups(session=session)
+
 
 class EventBulkLoader(BulkLoader):
 
@@ -48,13 +48,12 @@ def ingest(
     # run article extraction.
     if extract:
         cache_response = extract_cache.get(url=obj['url'], type=obj['type'])
-        if not cache_response:
+        if not cache_response.value:
 
-            # make sure to kill this key.
-            extract_cache.invalidate(url=obj['url'], type=obj['type'])
+            # the failure is cached briefly so we don't refetch it.
             raise RequestError(
-                'Extraction failed on {type} - {url}'
-                .format(**obj))
+                'Extraction failed on {type} - {url} ({error})'
+                .format(error=cache_response.error, **obj))
 
         # extraction succeeded
         else:
@@ -1,3 +1,7 @@
+import csv
+import cStringIO
+from collections import OrderedDict
+
 from newslynx.core import db
 from newslynx.lib import dates
 from newslynx.exc import RequestError
@@ -14,52 +18,127 @@ def content_timeseries(
     """
     Ingest Timeseries Metrics for a content item.
     """
+    cmd_kwargs = content_timeseries_record(
+        obj,
+        org_id=org_id,
+        metrics_lookup=metrics_lookup,
+        content_item_ids=content_item_ids)
+    metrics = cmd_kwargs.pop('metrics')
+
+    # upsert command
+    cmd = """SELECT upsert_content_metric_timeseries(
+                {org_id},
+                {content_item_id},
+                '{datetime}',
+                '{metrics}')
+           """.format(metrics=obj_to_json(metrics), **cmd_kwargs)
+
+    if commit:
+        try:
+            db.session.execute(cmd)
+        except Exception as err:
+            raise RequestError(err.message)
+        cmd_kwargs['metrics'] = metrics
+    return cmd
+
+
+def content_timeseries_record(
+        obj,
+        org_id=None,
+        metrics_lookup=None,
+        content_item_ids=None):
+    """
+    Validate Timeseries Metrics for a content item and
+    return them as a record for the bulk loader.
+    """
     # if not content_item_id or not org or not metrics_lookup:
     #     raise RequestError('Missing required kwargs.')
     content_item_id = obj.pop('content_item_id')
     if not content_item_id:
         raise RequestError('Object is missing a "content_item_id"')
-    if not content_item_id in content_item_ids:
+    # content_item_ids should be a set so this is a hash lookup.
+    # it is omitted when the content item was already fetched.
+    if content_item_ids is not None and \
+       content_item_id not in content_item_ids:
         raise RequestError(
             'Content Item with ID {} doesnt exist'.format(content_item_id))
 
-    cmd_kwargs = {
+    record = {
         "org_id": org_id,
         "content_item_id": content_item_id
     }
 
     # parse datetime.
     if 'datetime' not in obj:
-        cmd_kwargs['datetime'] = dates.floor_now(
+        record['datetime'] = dates.floor_now(
             unit='hour', value=1).isoformat()
 
     else:
         ds = obj.pop('datetime')
         dt = dates.parse_iso(ds)
-        cmd_kwargs['datetime'] = dates.floor(
+        record['datetime'] = dates.floor(
             dt, unit='hour', value=1).isoformat()
 
-    metrics = ingest_util.prepare_metrics(
+    record['metrics'] = ingest_util.prepare_metrics(
         obj,
         metrics_lookup,
         valid_levels=['content_item', 'all'],
         check_timeseries=True)
+    return record
 
-    # upsert command
-    cmd = """SELECT upsert_content_metric_timeseries(
-                {org_id},
-                {content_item_id},
-                '{datetime}',
-                '{metrics}')
-           """.format(metrics=obj_to_json(metrics), **cmd_kwargs)
 
-    if commit:
-        try:
-            db.session.execute(cmd)
-        except Exception as err:
-            raise RequestError(err.message)
-        cmd_kwargs['metrics'] = metrics
-    return cmd
+def bulk_content_timeseries(records, session=None, batch_size=10000):
+    """
+    Upsert many content timeseries records at once by
+    COPYing them into a staging table and merging each
+    batch with a single set-based statement.
+    """
+    if session is None:
+        session = db.session
+
+    # coalesce records for the same bucket. later records win,
+    # just as they would with successive upserts.
+    buckets = OrderedDict()
+    for r in records:
+        key = (r['content_item_id'], r['datetime'])
+        if key not in buckets:
+            buckets[key] = {
+                'org_id': r['org_id'],
+                'content_item_id': r['content_item_id'],
+                'datetime': r['datetime'],
+                'metrics': {}
+            }
+        buckets[key]['metrics'].update(r['metrics'])
+
+    # psycopg2 cursor on the session's connection so the
+    # staging table lives in the same transaction.
+    cursor = session.connection().connection.cursor()
+    cursor.execute(
+        """CREATE TEMP TABLE IF NOT EXISTS content_metric_timeseries_staging (
+                org_id INT,
+                content_item_id INT,
+                datetime timestamp with time zone,
+                metrics TEXT
+            ) ON COMMIT DROP
+        """)
+
+    rows = buckets.values()
+    for i in xrange(0, len(rows), batch_size):
+        buf = cStringIO.StringIO()
+        writer = csv.writer(buf)
+        for r in rows[i:i + batch_size]:
+            writer.writerow([
+                r['org_id'], r['content_item_id'],
+                r['datetime'], obj_to_json(r['metrics'])
+            ])
+        buf.seek(0)
+        cursor.copy_expert(
+            """COPY content_metric_timeseries_staging
+                    (org_id, content_item_id, datetime, metrics)
+               FROM STDIN WITH CSV""", buf)
+        cursor.execute("SELECT bulk_upsert_content_metric_timeseries()")
+        cursor.execute("TRUNCATE content_metric_timeseries_staging")
+    return len(rows)
 
 
 def content_summary(
@@ -74,7 +153,10 @@ def content_summary(
     content_item_id = obj.pop('content_item_id')
     if not content_item_id:
         raise RequestError('Object is missing a "content_item_id"')
-    if not content_item_id in content_item_ids:
+    # content_item_ids should be a set so this is a hash lookup.
+    # it is omitted when the content item was already fetched.
+    if content_item_ids is not None and \
+       content_item_id not in content_item_ids:
         raise RequestError(
             'Content Item with ID {} doesnt exist'.format(content_item_id))
 
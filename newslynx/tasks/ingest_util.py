@@ -1,6 +1,5 @@
 from gevent.monkey import patch_all
 patch_all()
-from gevent.pool import Pool
 
 from newslynx.lib import dates
 from newslynx.lib import url
@@ -8,7 +7,6 @@ from newslynx.lib import text
 from newslynx.lib import html
 from newslynx.lib import stats
 from newslynx.models import URLCache, ThumbnailCache
-from newslynx import settings
 from newslynx.exc import RequestError
 from newslynx.constants import METRIC_FACET_KEYS
 
@@ -16,9 +14,6 @@ from newslynx.constants import METRIC_FACET_KEYS
 url_cache = URLCache()
 thumbnail_cache = ThumbnailCache()
 
-# a pool to multithread url_cache.
-url_cache_pool = Pool(settings.URL_CACHE_POOL_SIZE)
-
 
 def prepare_links(links=[], domains=[]):
     """
@@ -32,7 +27,7 @@ def prepare_links(links=[], domains=[]):
         links = _links
     raw_urls = list(set(links))
     clean_urls = set()
-    for cache_response in url_cache_pool.imap_unordered(url_cache.get, list(raw_urls)):
+    for cache_response in url_cache.get_many(raw_urls):
         clean_urls.add(cache_response.value)
     return list(clean_urls)
 
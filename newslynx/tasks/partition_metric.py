@@ -0,0 +1,145 @@
+"""
+Maintenance of the month-partitioned content timeseries store.
+"""
+from datetime import timedelta
+
+from newslynx.core import db
+from newslynx.lib import dates
+from newslynx.models import Org
+from newslynx import settings
+
+
+def create_partitions(months_ahead=settings.METRIC_PARTITION_MONTHS_AHEAD):
+    """
+    Make sure this month's partition and the next `months_ahead` exist.
+    """
+    q = """SELECT create_content_metric_timeseries_partition(
+                date_trunc('month', current_timestamp AT TIME ZONE 'UTC') AT TIME ZONE 'UTC'
+                + interval '{} months')
+        """
+    names = []
+    for i in xrange(months_ahead + 1):
+        names.append(db.session.execute(q.format(i)).scalar())
+    db.session.commit()
+    return names
+
+
+def migrate():
+    """
+    Move rows written before partitioning into their partitions.
+    """
+    n = db.session.execute(
+        "SELECT migrate_content_metric_timeseries()").scalar()
+    db.session.commit()
+    return n
+
+
+def partitions(downsampled=None, before=None):
+    """
+    List partitions, optionally those ending before a datetime.
+    """
+    clauses = ["true"]
+    if downsampled is not None:
+        clauses.append("downsampled = {}".format(str(downsampled).lower()))
+    if before is not None:
+        clauses.append("month + interval '1 month' <= '{}'"
+                       .format(before.isoformat()))
+    q = """SELECT name, month, downsampled
+           FROM content_metric_timeseries_partitions()
+           WHERE {}
+        """.format(" AND ".join(clauses))
+    return [dict(zip(r.keys(), r)) for r in db.session.execute(q)]
+
+
+def _downsample_select(m):
+    """
+    Aggregate a metric's hourly values into a daily value.
+    """
+    name = m['name']
+    if m['faceted']:
+        # facets can't be aggregated, keep the latest.
+        return """(array_agg(metrics->'{0}' ORDER BY datetime DESC))[1] AS "{0}" """\
+            .format(name)
+    agg = m['agg']
+    if m['type'] == 'cumulative':
+        # cumulative metrics are running totals.
+        agg = 'max'
+    return """{0}((metrics->>'{1}')::numeric) AS "{1}" """.format(agg, name)
+
+
+def downsample_org(org, partition):
+    """
+    Replace an org's hourly rows in a partition with daily rows.
+    """
+    metrics = org.content_timeseries_metrics.values()
+    if not len(metrics):
+        return 0
+
+    qkw = {
+        'org_id': org.id,
+        'partition': partition,
+        'metrics': ", ".join(['"{}"'.format(m['name']) for m in metrics]),
+        'select_statements': ",\n".join([_downsample_select(m) for m in metrics])
+    }
+    q = """CREATE TEMP TABLE content_metric_timeseries_downsample ON COMMIT DROP AS
+           SELECT
+                org_id,
+                content_item_id,
+                datetime,
+                jsonb_strip_nulls(
+                    (SELECT row_to_json(_) from (SELECT {metrics}) as _)::jsonb
+                ) as metrics
+           FROM (
+                SELECT
+                    org_id,
+                    content_item_id,
+                    date_trunc('day', datetime AT TIME ZONE 'UTC') AT TIME ZONE 'UTC' as datetime,
+                    {select_statements}
+                FROM "{partition}"
+                WHERE org_id = {org_id}
+                GROUP BY 1, 2, 3
+            ) t;
+
+           DELETE FROM "{partition}" WHERE org_id = {org_id};
+
+           INSERT INTO "{partition}"
+           SELECT org_id, content_item_id, datetime, metrics, current_timestamp
+           FROM content_metric_timeseries_downsample;
+        """.format(**qkw)
+    res = db.session.execute(q)
+    db.session.commit()
+    return res.rowcount
+
+
+def downsample(older_than=settings.METRIC_DOWNSAMPLE_AFTER_DAYS):
+    """
+    Downsample every partition whose month ended more than
+    `older_than` days ago from hourly to daily buckets.
+    """
+    cutoff = dates.now() - timedelta(days=older_than)
+    done = []
+    for p in partitions(downsampled=False, before=cutoff):
+        org_ids = db.session.execute(
+            'SELECT DISTINCT org_id FROM "{}"'.format(p['name']))
+        for org_id, in org_ids.fetchall():
+            org = Org.query.get(org_id)
+            if org:
+                downsample_org(org, p['name'])
+        db.session.execute(
+            """COMMENT ON TABLE "{}" IS 'downsampled'""".format(p['name']))
+        db.session.commit()
+        done.append(p['name'])
+    return done
+
+
+def maintain(**kw):
+    """
+    Create future partitions and downsample old ones.
+    """
+    return {
+        'created': create_partitions(
+            kw.get('months_ahead', settings.METRIC_PARTITION_MONTHS_AHEAD)),
+        'migrated': migrate(),
+        'downsampled': downsample(
+            kw.get('older_than', settings.METRIC_DOWNSAMPLE_AFTER_DAYS))
+    }
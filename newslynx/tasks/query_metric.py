@@ -2,8 +2,22 @@ from datetime import datetime, date
 import copy
 
 from newslynx.core import db
-from .util import ResultIter
+from newslynx.exc import RequestError
+from .util import (
+    ResultIter, PlanCache, execute_prepared, execute_stream)
 from newslynx.util import uniq
+from newslynx.constants import METRIC_TS_UNITS
+from newslynx import settings
+
+# aggregations which give the same result when
+# applied to pre-aggregated buckets.
+DECOMPOSABLE_AGGS = ['sum', 'min', 'max']
+
+# transforms which aggregate each bucket across ids.
+CROSS_ID_TRANSFORMS = ['avg', 'median']
+
+# compiled timeseries queries.
+plan_cache = PlanCache()
 
 
 class TSQuery(object):
@@ -16,6 +30,8 @@ class TSQuery(object):
     metrics_attr = None
     computed_metrics_attr = None
     cal_fx = None
+    # (unit, pre-aggregated store), coarsest first.
+    rollup_tables = []
 
     date_col = 'datetime'
     metrics_col = 'metrics'
@@ -27,9 +43,9 @@ class TSQuery(object):
         self.org = org
         if not isinstance(ids, list):
             ids = [ids]
-        self.ids = ids
-        # self.select = kw.get('select', '*') # TODO
-        # self.exclude = kw.get('exclude', []) # TODO
+        self.ids = [int(i) for i in ids]
+        self.select = kw.get('select', '*')
+        self.exclude = kw.get('exclude', [])
         self.unit = kw.get('unit', self.min_unit)
         self.sparse = kw.get('sparse', True)
         self.sig_digits = kw.get('sig_digits', 2)
@@ -38,64 +54,88 @@ class TSQuery(object):
         self.time_since_start = kw.get('time_since_start', False)  # TODO
         # cumulative, avg, median, per_change, roll_avg
         self.transform = kw.get('transform', None)
+        self.window = kw.get('window', 7)
+        # averages / medians across ids start from each id's series.
+        if self.transform in CROSS_ID_TRANSFORMS:
+            self.group_by_id = True
         self.before = kw.get('before', None)
         self.after = kw.get('after', None)
+        self.rollups = kw.get('rollups', True)
         self.metrics = getattr(org, self.metrics_attr)
         self.computed_metrics = getattr(org, self.computed_metrics_attr)
-        # self.select_metrics()
+        self.select_metrics()
+        self.select_store()
         self.format_dates()
         self.compute = len(self.computed_metrics.keys()) > 0
 
-    # @property
-    # def computed_metrics_require(self):
-    #     """
-    #     Which metrics to do computed metrics require?
-    #     """
-    #     required = []
-    #     for metric in self.computed_metrics.values():
-    #         if self.select == "*":
-
-    #             required.extend(metric.get('formula_requires', []))
-
-    #         elif metric['name'] in self.select and \
-    #                 not metric['name'] in self.exclude:
-
-    #             required.extend(metric.get('formula_requires', []))
-
-    #     return uniq(required)
-
-    # # TODO : Figure out how to deal with metrics which
-    # # computed metrics are reliant upon.
-    # def select_metrics(self):
-    #     """
-    #     Select / exclude computed metrics.
-    #     """
-    #     select = copy.copy(self.select)
-
-    #     if select != "*":
-    #         if not isinstance(select, list):
-    #             select = [select]
-
-    #         for n in self.metrics.keys():
-    #             if n not in select and n not in self.computed_metrics_require:
-    #                 self.metrics.pop(n)
-
-    #         for n in self.computed_metrics.keys():
-    #             if n not in self.select:
-    #                 self.computed_metrics.pop(n)
-
-    #     exclude = copy.copy(self.exclude)
-    #     if not isinstance(exclude, list):
-    #         exclude = [exclude]
-
-    #     if len(exclude):
-    #         for n in self.metrics.keys():
-    #             if n in self.exclude:
-    #                 self.metrics.pop(n)
-
-    #         for n in self.computed_metrics.keys():
-    #             if n in self.exclude:
-    #                 self.computed_metrics.pop(n)
+    @property
+    def computed_metrics_require(self):
+        """
+        Which metrics do the selected computed metrics require?
+        """
+        required = []
+        for metric in self.computed_metrics.values():
+            required.extend(metric.get('formula_requires', []))
+        return uniq(required)
+
+    def select_metrics(self):
+        """
+        Select / exclude metrics. Metrics which selected computed
+        metrics rely upon are still extracted but hidden from the output.
+        """
+        select = copy.copy(self.select)
+        if not isinstance(select, list):
+            select = [select]
+        # only exclusions, or everything.
+        if not len(select) or '*' in select or 'all' in select:
+            select = "*"
+
+        exclude = copy.copy(self.exclude) or []
+        if not isinstance(exclude, list):
+            exclude = [exclude]
+
+        # computed metrics determine what else we need.
+        for n in self.computed_metrics.keys():
+            if (select != "*" and n not in select) or n in exclude:
+                self.computed_metrics.pop(n)
+
+        required = self.computed_metrics_require
+        self.hidden_metrics = []
+        for n in self.metrics.keys():
+            if (select == "*" or n in select) and n not in exclude:
+                continue
+            if n in required:
+                self.hidden_metrics.append(n)
+            else:
+                self.metrics.pop(n)
+
+        if select != "*" or len(exclude):
+            if not len(self.metrics) and not len(self.computed_metrics):
+                raise RequestError(
+                    'None of the selected metrics exist for this timeseries.')
+
+    def select_store(self):
+        """
+        Query the coarsest rollup which satisfies the requested unit.
+        """
+        self.store_unit = self.min_unit
+        if not self.rollups or self.unit == self.min_unit:
+            return
+        # units without a rollup are aggregated from the hourly store.
+        if self.unit not in METRIC_TS_UNITS:
+            return
+
+        decomposable = all([m['agg'] in DECOMPOSABLE_AGGS
+                            for m in self.metrics.values()])
+        for unit, table in self.rollup_tables:
+            if METRIC_TS_UNITS.index(unit) > METRIC_TS_UNITS.index(self.unit):
+                continue
+            # rows in a store are already one per id + unit.
+            exact = self.unit == unit and self.group_by_id
+            if exact or decomposable:
+                self.table = table
+                self.store_unit = unit
+                return
 
     def format_dates(self):
         """
@@ -121,10 +161,9 @@ class TSQuery(object):
     @property
     def ids_array(self):
         """
-        The array of ids to select.
+        The array of ids to select, as a bind.
         """
-        idstring = ", ".join([str(i) for i in self.ids])
-        return "ARRAY[{}]".format(idstring)
+        return "CAST(:ids AS INT[])"
 
     @property
     def date_filter(self):
@@ -132,30 +171,70 @@ class TSQuery(object):
         Filter by date.
         """
         clauses = []
-        fmt = "{} {} '{}'"
+        fmt = "{} {} CAST(:{} AS timestamp with time zone)"
         if not self.filter_dates:
             return ""
 
         if self.before:
-            c = fmt.format(self.date_col, "<=", self.before)
+            c = fmt.format(self.date_col, "<=", 'before')
             clauses.append(c)
 
         if self.after:
-            c = fmt.format(self.date_col, ">=", self.after)
+            c = fmt.format(self.date_col, ">=", 'after')
             clauses.append(c)
 
         return "AND {}".format(" AND ".join(clauses))
 
+    @property
+    def params(self):
+        """
+        Bind parameters for the compiled query.
+        """
+        return dict(
+            ids=self.ids,
+            before=self.before,
+            after=self.after,
+            sig_digits=self.sig_digits
+        )
+
+    @property
+    def plan_key(self):
+        """
+        Everything which changes the text of the compiled query.
+        """
+        return (
+            self.__class__.__name__,
+            self.org.id,
+            self.org.metric_catalog_version,
+            self.unit,
+            self.sparse,
+            self.transform,
+            self.group_by_id,
+            self.window,
+            tuple(sorted(self.metrics.keys())),
+            tuple(sorted(self.computed_metrics.keys())),
+            tuple(sorted(self.hidden_metrics)),
+            self.table,
+            bool(self.before),
+            bool(self.after)
+        )
+
     @property
     def query_kw(self):
         """
-        default kwargs.
+        default kwargs. these don't change between
+        requests so we only build them once.
         """
+        if getattr(self, '_query_kw', None) is None:
+            self._query_kw = self._build_query_kw()
+        return self._query_kw
+
+    def _build_query_kw(self):
         return dict(
             table=self.table,
             id_col=self.id_col,
             date_col=self.date_col,
-            sig_digits=self.sig_digits,
+            sig_digits=":sig_digits",
             metrics_col=self.metrics_col,
             unit=self.unit,
             cal_fx=self.cal_fx,
@@ -227,6 +306,41 @@ class TSQuery(object):
         s = "sum({name}) OVER ({p} ORDER BY {date_col} ASC) AS {name}"
         return s.format(p=p, **self.add_kw(**metric))
 
+    @property
+    def window_clause(self):
+        """
+        The window for transformations over each series.
+        """
+        p = "PARTITION BY {}".format(self.id_col)
+        if not self.group_by_id:
+            p = ""
+        return "OVER ({} ORDER BY {} ASC".format(p, self.date_col)
+
+    def select_roll_avg(self, metric):
+        """
+        A rolling average over the last `window` buckets.
+        """
+        w = "{} ROWS BETWEEN {} PRECEDING AND CURRENT ROW)"\
+            .format(self.window_clause, max(self.window - 1, 0))
+        s = "ROUND(avg({name}) {w}, {sig_digits}) AS {name}"
+        return s.format(w=w, **self.add_kw(**metric))
+
+    def select_per_change(self, metric):
+        """
+        The percent change from the previous bucket.
+        """
+        w = "{})".format(self.window_clause)
+        s = "ROUND(({name} - lag({name}) {w}) / " + \
+            "NULLIF(lag({name}) {w}, 0) * 100, {sig_digits}) AS {name}"
+        return s.format(w=w, **self.add_kw(**metric))
+
+    def select_cross_id(self, metric):
+        """
+        An average / median of each bucket across ids.
+        """
+        s = "ROUND({fx}({name}), {sig_digits}) AS {name}"
+        return s.format(fx=self.transform, **self.add_kw(**metric))
+
     @property
     def init_selects(self):
         """
@@ -234,7 +348,9 @@ class TSQuery(object):
         """
         ss = []
         for n, m in self.metrics.items():
-            if m['type'] == 'cumulative':
+            # rollups store cumulative metrics as counts.
+            if m['type'] == 'cumulative' and \
+               self.store_unit == self.min_unit:
                 ss.append(self.select_cumulative_to_count(m))
             else:
                 ss.append(self.select_simple(m))
@@ -353,12 +469,8 @@ class TSQuery(object):
         """
         kwargs for non-sparse calendar
         """
-        before = ""
-        after = ""
-        if self.before:
-            before = ", '{}'".format(self.before)
-        if self.after:
-            after = ", '{}'".format(self.after)
+        before = ", COALESCE(CAST(:before AS timestamp with time zone), '2100-01-01')"
+        after = ", COALESCE(CAST(:after AS timestamp with time zone), '2000-01-01')"
         return self.add_kw(before=before, after=after)
 
     @property
@@ -457,9 +569,23 @@ class TSQuery(object):
             """.format(**self.add_kw(**kw))
 
     @property
-    def cumulative_kw(self):
+    def transform_selects(self):
         """
-        kwargs for the cumulative query.
+        Generate select statements for the transform query.
+        """
+        if self.transform in CROSS_ID_TRANSFORMS:
+            fx = self.select_cross_id
+        else:
+            fx = getattr(self, 'select_{}'.format(self.transform))
+        ss = []
+        for n, m in dict(self.metrics.items() + self.computed_metrics.items()).items():
+            ss.append(fx(m))
+        return ",\n".join(ss)
+
+    @property
+    def transform_init_query(self):
+        """
+        The query which transformations are applied to.
         """
         # determine initial query
         if self.sparse and self.unit == 'hour' and self.group_by_id:
@@ -471,16 +597,22 @@ class TSQuery(object):
         elif not self.sparse:
             init_q = self.non_sparse_query
 
+        if self.compute:
+            init_q = self.computed_query(init_q)
+        return init_q
+
+    @property
+    def cumulative_kw(self):
+        """
+        kwargs for the cumulative query.
+        """
         _id_col = "{},".format(self.id_col)
         if not self.group_by_id:
             _id_col = ""
 
-        if self.compute:
-            init_q = self.computed_query(init_q)
-
         return self.add_kw(
             select=self.cumulative_selects,
-            init_q=init_q,
+            init_q=self.transform_init_query,
             _id_col=_id_col
         )
 
@@ -499,10 +631,95 @@ class TSQuery(object):
                 ) t2
             """.format(**self.cumulative_kw)
 
+    @property
+    def window_kw(self):
+        """
+        kwargs for the rolling average / percent change query.
+        """
+        _id_col = "{},".format(self.id_col)
+        order_by = ", {}".format(self.id_col)
+        if not self.group_by_id:
+            _id_col = ""
+            order_by = ""
+
+        return self.add_kw(
+            select=self.transform_selects,
+            init_q=self.transform_init_query,
+            _id_col=_id_col,
+            order_by=order_by
+        )
+
+    @property
+    def window_query(self):
+        """
+        The rolling average / percent change query.
+        """
+        return \
+            """ SELECT
+                    {date_col},
+                    {_id_col}
+                    {select}
+                FROM (
+                    {init_q}
+                ) t2
+                ORDER BY {date_col} {order_by} ASC
+            """.format(**self.window_kw)
+
+    @property
+    def cross_id_query(self):
+        """
+        The average / median across ids query.
+        """
+        kw = self.add_kw(
+            select=self.transform_selects,
+            init_q=self.transform_init_query
+        )
+        return \
+            """ SELECT
+                    {date_col},
+                    {select}
+                FROM (
+                    {init_q}
+                ) t2
+                GROUP BY {date_col}
+                ORDER BY {date_col} ASC
+            """.format(**kw)
+
     @property
     def query(self):
         """
-        The whole shebang
+        The whole shebang, compiled once per plan key.
+        """
+        return plan_cache.get(self.plan_key, self.compile)
+
+    def compile(self):
+        """
+        Build the parameterized query.
+        """
+        q = self.compile_query()
+        if len(self.hidden_metrics):
+            q = self.projected_query(q)
+        return q
+
+    def projected_query(self, init_q):
+        """
+        Drop metrics which were only needed by computed metrics.
+        """
+        cols = []
+        if self.group_by_id and self.transform not in CROSS_ID_TRANSFORMS:
+            cols.append(self.id_col)
+        cols.append(self.date_col)
+        for n in self.metrics.keys() + self.computed_metrics.keys():
+            if n not in self.hidden_metrics:
+                cols.append(n)
+        return \
+            """SELECT {cols}
+               FROM ({init_q}) projected
+            """.format(cols=", ".join(cols), init_q=init_q)
+
+    def compile_query(self):
+        """
+        Build the query for every extracted metric.
         """
 
         # simple query.
@@ -534,20 +751,32 @@ class TSQuery(object):
         elif self.transform == 'cumulative':
             return self.cumulative_query
 
-        # TODO: rolling average, per_change, median + average timeseries for
-        # multiple ids.
+        # rolling average + percent change
+        elif self.transform in ['roll_avg', 'per_change']:
+            return self.window_query
 
-        # return self.cumulative_query
+        # median + average timeseries for multiple ids.
+        elif self.transform in CROSS_ID_TRANSFORMS:
+            return self.cross_id_query
 
-    def execute(self):
+    def execute(self, stream=False,
+                batch_size=settings.QUERY_STREAM_BATCH_SIZE):
         """
-        Execute the query stream the results.
+        Execute the query stream the results. When `stream` is set,
+        rows come from a server-side cursor `batch_size` at a time.
         """
-        return ResultIter(db.session.execute(self.query))
+        if stream:
+            return ResultIter(execute_stream(self.query, self.params),
+                              batch_size=batch_size)
+        return ResultIter(execute_prepared(self.query, self.params))
 
 
 class QueryContentMetricTimeseries(TSQuery):
     table = "content_metric_timeseries"
+    rollup_tables = [
+        ('month', 'content_metric_rollup_month'),
+        ('day', 'content_metric_rollup_day')
+    ]
     id_col = "content_item_id"
     cal_fx = "content_metric_calendar"
     metrics_attr = "content_timeseries_metrics"
@@ -556,6 +785,10 @@ class QueryContentMetricTimeseries(TSQuery):
 
 class QueryOrgMetricTimeseries(TSQuery):
     table = "org_metric_timeseries"
+    rollup_tables = [
+        ('month', 'org_metric_rollup_month'),
+        ('day', 'org_metric_rollup_day')
+    ]
     id_col = "org_id"
     cal_fx = "org_metric_calendar"
     metrics_attr = "timeseries_metrics"
@@ -4,9 +4,16 @@ from newslynx.lib.serialize import obj_to_json
 from newslynx.core import db
 from newslynx.lib import dates
 from newslynx.constants import IMPACT_TAG_CATEGORIES, IMPACT_TAG_LEVELS
-from newslynx.tasks.query_metric import QueryContentMetricTimeseries
+from newslynx.tasks.query_metric import (
+    QueryContentMetricTimeseries, QueryOrgMetricTimeseries)
 from newslynx.models import Org
 
+# rollup queue level => timeseries query.
+ROLLUP_QUERIES = {
+    'content': QueryContentMetricTimeseries,
+    'org': QueryOrgMetricTimeseries
+}
+
 
 def content_timeseries_to_summary(org, num_hours=24):
     """
@@ -56,7 +63,7 @@ def content_timeseries_to_summary(org, num_hours=24):
                 ) t1
             ) t2
         """.format(**qkw)
-    db.session.execute(q)
+    db.session.execute(q, ts.params)
     db.session.commit()
     return True
 
@@ -164,3 +171,122 @@ def event_tags_to_summary(org):
     db.session.execute(q)
     db.session.commit()
     return True
+
+
+def backfill_rollups(session=None):
+    """
+    Queue every day which already has hourly rows, eg: after
+    upgrading to rollups. Returns the number of days queued.
+    """
+    if session is None:
+        session = db.session
+    n = session.execute("SELECT backfill_metric_rollup_queue()").scalar()
+    session.commit()
+    return n
+
+
+def timeseries_to_rollups(session=None, org_id=None, sig_digits=12):
+    """
+    Recompute the daily + monthly rollup buckets for every day
+    that was queued by a write to an hourly timeseries store.
+    """
+    if session is None:
+        session = db.session
+
+    # buckets are UTC days + months, whichever session we're given.
+    session.execute("SET LOCAL TIMEZONE TO UTC")
+
+    # claim the queue so concurrent refreshes don't overlap.
+    org_filter = ""
+    if org_id:
+        org_filter = "WHERE org_id = {}".format(org_id)
+    session.execute(
+        """CREATE TEMP TABLE metric_rollup_claimed (
+                level TEXT,
+                org_id INT,
+                id INT,
+                datetime timestamp with time zone
+            ) ON COMMIT DROP;
+
+           WITH claimed AS (
+                DELETE FROM metric_rollup_queue {}
+                RETURNING *
+            )
+           INSERT INTO metric_rollup_claimed
+           SELECT level, org_id, id, datetime FROM claimed;
+        """.format(org_filter))
+
+    groups = session.execute(
+        """SELECT level, org_id, array_agg(DISTINCT id)
+           FROM metric_rollup_claimed
+           GROUP BY level, org_id
+        """).fetchall()
+
+    for level, oid, ids in groups:
+        org = session.query(Org).get(oid)
+        if not org:
+            continue
+        cls = ROLLUP_QUERIES[level]
+        for unit, table in cls.rollup_tables:
+            # only aggregate the claimed buckets, starting from the hourly
+            # row before them so cumulative metrics are counted from
+            # their previous value.
+            after = session.execute(
+                """SELECT min(COALESCE(
+                        (SELECT max(datetime) FROM {table}
+                         WHERE {id_col} = c.id AND datetime < c.start),
+                        c.start))
+                   FROM (
+                        SELECT id, min(date_trunc('{unit}', datetime AT TIME ZONE 'UTC')
+                                   AT TIME ZONE 'UTC') AS start
+                        FROM metric_rollup_claimed
+                        WHERE level = '{level}' AND org_id = {org_id}
+                        GROUP BY id
+                   ) c
+                """.format(table=cls.table, id_col=cls.id_col, unit=unit,
+                           level=level, org_id=org.id)).scalar()
+            ts = cls(org, ids, unit=unit, sig_digits=sig_digits,
+                     after=after, rollups=False)
+            if not len(ts.metrics):
+                break
+
+            keys = ['org_id']
+            key_selects = ['t.org_id']
+            if ts.id_col != 'org_id':
+                keys.append(ts.id_col)
+                key_selects = [str(org.id), 't.{}'.format(ts.id_col)]
+
+            qkw = {
+                'table': table,
+                'unit': unit,
+                'level': level,
+                'org_id': org.id,
+                'id_col': ts.id_col,
+                'keys': ", ".join(keys),
+                'key_selects': ", ".join(key_selects),
+                'metrics': ", ".join(ts.metrics.keys()),
+                'agg_query': ts.agg_query
+            }
+            q = """INSERT INTO {table} ({keys}, datetime, metrics)
+                   SELECT
+                        {key_selects},
+                        t.datetime,
+                        jsonb_strip_nulls(
+                            (SELECT row_to_json(_) from (SELECT {metrics}) as _)::jsonb
+                        )
+                   FROM ({agg_query}) t
+                   WHERE (t.{id_col}, t.datetime) IN (
+                        SELECT id, date_trunc('{unit}', datetime AT TIME ZONE 'UTC')
+                                   AT TIME ZONE 'UTC'
+                        FROM metric_rollup_claimed
+                        WHERE level = '{level}' AND org_id = {org_id}
+                    )
+                   ON CONFLICT ({keys}, datetime) DO UPDATE
+                   SET metrics = EXCLUDED.metrics,
+                       updated = current_timestamp
+                """.format(**qkw)
+            session.execute(q, ts.params)
+
+    session.execute("DROP TABLE metric_rollup_claimed")
+    session.commit()
+    return len(groups)
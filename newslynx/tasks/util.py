@@ -1,4 +1,14 @@
+import re
 from inspect import isgenerator
+from hashlib import md5
+
+from sqlalchemy import text
+
+from newslynx.core import db
+from newslynx import settings
+
+# matches sqlalchemy's named bind parameters.
+re_bind = re.compile(r'(?<![:\w\x5c]):(\w+)(?!:)')
 
 
 def convert_row(row):
@@ -9,23 +19,36 @@ def convert_row(row):
 
 class ResultIter(object):
     """ SQLAlchemy ResultProxies are not iterable to get a
-    list of dictionaries. This is to wrap them. """
+    list of dictionaries. This is to wrap them.
+    With a `batch_size`, rows are fetched that many at a time. """
 
-    def __init__(self, result_proxies):
+    def __init__(self, result_proxies, batch_size=None):
         if not isgenerator(result_proxies):
             result_proxies = iter((result_proxies, ))
         self.result_proxies = result_proxies
+        self.batch_size = batch_size
         self._iter = None
 
     def _next_rp(self):
         try:
             rp = next(self.result_proxies)
             self.keys = list(rp.keys())
-            self._iter = iter(rp.fetchall())
+            if self.batch_size:
+                self._iter = self._fetch_batches(rp)
+            else:
+                self._iter = iter(rp.fetchall())
             return True
         except StopIteration:
             return False
 
+    def _fetch_batches(self, rp):
+        while True:
+            rows = rp.fetchmany(self.batch_size)
+            if not rows:
+                break
+            for row in rows:
+                yield row
+
     def __next__(self):
         if self._iter is None:
             if not self._next_rp():
@@ -40,3 +63,81 @@ class ResultIter(object):
 
     def __iter__(self):
         return self
+
+
+class PlanCache(object):
+    """
+    A process-local cache of compiled SQL, keyed by
+    everything which changes the text of a query.
+    """
+
+    def __init__(self, size=settings.QUERY_PLAN_CACHE_SIZE):
+        self.size = size
+        self._plans = {}
+
+    def get(self, key, compile_fx):
+        plan = self._plans.get(key)
+        if plan is None:
+            if len(self._plans) >= self.size:
+                self._plans.clear()
+            plan = compile_fx()
+            self._plans[key] = plan
+        return plan
+
+    def clear(self):
+        self._plans.clear()
+
+
+def positional(query):
+    """
+    Convert named binds to positional ones for PREPARE,
+    returning the query and the ordered bind names.
+    """
+    names = []
+
+    def repl(m):
+        n = m.group(1)
+        if n not in names:
+            names.append(n)
+        return "${}".format(names.index(n) + 1)
+
+    return re_bind.sub(repl, query), names
+
+
+def execute_prepared(query, params, session=None):
+    """
+    Execute a parameterized query through a server-side
+    prepared statement, preparing it once per connection.
+    """
+    if session is None:
+        session = db.session
+
+    if not settings.QUERY_PREPARED_STATEMENTS:
+        return session.execute(query, params)
+
+    name = "nlx_{}".format(md5(query.encode("utf-8")).hexdigest())
+    conn = session.connection()
+    prepared = conn.info.setdefault('prepared_statements', {})
+    if name not in prepared:
+        pq, names = positional(query)
+        session.execute("PREPARE {} AS {}".format(name, pq))
+        prepared[name] = names
+    names = prepared[name]
+
+    args = ""
+    if len(names):
+        args = "({})".format(", ".join([":" + n for n in names]))
+    return session.execute("EXECUTE {}{}".format(name, args),
+                           {n: params.get(n) for n in names})
+
+
+def execute_stream(query, params, session=None):
+    """
+    Execute a parameterized query through a named server-side
+    cursor so rows can be fetched in batches. Prepared statements
+    can't back a cursor, so this always sends the query text.
+    """
+    if session is None:
+        session = db.session
+    conn = session.connection().execution_options(stream_results=True)
+    return conn.execute(text(query), **params)
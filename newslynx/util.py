@@ -74,3 +74,17 @@ def gen_short_uuid(n=6):
     start = random.choice(range(1, (len(uuid) - n)+1))
     end = start + n
     return uuid[start:end]
+
+
+def chunk(seq, n):
+    """
+    Lazily split an iterable into lists of length n.
+    """
+    batch = []
+    for item in seq:
+        batch.append(item)
+        if len(batch) == n:
+            yield batch
+            batch = []
+    if len(batch):
+        yield batch
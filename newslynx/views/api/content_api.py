@@ -189,11 +189,11 @@ def apply_content_item_filters(q, **kw):
     # apply tags filter
     if len(kw['include_subject_tags']):
         q = q.filter(ContentItem.tags.any(
-            Tag.id.in_(kw['include_tags'])))
+            Tag.id.in_(kw['include_subject_tags'])))
 
     if len(kw['exclude_subject_tags']):
         q = q.filter(~ContentItem.tags.any(
-            Tag.id.in_(kw['exclude_tags'])))
+            Tag.id.in_(kw['exclude_subject_tags'])))
 
     # apply authors filter
     if len(kw['include_authors']):
@@ -225,6 +225,66 @@ def apply_content_item_filters(q, **kw):
     return q, list(all_event_ids)
 
 
+def arg_content_item_filters(org):
+    """
+    Parse + validate the request arguments
+    for `apply_content_item_filters`.
+    """
+    include_subject_tags, exclude_subject_tags = \
+        arg_list('subject_tag_ids', default=[], typ=int, exclusions=True)
+    include_impact_tags, exclude_impact_tags = \
+        arg_list('impact_tag_ids', default=[], typ=int, exclusions=True)
+    include_recipes, exclude_recipes = \
+        arg_list('recipe_ids', default=[], typ=int, exclusions=True)
+    include_sous_chefs, exclude_sous_chefs = \
+        arg_list('sous_chefs', default=[], typ=str, exclusions=True)
+    include_authors, exclude_authors = \
+        arg_list('author_ids', default=[], typ=int, exclusions=True)
+    include_levels, exclude_levels = \
+        arg_list('levels', default=[], typ=str, exclusions=True)
+    include_categories, exclude_categories = \
+        arg_list('categories', default=[], typ=str, exclusions=True)
+
+    kw = dict(
+        search_query=arg_str('q', default=None),
+        search_vector=arg_str('search', default='all'),
+        sort_field=None,
+        domain=arg_str('domain', default=None),
+        created_after=arg_date('created_after', default=None),
+        created_before=arg_date('created_before', default=None),
+        updated_after=arg_date('updated_after', default=None),
+        updated_before=arg_date('updated_before', default=None),
+        type=arg_str('type', default='all'),
+        provenance=arg_str('provenance', default=None),
+        include_categories=include_categories,
+        exclude_categories=exclude_categories,
+        include_levels=include_levels,
+        exclude_levels=exclude_levels,
+        include_subject_tags=include_subject_tags,
+        exclude_subject_tags=exclude_subject_tags,
+        include_impact_tags=include_impact_tags,
+        exclude_impact_tags=exclude_impact_tags,
+        include_authors=include_authors,
+        exclude_authors=exclude_authors,
+        include_recipes=include_recipes,
+        exclude_recipes=exclude_recipes,
+        include_sous_chefs=include_sous_chefs,
+        exclude_sous_chefs=exclude_sous_chefs,
+        url=arg_str('url', default=None),
+        url_regex=arg_str('url_regex', default=None),
+        org_id=org.id
+    )
+
+    validate_tag_categories(kw['include_categories'])
+    validate_tag_categories(kw['exclude_categories'])
+    validate_tag_levels(kw['include_levels'])
+    validate_tag_levels(kw['exclude_levels'])
+    validate_content_item_types(kw['type'])
+    validate_content_item_provenances(kw['provenance'])
+    validate_content_item_search_vector(kw['search_vector'])
+    return kw
+
+
 # endpoints
 
 @bp.route('/api/v1/content', methods=['GET'])
@@ -267,58 +327,19 @@ def search_content(user, org):
     # special arg tuples
     sort_field, direction = \
         arg_sort('sort', default='-created')
-    include_subject_tags, exclude_subject_tags = \
-        arg_list('subject_tag_ids', default=[], typ=int, exclusions=True)
-    include_impact_tags, exclude_impact_tags = \
-        arg_list('impact_tag_ids', default=[], typ=int, exclusions=True)
-    include_recipes, exclude_recipes = \
-        arg_list('recipe_ids', default=[], typ=int, exclusions=True)
-    include_sous_chefs, exclude_sous_chefs = \
-        arg_list('sous_chefs', default=[], typ=str, exclusions=True)
-    include_authors, exclude_authors = \
-        arg_list('author_ids', default=[], typ=int, exclusions=True)
-    include_levels, exclude_levels = \
-        arg_list('levels', default=[], typ=str, exclusions=True)
-    include_categories, exclude_categories = \
-        arg_list('categories', default=[], typ=str, exclusions=True)
 
-    kw = dict(
-        search_query=arg_str('q', default=None),
-        search_vector=arg_str('search', default='all'),
-        domain=arg_str('domain', default=None),
+    kw = arg_content_item_filters(org)
+    kw.update(dict(
         fields=arg_list('fields', default=None),
         page=arg_int('page', default=1),
         per_page=arg_limit('per_page'),
         sort_field=sort_field,
         direction=direction,
-        created_after=arg_date('created_after', default=None),
-        created_before=arg_date('created_before', default=None),
-        updated_after=arg_date('updated_after', default=None),
-        updated_before=arg_date('updated_before', default=None),
-        type=arg_str('type', default='all'),
-        provenance=arg_str('provenance', default=None),
         incl_body=arg_bool('incl_body', default=False),
         incl_img=arg_bool('incl_img', default=False),
         incl_metrics=arg_bool('incl_metrics', default=True),
-        facets=arg_list('facets', default=[], typ=str),
-        include_categories=include_categories,
-        exclude_categories=exclude_categories,
-        include_levels=include_levels,
-        exclude_levels=exclude_levels,
-        include_subject_tags=include_subject_tags,
-        exclude_subject_tags=exclude_subject_tags,
-        include_impact_tags=include_impact_tags,
-        exclude_impact_tags=exclude_impact_tags,
-        include_authors=include_authors,
-        exclude_authors=exclude_authors,
-        include_recipes=include_recipes,
-        exclude_recipes=exclude_recipes,
-        include_sous_chefs=include_sous_chefs,
-        exclude_sous_chefs=exclude_sous_chefs,
-        url=arg_str('url', default=None),
-        url_regex=arg_str('url_regex', default=None),
-        org_id=org.id
-    )
+        facets=arg_list('facets', default=[], typ=str)
+    ))
 
     # validate arguments
 
@@ -368,14 +389,6 @@ def search_content(user, org):
         validate_fields(
             ContentItem, fields=kw['fields'], suffix='to select by')
 
-    validate_tag_categories(kw['include_categories'])
-    validate_tag_categories(kw['exclude_categories'])
-    validate_tag_levels(kw['include_levels'])
-    validate_tag_levels(kw['exclude_levels'])
-    validate_content_item_types(kw['type'])
-    validate_content_item_provenances(kw['provenance'])
-    validate_content_item_search_vector(kw['search_vector'])
-
     # base query
     content_query = ContentItem.query\
         .outerjoin(ContentMetricSummary)
@@ -492,7 +505,7 @@ def bulk_create_content(user, org):
     """
     bulk create content items.
     """
-    req_data = request_data()
+    req_data = request_bulk_data()
     extract = arg_bool('extract', default=True)
     job_id = ingest_bulk.content_items(
         req_data,
@@ -601,6 +614,8 @@ def delete_content_item(user, org, content_item_id):
     # delete metrics
     cmd = """
     DELETE FROM content_metric_timeseries WHERE content_item_id = {0};
+    DELETE FROM content_metric_rollup_day WHERE content_item_id = {0};
+    DELETE FROM content_metric_rollup_month WHERE content_item_id = {0};
     DELETE FROM content_metric_summary WHERE content_item_id = {0};
     """.format(content_item_id)
 
@@ -6,20 +6,25 @@ from newslynx.views.decorators import load_user, load_org
 from newslynx.exc import NotFoundError, RequestError, InternalServerError
 from newslynx.models import ContentItem
 from newslynx.lib.serialize import jsonify
-from newslynx.views.util import request_data, url_for_job_status
+from newslynx.views.util import (
+    request_data, request_bulk_data, url_for_job_status)
 from newslynx.tasks import ingest_bulk
 from newslynx.tasks import ingest_metric
+from newslynx.tasks import buffer_metric
 from newslynx.tasks import rollup_metric
 from newslynx.constants import CONTENT_METRIC_COMPARISONS
+from newslynx import settings
 from newslynx.tasks.query_metric import QueryContentMetricTimeseries
+from newslynx.views.api.content_api import (
+    apply_content_item_filters, arg_content_item_filters)
 from newslynx.models import (
     ComparisonsCache, AllContentComparisonCache,
     SubjectTagsComparisonCache,
     ContentTypeComparisonCache,
     ImpactTagsComparisonCache)
 from newslynx.views.util import (
-    arg_bool, arg_str, validate_ts_unit, arg_list,
-    arg_date, arg_int, delete_response
+    arg_bool, arg_str, validate_ts_unit, validate_ts_transform,
+    arg_list, arg_date, arg_int, delete_response, stream_response, wants_ndjson
 )
 
 # blueprint
@@ -68,12 +73,70 @@ def get_content_timeseries(user, org, content_item_id):
         rm_nulls=arg_bool('rm_nulls', default=False),
         time_since_start=arg_bool('time_since_start', default=False),
         transform=arg_str('transform', default=None),
+        window=arg_int('window', default=7),
         before=arg_date('before', default=None),
         after=arg_date('after', default=None)
     )
+    validate_ts_unit(kw['unit'])
+    validate_ts_transform(kw['transform'])
 
     q = QueryContentMetricTimeseries(org, [content_item_id], **kw)
-    return jsonify(list(q.execute()))
+    return stream_response(q.execute(stream=True), ndjson=wants_ndjson())
+
+
+@bp.route('/api/v1/content/timeseries', methods=['GET'])
+@load_user
+@load_org
+def list_content_timeseries(user, org):
+    """
+    Query the timeseries of many content items in one query.
+    args:
+        ids          | a comma-separated list of content item ids. otherwise
+                     | content items are selected with the same filters as
+                     | /api/v1/content (eg: subject_tag_ids, impact_tag_ids)
+        group_by_id  | return one series per content item (default) or
+                     | aggregate across all of them.
+    """
+    ids = arg_list('ids', default=[], typ=int)
+
+    # only ever select this org's content items.
+    q = ContentItem.query\
+        .with_entities(ContentItem.id)
+    if len(ids):
+        q = q.filter(ContentItem.org_id == org.id)\
+            .filter(ContentItem.id.in_(ids))
+    else:
+        q, _ = apply_content_item_filters(q, **arg_content_item_filters(org))
+    ids = [r[0] for r in q.all()]
+
+    # select / exclude
+    select, exclude = arg_list('select', typ=str, exclusions=True, default=['*'])
+    if '*' in select:
+        exclude = []
+        select = "*"
+
+    kw = dict(
+        unit=arg_str('unit', default='hour'),
+        sparse=arg_bool('sparse', default=True),
+        sig_digits=arg_int('sig_digits', default=2),
+        group_by_id=arg_bool('group_by_id', default=True),
+        select=select,
+        exclude=exclude,
+        rm_nulls=arg_bool('rm_nulls', default=False),
+        time_since_start=arg_bool('time_since_start', default=False),
+        transform=arg_str('transform', default=None),
+        window=arg_int('window', default=7),
+        before=arg_date('before', default=None),
+        after=arg_date('after', default=None)
+    )
+    validate_ts_unit(kw['unit'])
+    validate_ts_transform(kw['transform'])
+
+    if not len(ids):
+        return stream_response(iter([]), ndjson=wants_ndjson())
+
+    q = QueryContentMetricTimeseries(org, ids, **kw)
+    return stream_response(q.execute(stream=True), ndjson=wants_ndjson())
 
 
 @bp.route('/api/v1/content/<content_item_id>/timeseries', methods=['POST'])
@@ -104,6 +167,15 @@ def create_content_item_timeseries(user, org, content_item_id):
     # insert content item id
     req_data['content_item_id'] = content_item_id
 
+    # merge hot metrics in the write-behind buffer.
+    if settings.METRIC_BUFFER_ENABLED:
+        ret = ingest_metric.content_timeseries_record(
+            req_data,
+            org_id=org.id,
+            metrics_lookup=org.content_timeseries_metrics)
+        buffer_metric.content_timeseries([ret])
+        return jsonify(ret)
+
     ret = ingest_metric.content_timeseries(
         req_data,
         org_id=org.id,
@@ -119,25 +191,13 @@ def bulk_create_content_timeseries(user, org):
     """
     bulk upsert timseries metrics for an organization's content items.
     """
-    req_data = request_data()
-
-    # check for valid format.
-    if not isinstance(req_data, list):
-        raise RequestError(
-            "Bulk endpoints require a list of json objects."
-        )
-
-    # check for content_item_id.
-    if not 'content_item_id' in req_data[0].keys():
-        raise RequestError(
-            'You must pass in a content_item_id with each record.'
-        )
+    req_data = request_bulk_data()
 
     job_id = ingest_bulk.content_timeseries(
         req_data,
         org_id=org.id,
         metrics_lookup=org.content_timeseries_metrics,
-        content_item_ids=org.content_item_ids,
+        content_item_ids=set(org.content_item_ids),
         commit=False)
     ret = url_for_job_status(apikey=user.apikey, job_id=job_id, queue='bulk')
     return jsonify(ret, status=202)
@@ -175,7 +235,6 @@ def content_metrics_summary(user, org, content_item_id):
         req_data,
         org_id=org.id,
         metrics_lookup=org.content_summary_metrics,
-        content_item_ids=org.content_item_ids,
         commit=True
     )
     return jsonify(ret)
@@ -188,24 +247,13 @@ def bulk_create_content_summary(user, org):
     """
     bulk upsert summary metrics for an organization's content items.
     """
-    req_data = request_data()
-
-    # check for valid format.
-    if not isinstance(req_data, list):
-        raise RequestError(
-            "Bulk endpoints require a list of json objects."
-        )
-
-    # check for content_item_id.
-    if not 'content_item_id' in req_data[0].keys():
-        raise RequestError(
-            'You must pass in a content_item_id with each record.')
+    req_data = request_bulk_data()
 
     job_id = ingest_bulk.content_summary(
         req_data,
         org_id=org.id,
         metrics_lookup=org.content_summary_metrics,
-        content_item_ids=org.content_item_ids,
+        content_item_ids=set(org.content_item_ids),
         commit=False)
 
     ret = url_for_job_status(apikey=user.apikey, job_id=job_id, queue='bulk')
@@ -356,12 +356,7 @@ def bulk_create_event(user, org):
     """
     Create an event.
     """
-    req_data = request_data()
-    print "REQ DATA", req_data
-    # check for valid format.
-    if not isinstance(req_data, list):
-        raise RequestError(
-            "Non-bulk endpoints require a list of json objects.")
+    req_data = request_bulk_data()
 
     job_id = ingest_bulk.events(
         req_data,
@@ -29,10 +29,10 @@ def extract(user):
     if force_refresh:
         extract_cache.debug = True
 
-    cr = extract_cache.get(url, type)
-    if not cr:
-        extract_cache.invalidate(url, type)
-        raise InternalServerError('Something went wrong. Try again.')
+    cr = extract_cache.get(url, type, retry_failed=force_refresh)
+    if not cr.value:
+        raise InternalServerError(
+            'Something went wrong ({}). Try again.'.format(cr.error))
 
     resp = {
         'cache': cr,
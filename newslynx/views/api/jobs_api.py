@@ -7,6 +7,7 @@ from newslynx.lib.serialize import jsonify
 from newslynx.lib import dates
 from newslynx.exc import RequestError
 from newslynx.core import queues
+from newslynx.tasks import ingest_bulk
 
 # blueprint
 bp = Blueprint('jobs', __name__)
@@ -34,7 +35,13 @@ def get_status(user, job_id):
 
     q = queues.get(queue)
     job = q.fetch_job(job_id)
+
+    # bulk jobs are split into shards under a parent id.
+    shards = None
     if not job:
+        shards = ingest_bulk.status(job_id)
+
+    if not job and not shards:
         raise RequestError(
             'A job with ID {} does not exist'
             .format(job_id))
@@ -62,6 +69,10 @@ def get_status(user, job_id):
         ret['time_since_start'] = (dates.now() - started).seconds
 
     # determine status
+    if shards:
+        ret.update(shards)
+        return jsonify(ret)
+
     if job.is_queued:
         ret['status'] = 'queued'
 
@@ -4,7 +4,7 @@ from flask import Blueprint
 from sqlalchemy import or_
 
 from newslynx.core import db
-from newslynx.models import Metric, Recipe, SousChef
+from newslynx.models import Metric, Recipe, SousChef, MetricCatalogCache
 from newslynx.models.util import (
     fetch_by_id_or_field, get_table_columns)
 from newslynx.lib.serialize import jsonify
@@ -16,6 +16,8 @@ from newslynx.lib.stats import parse_number
 # bp
 bp = Blueprint('metrics', __name__)
 
+metric_catalog_cache = MetricCatalogCache()
+
 
 @bp.route('/api/v1/metrics', methods=['GET'])
 @load_user
@@ -268,6 +270,7 @@ def update_metric(user, org, name_id):
     except Exception as e:
         raise RequestError("Error updating Metric: {}".format(e.message))
 
+    metric_catalog_cache.bump(org.id)
     return jsonify(m)
 
 
@@ -284,23 +287,28 @@ def delete_metric(user, org, name_id):
 
     # format for deleting metrics from metric store.
     cmd_fmt = "UPDATE {table} " + \
-              "SET metrics=json_del_keys(metrics, '{name}'::text);"\
+              "SET metrics=metrics - '{name}'::text;"\
               .format(name=m.name)
 
     # delete metric from metric stores.
     if 'timeseries' in m.content_levels:
         db.session.execute(cmd_fmt.format(table="content_metric_timeseries"))
+        db.session.execute(cmd_fmt.format(table="content_metric_rollup_day"))
+        db.session.execute(cmd_fmt.format(table="content_metric_rollup_month"))
 
     if 'summary' in m.content_levels:
         db.session.execute(cmd_fmt.format(table="content_metric_summary"))
 
     if 'timeseries' in m.org_levels:
         db.session.execute(cmd_fmt.format(table="org_metric_timeseries"))
+        db.session.execute(cmd_fmt.format(table="org_metric_rollup_day"))
+        db.session.execute(cmd_fmt.format(table="org_metric_rollup_month"))
 
     if 'summary' in m.org_levels:
         db.session.execute(cmd_fmt.format(table="org_metric_summary"))
 
     db.session.delete(m)
     db.session.commit()
+    metric_catalog_cache.bump(org.id)
 
     return delete_response()
@@ -6,14 +6,15 @@ from newslynx.views.decorators import load_user
 from newslynx.exc import NotFoundError, ForbiddenError
 from newslynx.models import Org
 from newslynx.lib.serialize import jsonify
-from newslynx.views.util import request_data
+from newslynx.views.util import request_data, request_bulk_data
 from newslynx.tasks import ingest_metric
 from newslynx.tasks import ingest_bulk
 from newslynx.tasks.query_metric import QueryOrgMetricTimeseries
 from newslynx.models.util import fetch_by_id_or_field
 from newslynx.views.util import (
-    arg_bool, arg_str, validate_ts_unit, localize,
-    url_for_job_status,  arg_list, arg_date, arg_int)
+    arg_bool, arg_str, validate_ts_unit, validate_ts_transform,
+    localize, url_for_job_status,  arg_list, arg_date, arg_int,
+    stream_response, wants_ndjson)
 
 # blueprint
 bp = Blueprint('org_metrics', __name__)
@@ -111,12 +112,15 @@ def get_org_timeseries(user, org_id_slug):
         rm_nulls=arg_bool('rm_nulls', default=False),
         time_since_start=arg_bool('time_since_start', default=False),
         transform=arg_str('transform', default=None),
+        window=arg_int('window', default=7),
         before=arg_date('before', default=None),
         after=arg_date('after', default=None)
     )
+    validate_ts_unit(kw['unit'])
+    validate_ts_transform(kw['transform'])
 
     q = QueryOrgMetricTimeseries(org, [org.id], **kw)
-    return jsonify(list(q.execute()))
+    return stream_response(q.execute(stream=True), ndjson=wants_ndjson())
 
 
 @bp.route('/api/v1/orgs/<org_id_slug>/timeseries', methods=['POST'])
@@ -167,7 +171,7 @@ def bulk_create_org_timeseries(user, org_id_slug):
         raise ForbiddenError(
             'You are not allowed to access this Org')
 
-    req_data = request_data()
+    req_data = request_bulk_data()
 
     job_id = ingest_bulk.org_timeseries(
         req_data,
@@ -2,7 +2,8 @@ from flask import Blueprint
 from slugify import slugify 
 
 from newslynx.core import db
-from newslynx.models import User, Org, SousChef, Recipe, Tag, Metric
+from newslynx.models import (
+    User, Org, SousChef, Recipe, Tag, Metric, MetricCatalogCache)
 from newslynx.models.util import fetch_by_id_or_field
 from newslynx.models import recipe_schema
 from newslynx.lib import mail
@@ -21,6 +22,8 @@ from newslynx import settings
 # bp
 bp = Blueprint('orgs', __name__)
 
+metric_catalog_cache = MetricCatalogCache()
+
 
 @bp.route('/api/v1/orgs', methods=['GET'])
 @load_user
@@ -110,6 +113,7 @@ def org_create(user):
                     **params)
                 db.session.add(m)
     db.session.commit()
+    metric_catalog_cache.bump(org.id)
     return jsonify(org)
 
 
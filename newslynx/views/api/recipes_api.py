@@ -7,7 +7,7 @@ from flask import Blueprint, Response, stream_with_context
 
 from newslynx.core import db
 from newslynx.exc import RequestError, ConflictError
-from newslynx.models import SousChef, Recipe, Metric
+from newslynx.models import SousChef, Recipe, Metric, MetricCatalogCache
 from newslynx.models import recipe_schema
 from newslynx.models.util import fetch_by_id_or_field
 from newslynx.lib.serialize import jsonify, obj_to_json
@@ -20,6 +20,8 @@ from newslynx.merlynne import Merlynne
 # blueprint
 bp = Blueprint('recipes', __name__)
 
+metric_catalog_cache = MetricCatalogCache()
+
 # utils
 
 
@@ -189,6 +191,8 @@ def create_recipe(user, org):
             .format(e.message)
         )
 
+    if 'metrics' in sc.creates:
+        metric_catalog_cache.bump(org.id)
     return jsonify(r)
 
 
@@ -244,6 +248,9 @@ def update_recipe(user, org, recipe_id):
     db.session.add(r)
     db.session.commit()
 
+    # metrics carry their recipe with them.
+    if 'metrics' in r.sous_chef.creates:
+        metric_catalog_cache.bump(org.id)
     return jsonify(r)
 
 
@@ -257,6 +264,7 @@ def delete_recipe(user, org, recipe_id):
         raise RequestError('Recipe with id/slug {} does not exist.'
                            .format(recipe_id))
     force = arg_bool('force', default=False)
+    creates_metrics = 'metrics' in r.sous_chef.creates
 
     if force:
         db.session.delete(r)
@@ -276,6 +284,8 @@ def delete_recipe(user, org, recipe_id):
     db.session.execute(cmd)
     db.session.commit()
 
+    if creates_metrics:
+        metric_catalog_cache.bump(org.id)
     return delete_response()
 
 
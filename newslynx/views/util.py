@@ -4,13 +4,13 @@ import math
 from urlparse import urljoin
 import re
 
-from flask import request, Response, url_for
+from flask import request, Response, url_for, stream_with_context
 from flask import Blueprint
 
 from newslynx.core import db
 from newslynx.exc import NotFoundError, RequestError
 from newslynx.lib import dates
-from newslynx.lib.serialize import json_to_obj, jsonify
+from newslynx.lib.serialize import json_to_obj, jsonify, obj_to_json
 from newslynx import settings
 from newslynx.models.util import get_table_columns
 from newslynx.constants import *
@@ -18,6 +18,12 @@ from newslynx.constants import *
 
 RE_HEX_CODE = re.compile(r'^#([A-Fa-f0-9]{6}|[A-Fa-f0-9]{3})$')
 
+NDJSON_MIMETYPES = [
+    'application/x-ndjson',
+    'application/x-jsonlines',
+    'application/jsonlines'
+]
+
 # Arguments
 
 
@@ -173,17 +179,35 @@ def request_data():
 
 def request_bulk_data():
     """
-    Fetch request data from jsonlines.
+    Fetch bulk request data as an iterator of objects.
+    Newline-delimited json is parsed incrementally off
+    the request stream, everything else must be a json list.
     """
-    data = request.get_json(silent=True)
-    if data is None:
+    if request.mimetype in NDJSON_MIMETYPES:
+        return _iter_ndjson(request.stream)
+
+    data = request_data()
+    if not isinstance(data, list):
+        raise RequestError(
+            "Bulk endpoints require a list of json objects."
+        )
+    return iter(data)
+
+
+def _iter_ndjson(stream):
+    """
+    Parse newline-delimited json one line at a time.
+    """
+    for i, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
         try:
-            data = json_to_obj(request.data)
-        except:
-            data = None
-    if data is None:
-        data = dict(request.form.items())
-    return data
+            yield json_to_obj(line)
+        except ValueError:
+            raise RequestError(
+                'Line {} of the request body is not valid json.'
+                .format(i))
 
 
 def listify_data_arg(name):
@@ -465,6 +489,16 @@ def validate_ts_unit(value):
             .format(value, METRIC_TS_UNITS))
 
 
+def validate_ts_transform(value):
+    """
+    check a timeseries transform.
+    """
+    if value and value not in METRIC_TS_TRANSFORMS:
+        raise RequestError(
+            "'{}' is not a valid timeseries transform. Choose from {}."
+            .format(value, METRIC_TS_TRANSFORMS))
+
+
 def validate_recipe_statuses(values):
     """
     Validate recipe statuses.
@@ -613,6 +647,38 @@ def delete_response():
     return r
 
 
+def wants_ndjson():
+    """
+    Whether the client would rather have newline-delimited json.
+    """
+    best = request.accept_mimetypes\
+        .best_match(['application/json'] + NDJSON_MIMETYPES)
+    return best in NDJSON_MIMETYPES
+
+
+def stream_response(rows, ndjson=False):
+    """
+    Stream an iterable of objects as a json array or as
+    newline-delimited json without holding them all in memory.
+    """
+    def generate():
+        if ndjson:
+            for row in rows:
+                yield obj_to_json(row) + "\n"
+        else:
+            yield "["
+            for i, row in enumerate(rows):
+                if i:
+                    yield ","
+                yield obj_to_json(row)
+            yield "]"
+
+    mimetype = 'application/json'
+    if ndjson:
+        mimetype = NDJSON_MIMETYPES[0]
+    return Response(stream_with_context(generate()), mimetype=mimetype)
+
+
 def error_response(name, err):
     """
     Return an empty response from a delete request
@@ -0,0 +1,91 @@
+import unittest
+from StringIO import StringIO
+
+from newslynx.core import rds
+from newslynx.exc import RequestError
+from newslynx.lib.serialize import obj_to_json
+from newslynx.tasks import ingest_bulk
+from newslynx.views.util import _iter_ndjson
+
+
+class RecordingQueue(object):
+
+    def __init__(self):
+        self.jobs = []
+
+    def enqueue(self, *args, **kw):
+        self.jobs.append((args, kw))
+
+
+class TestBulkNDJSON(unittest.TestCase):
+
+    def setUp(self):
+        self.q = RecordingQueue()
+
+        class Loader(ingest_bulk.ContentTimeseriesBulkLoader):
+            shard_size = 2
+            q = self.q
+
+        self.loader = Loader()
+
+    def stream(self, *lines):
+        return _iter_ndjson(StringIO('\n'.join(lines)))
+
+    def line(self, i):
+        return obj_to_json({
+            'content_item_id': i,
+            'datetime': '2001-01-01T05:00:00+00:00',
+            'metrics': {'twitter_shares': i}
+        })
+
+    def test_shards_stream(self):
+        data = self.stream(*[self.line(i) for i in range(5)])
+        job_id = self.loader.run(data, org_id=1)
+        assert(len(self.q.jobs) == 3)
+        status = ingest_bulk.status(job_id)
+        assert(status['shards'] == 3)
+        assert(status['status'] == 'queued')
+
+    def test_bad_line_queues_nothing(self):
+        lines = [self.line(i) for i in range(5)] + ['{not json']
+        try:
+            self.loader.run(self.stream(*lines), org_id=1)
+        except RequestError as e:
+            assert('Line 6' in e.message)
+        else:
+            assert False
+        assert(len(self.q.jobs) == 0)
+
+    def test_missing_key_queues_nothing(self):
+        lines = [self.line(i) for i in range(4)]
+        lines.append(obj_to_json({'metrics': {}}))
+        try:
+            self.loader.run(self.stream(*lines), org_id=1)
+        except RequestError:
+            pass
+        else:
+            assert False
+        assert(len(self.q.jobs) == 0)
+
+    def test_staged_keys_dropped_on_error(self):
+        before = set(rds.keys('rq:kwargs:*'))
+        lines = [self.line(i) for i in range(4)] + ['{not json']
+        try:
+            self.loader.run(self.stream(*lines), org_id=1)
+        except RequestError:
+            pass
+        after = set(rds.keys('rq:kwargs:*'))
+        assert(after - before == set())
+
+    def test_empty_stream(self):
+        try:
+            self.loader.run(self.stream('', ''), org_id=1)
+        except RequestError:
+            pass
+        else:
+            assert False
+        assert(len(self.q.jobs) == 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
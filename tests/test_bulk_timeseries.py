@@ -0,0 +1,75 @@
+import unittest
+from random import choice
+
+from newslynx.core import db
+from newslynx.models import Org
+from newslynx.tasks import ingest_metric
+
+
+class TestBulkContentTimeseries(unittest.TestCase):
+    org = Org.query.get(1)
+    datetime = '2001-01-01T05:00:00+00:00'
+
+    def setUp(self):
+        self.content_item_id = choice(list(self.org.content_item_ids))
+        self.clear()
+
+    def tearDown(self):
+        self.clear()
+
+    def clear(self):
+        db.session.execute(
+            """DELETE FROM content_metric_timeseries
+               WHERE content_item_id = {} AND datetime = '{}'
+            """.format(self.content_item_id, self.datetime))
+        db.session.commit()
+
+    def record(self, **metrics):
+        return {
+            'org_id': self.org.id,
+            'content_item_id': self.content_item_id,
+            'datetime': self.datetime,
+            'metrics': metrics
+        }
+
+    def metrics(self):
+        rows = db.session.execute(
+            """SELECT metrics FROM content_metric_timeseries
+               WHERE content_item_id = {} AND datetime = '{}'
+            """.format(self.content_item_id, self.datetime)).fetchall()
+        assert(len(rows) == 1)
+        return rows[0][0]
+
+    def test_coalesces_duplicate_buckets(self):
+        records = [
+            self.record(twitter_shares=1),
+            self.record(twitter_shares=2, facebook_shares=3)
+        ]
+        n = ingest_metric.bulk_content_timeseries(records)
+        db.session.commit()
+        assert(n == 1)
+        m = self.metrics()
+        assert(m['twitter_shares'] == 2)
+        assert(m['facebook_shares'] == 3)
+
+    def test_merges_into_existing_rows(self):
+        ingest_metric.bulk_content_timeseries(
+            [self.record(twitter_shares=1, facebook_shares=1)])
+        db.session.commit()
+        ingest_metric.bulk_content_timeseries(
+            [self.record(twitter_shares=5)])
+        db.session.commit()
+        m = self.metrics()
+        assert(m['twitter_shares'] == 5)
+        assert(m['facebook_shares'] == 1)
+
+    def test_batches(self):
+        records = [self.record(twitter_shares=i) for i in xrange(5)]
+        n = ingest_metric.bulk_content_timeseries(records, batch_size=2)
+        db.session.commit()
+        assert(n == 1)
+        assert(self.metrics()['twitter_shares'] == 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import unittest
+
+from newslynx.models.cache import Cache, ENTRY_FIELDS
+
+
+class CountingCache(Cache):
+    key_prefix = 'newslynx-test-entry-cache'
+    ttl = 60
+    calls = []
+
+    def work(self, x, y=None):
+        self.calls.append(x)
+        return {'x': x, 'y': y}
+
+
+class TestCacheEntries(unittest.TestCase):
+
+    def setUp(self):
+        CountingCache.calls = []
+        CountingCache.flush().join()
+        self.c = CountingCache()
+
+    def test_single_hash(self):
+        self.c.get(1)
+        key = self.c.format_key(1)
+        assert(self.c.redis.type(key) == 'hash')
+        entry = self.c.redis.hgetall(key)
+        assert(set(entry.keys()) == set(['value', 'last_modified', 'expires']))
+        assert(0 < self.c.redis.ttl(key) <= 60)
+
+    def test_get(self):
+        cr = self.c.get(1, y=2)
+        assert(not cr.is_cached)
+        assert(cr.value == {'x': 1, 'y': 2})
+        cr = self.c.get(1, y=2)
+        assert(cr.is_cached)
+        assert(cr.value == {'x': 1, 'y': 2})
+        assert(cr.last_modified is not None)
+        assert(CountingCache.calls == [1])
+
+    def test_get_many_order(self):
+        self.c.get(2)
+        res = self.c.get_many([3, 1, 2])
+        assert([r.value['x'] for r in res] == [3, 1, 2])
+        assert([r.is_cached for r in res] == [False, False, True])
+
+    def test_get_many_duplicates(self):
+        res = self.c.get_many([1, 1, 1])
+        assert(len(res) == 3)
+        assert(CountingCache.calls == [1])
+
+    def test_get_many_single_round_trip(self):
+        self.c.get_many([1, 2, 3])
+        pipes = []
+        pipeline = self.c.redis.pipeline
+
+        def counted(*args, **kw):
+            pipes.append(1)
+            return pipeline(*args, **kw)
+
+        self.c.redis.pipeline = counted
+        try:
+            res = self.c.get_many([1, 2, 3])
+        finally:
+            del self.c.redis.pipeline
+        assert(all([r.is_cached for r in res]))
+        assert(len(pipes) == 1)
+
+    def test_legacy_entries_are_misses(self):
+        key = self.c.format_key(1)
+        self.c.redis.set(key, 'old')
+        cr = self.c.get(1)
+        assert(not cr.is_cached)
+        assert(self.c.redis.type(key) == 'hash')
+
+    def test_fields(self):
+        assert(ENTRY_FIELDS == ('value', 'last_modified', 'expires', 'error'))
+
+
+if __name__ == '__main__':
+    unittest.main()
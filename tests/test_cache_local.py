@@ -0,0 +1,99 @@
+import unittest
+import time
+
+import gevent
+
+from newslynx.models import cache
+from newslynx.models.cache import Cache, LocalCache
+
+
+class CountingCache(Cache):
+    key_prefix = 'newslynx-test-local-cache'
+    local_size = 10
+    local_ttl = 60
+    calls = []
+
+    def work(self, x):
+        self.calls.append(x)
+        return {'x': x}
+
+
+class RedisOnlyCache(CountingCache):
+    key_prefix = 'newslynx-test-redis-cache'
+    local_size = 0
+
+
+class TestLocalCache(unittest.TestCase):
+
+    def test_lru(self):
+        lc = LocalCache(2, 60)
+        lc.set('a', 1)
+        lc.set('b', 2)
+        lc.get('a')
+        lc.set('c', 3)
+        assert(lc.get('a') == 1)
+        assert(lc.get('b') is None)
+        assert(lc.get('c') == 3)
+
+    def test_ttl(self):
+        lc = LocalCache(2, 0.01)
+        lc.set('a', 1)
+        time.sleep(0.02)
+        assert(lc.get('a') is None)
+
+    def test_drop(self):
+        lc = LocalCache(10, 60)
+        lc.set('x:1', 1)
+        lc.set('y:1', 1)
+        lc.drop('x:')
+        assert(lc.get('x:1') is None)
+        assert(lc.get('y:1') == 1)
+
+
+class TestCacheTiers(unittest.TestCase):
+
+    def setUp(self):
+        CountingCache.calls = []
+        CountingCache.flush().join()
+        RedisOnlyCache.flush().join()
+
+    def test_local_hit(self):
+        c = CountingCache()
+        c.get(1)
+        # gone from redis, but not from this process.
+        c.redis.delete(c.format_key(1))
+        cr = c.get(1)
+        assert(cr.is_cached)
+        assert(cr.value == {'x': 1})
+        assert(CountingCache.calls == [1])
+
+    def test_invalidate_drops_local(self):
+        c = CountingCache()
+        c.get(1)
+        c.invalidate(1)
+        # let the listener pick up the message.
+        gevent.sleep(0.1)
+        assert(c.local.get(c.format_key(1)) is None)
+        c.get(1)
+        assert(CountingCache.calls == [1, 1])
+
+    def test_debug_skips_local(self):
+        c = CountingCache(debug=True)
+        assert(c.local is None)
+
+    def test_no_listener_without_local_tier(self):
+        cache._listener['pid'] = None
+        c = RedisOnlyCache()
+        assert(c.local is None)
+        c.get(1)
+        c.namespace()
+        assert(cache._listener['pid'] is None)
+
+    def test_listener_with_local_tier(self):
+        cache._listener['pid'] = None
+        CountingCache().get(1)
+        assert(cache._listener['pid'] is not None)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+import unittest
+import time
+
+from newslynx.models.cache import Cache
+
+
+class CountingRedis(object):
+
+    """
+    Count GETs made through a redis client.
+    """
+
+    def __init__(self, redis):
+        self._redis = redis
+        self.gets = 0
+
+    def get(self, key):
+        self.gets += 1
+        return self._redis.get(key)
+
+    def __getattr__(self, attr):
+        return getattr(self._redis, attr)
+
+
+class CountingCache(Cache):
+    key_prefix = 'newslynx-test-namespace-cache'
+    ttl = 60
+    calls = []
+
+    def work(self, x):
+        self.calls.append(x)
+        return {'x': x}
+
+
+class LocalCountingCache(CountingCache):
+    key_prefix = 'newslynx-test-namespace-local-cache'
+    local_size = 10
+
+
+class ShortLocalCache(LocalCountingCache):
+    key_prefix = 'newslynx-test-namespace-short-local-cache'
+    local_ttl = 0.1
+
+
+class TestCacheNamespace(unittest.TestCase):
+
+    def setUp(self):
+        CountingCache.calls = []
+        CountingCache.flush().join()
+        LocalCountingCache.flush().join()
+
+    def test_keys_embed_namespace(self):
+        c = CountingCache()
+        v = c.namespace()
+        assert(c.format_key(1).startswith(
+            '{}:v{}:'.format(c.key_prefix, v)))
+
+    def test_flush_moves_namespace(self):
+        c = CountingCache()
+        v = c.namespace()
+        key = c.format_key(1)
+        CountingCache.flush().join()
+        assert(c.namespace() == v + 1)
+        assert(c.format_key(1) != key)
+
+    def test_namespace_once_per_call(self):
+        c = CountingCache()
+        c.get_many([1, 2, 3])
+        redis = CountingCache.redis
+        CountingCache.redis = CountingRedis(redis)
+        try:
+            c.get_many([1, 2, 3])
+            assert(CountingCache.redis.gets == 1)
+            c.get(1)
+            assert(CountingCache.redis.gets == 2)
+        finally:
+            CountingCache.redis = redis
+
+    def test_local_namespace_expires(self):
+        c = ShortLocalCache()
+        v = c.namespace()
+        # a flush this process never heard about.
+        c.redis.incr('{}:namespace'.format(c.key_prefix))
+        assert(c.namespace() == v)
+        time.sleep(0.15)
+        assert(c.namespace() == v + 1)
+
+    def test_flush_misses(self):
+        c = CountingCache()
+        c.get(1)
+        CountingCache.flush().join()
+        assert(not c.get(1).is_cached)
+        assert(CountingCache.calls == [1, 1])
+
+    def test_flush_drops_local(self):
+        c = LocalCountingCache()
+        c.get(1)
+        LocalCountingCache.flush().join()
+        assert(not c.get(1).is_cached)
+
+    def test_reap(self):
+        c = CountingCache()
+        c.get(1)
+        c.get(2)
+        old = [c.format_key(1), c.format_key(2)]
+        n = CountingCache.flush().get()
+        assert(n >= 2)
+        assert(not any([c.redis.exists(k) for k in old]))
+
+    def test_reap_keeps_current(self):
+        c = CountingCache()
+        CountingCache.flush().join()
+        c.get(1)
+        CountingCache.reap()
+        assert(c.get(1).is_cached)
+
+    def test_reap_legacy_keys(self):
+        c = CountingCache()
+        legacy = '{}:{}'.format(c.key_prefix, 'a' * 32)
+        c.redis.set(legacy, 'old')
+        CountingCache.reap()
+        assert(not c.redis.exists(legacy))
+
+
+if __name__ == '__main__':
+    unittest.main()
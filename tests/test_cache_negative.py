@@ -0,0 +1,74 @@
+import unittest
+import time
+
+from newslynx.models.cache import Cache
+from newslynx.models import ExtractCache, URLCache, ThumbnailCache
+
+
+class FlakyCache(Cache):
+    key_prefix = 'newslynx-test-negative-cache'
+    ttl = 60
+    negative_ttl = 1
+    negative_reason = 'test_failed'
+    results = []
+    calls = []
+
+    def work(self, x):
+        self.calls.append(x)
+        return self.results.pop(0)
+
+
+class TestNegativeCache(unittest.TestCase):
+
+    def setUp(self):
+        FlakyCache.calls = []
+        FlakyCache.flush().join()
+        self.c = FlakyCache()
+
+    def test_failure_is_remembered(self):
+        FlakyCache.results = [None, {'ok': True}]
+        cr = self.c.get(1)
+        assert(cr.value is None)
+        assert(cr.error == 'test_failed')
+        cr = self.c.get(1)
+        assert(cr.is_cached)
+        assert(cr.value is None)
+        assert(cr.error == 'test_failed')
+        assert(FlakyCache.calls == [1])
+
+    def test_failure_expires(self):
+        FlakyCache.results = [None, {'ok': True}]
+        self.c.get(1)
+        time.sleep(1.1)
+        cr = self.c.get(1)
+        assert(cr.value == {'ok': True})
+        assert(cr.error is None)
+
+    def test_retry_failed(self):
+        FlakyCache.results = [None, {'ok': True}]
+        self.c.get(1)
+        cr = self.c.get(1, retry_failed=True)
+        assert(cr.value == {'ok': True})
+        assert(self.c.get(1).is_cached)
+        assert(FlakyCache.calls == [1, 1])
+
+    def test_no_negative_ttl(self):
+        class Uncached(FlakyCache):
+            key_prefix = 'newslynx-test-uncached-negative-cache'
+            negative_ttl = 0
+        Uncached.results = [None, None]
+        c = Uncached()
+        c.get(1)
+        c.get(1)
+        assert(FlakyCache.calls == [1, 1])
+
+    def test_reasons(self):
+        assert(ExtractCache.negative_reason == 'extract_failed')
+        assert(URLCache.negative_reason == 'canonicalize_failed')
+        assert(ThumbnailCache.negative_reason == 'thumbnail_failed')
+        for cls in [ExtractCache, URLCache, ThumbnailCache]:
+            assert(cls.negative_ttl > 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import unittest
+
+import gevent
+
+from newslynx.models.cache import Cache
+
+
+class SlowCache(Cache):
+    key_prefix = 'newslynx-test-single-flight-cache'
+    ttl = 60
+    stale_ttl = 60
+    single_flight = True
+    lock_wait = 5
+    calls = []
+
+    def work(self, x):
+        self.calls.append(x)
+        gevent.sleep(0.2)
+        return {'x': x, 'n': len(self.calls)}
+
+
+class TestSingleFlight(unittest.TestCase):
+
+    def setUp(self):
+        SlowCache.calls = []
+        SlowCache.flush().join()
+        self.c = SlowCache()
+
+    def test_one_caller_works(self):
+        jobs = [gevent.spawn(self.c.get, 1) for _ in range(10)]
+        gevent.joinall(jobs)
+        assert(SlowCache.calls == [1])
+        assert(all([j.value.value == {'x': 1, 'n': 1} for j in jobs]))
+
+    def test_lock_is_released(self):
+        self.c.get(1)
+        lock_key = "{}:lock".format(self.c.format_key(1))
+        assert(not self.c.redis.exists(lock_key))
+
+    def test_stale_while_refreshing(self):
+        self.c.get(1)
+        self.c.invalidate(1)
+        # the first caller refreshes, the rest get the stale value.
+        winner = gevent.spawn(self.c.get, 1)
+        gevent.sleep(0.05)
+        cr = self.c.get(1)
+        assert(cr.is_cached)
+        assert(cr.value['n'] == 1)
+        assert(winner.get().value['n'] == 2)
+
+    def test_waits_without_stale(self):
+        winner = gevent.spawn(self.c.get, 1)
+        gevent.sleep(0.05)
+        cr = self.c.get(1)
+        assert(cr.value == winner.get().value)
+        assert(SlowCache.calls == [1])
+
+    def test_debug_skips_lock(self):
+        c = SlowCache(debug=True)
+        jobs = [gevent.spawn(c.get, 1) for _ in range(3)]
+        gevent.joinall(jobs)
+        assert(len(SlowCache.calls) == 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
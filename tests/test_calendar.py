@@ -0,0 +1,72 @@
+import unittest
+from random import sample
+
+from newslynx.core import db
+from newslynx.models import Org
+from newslynx.tasks import ingest_metric
+
+
+class TestMetricCalendar(unittest.TestCase):
+    org = Org.query.get(1)
+
+    def setUp(self):
+        self.ids = sample(list(self.org.content_item_ids), 2)
+        self.clear()
+        records = []
+        for i, (day, hour) in zip(self.ids, [(1, 5), (3, 7)]):
+            for d in [day, day + 3]:
+                records.append({
+                    'org_id': self.org.id,
+                    'content_item_id': i,
+                    'datetime': '2001-01-0{}T{:02d}:00:00+00:00'.format(d, hour),
+                    'metrics': {'twitter_shares': d}
+                })
+        ingest_metric.bulk_content_timeseries(records)
+        db.session.commit()
+
+    def tearDown(self):
+        self.clear()
+
+    def clear(self):
+        db.session.execute(
+            """DELETE FROM content_metric_timeseries
+               WHERE content_item_id IN ({}) AND datetime < '2002-01-01'
+            """.format(", ".join(map(str, self.ids))))
+        db.session.commit()
+
+    def calendar(self, unit):
+        return db.session.execute(
+            """SELECT content_item_id, datetime
+               FROM content_metric_calendar(
+                    '1 {}s', ARRAY[{}], '2001-01-01', '2001-12-31')
+            """.format(unit, ", ".join(map(str, self.ids)))).fetchall()
+
+    def test_days(self):
+        rows = self.calendar('day')
+        for i, day in zip(self.ids, [1, 3]):
+            days = [r[1] for r in rows if r[0] == i]
+            assert(len(days) == 4)
+            assert(days[0].day == day)
+            assert(all([d.hour == 0 for d in days]))
+
+    def test_hours(self):
+        rows = self.calendar('hour')
+        for i in self.ids:
+            hours = [r[1] for r in rows if r[0] == i]
+            assert(len(hours) == 3 * 24 + 1)
+
+    def test_ordered(self):
+        rows = self.calendar('day')
+        assert(rows == sorted(rows))
+
+    def test_bounds(self):
+        rows = db.session.execute(
+            """SELECT content_item_id, datetime
+               FROM content_metric_calendar(
+                    '1 days', ARRAY[{}], '2001-01-02', '2001-01-03')
+            """.format(self.ids[0])).fetchall()
+        assert(rows == [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import unittest
+
+import gevent
+
+from newslynx.core import gen_session
+from newslynx import settings
+from newslynx.models import Org
+from newslynx.models import compare_cache
+from newslynx.models.compare_cache import (
+    AllContentComparisonCache, ContentTypeComparisonCache,
+    ComparisonsCache)
+
+
+class TestComparisonCache(unittest.TestCase):
+    org = Org.query.get(1)
+
+    def test_pool_size(self):
+        assert(compare_cache.facet_pool.size == settings.COMPARISON_POOL_SIZE)
+
+    def test_sessions_are_utc(self):
+        timezones = []
+        comparison = compare_cache.ContentComparison
+
+        class Recording(comparison):
+            def fingerprint(self, session=None):
+                timezones.append(session.execute('SHOW TIMEZONE').scalar())
+                return comparison.fingerprint(self, session=session)
+
+        compare_cache.ContentComparison = Recording
+        try:
+            cache = AllContentComparisonCache()
+            cache.debug = True
+            cache.compare(self.org, 'all')
+        finally:
+            compare_cache.ContentComparison = comparison
+        assert(timezones == ['UTC'])
+
+    def test_concurrent_sessions(self):
+        # wrap compare to count sessions held at once.
+        state = {'active': 0, 'max': 0}
+        compare = compare_cache.ComparisonCache.__dict__['compare']
+
+        def counted(cache, org, facet, **kw):
+            state['active'] += 1
+            state['max'] = max(state['max'], state['active'])
+            try:
+                gevent.sleep(0.01)
+                return compare(cache, org, facet, **kw)
+            finally:
+                state['active'] -= 1
+
+        compare_cache.ComparisonCache.compare = counted
+        try:
+            cache = ComparisonsCache()
+            cache.debug = True
+            cache.get(self.org.id)
+        finally:
+            compare_cache.ComparisonCache.compare = compare
+        assert(state['max'] <= compare_cache.facet_pool.size)
+
+    def test_ids_use_the_passed_session(self):
+        session = gen_session()
+        try:
+            cache = ContentTypeComparisonCache()
+            for facet in cache.get_facets(self.org):
+                ids = cache.get_content_item_ids(self.org, facet, session)
+                assert(len(ids))
+        finally:
+            session.remove()
+
+    def test_facets_are_reused(self):
+        cache = AllContentComparisonCache()
+        first = cache.work(self.org.id)
+        key = cache.facet_key(self.org.id, 'all')
+        assert(cache.redis.get(key) is not None)
+        assert(cache.work(self.org.id) == first)
+
+    def test_every_type(self):
+        cr = ComparisonsCache().get(self.org.id)
+        for name in ['all', 'types', 'subject_tags', 'impact_tags']:
+            assert(name in cr.value)
+
+
+if __name__ == '__main__':
+    unittest.main()
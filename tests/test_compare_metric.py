@@ -0,0 +1,94 @@
+import unittest
+
+from newslynx.core import db
+from newslynx.models import Org
+from newslynx.tasks.compare_metric import ContentComparison
+
+
+def percentile(values, per):
+    """
+    Linear interpolation, like percentile_cont.
+    """
+    values = sorted(values)
+    if not len(values):
+        return None
+    k = (len(values) - 1) * per / 100.0
+    f = int(k)
+    if f + 1 >= len(values):
+        return values[f]
+    return values[f] + (values[f + 1] - values[f]) * (k - f)
+
+
+class TestContentComparison(unittest.TestCase):
+    org = Org.query.get(1)
+
+    def setUp(self):
+        self.ids = list(self.org.content_item_ids)
+
+    def values(self, metric):
+        rows = db.session.execute(
+            """SELECT (metrics ->> '{}')::numeric
+               FROM content_metric_summary
+               WHERE content_item_id IN ({})
+            """.format(metric, ", ".join(map(str, self.ids)))).fetchall()
+        return [float(r[0]) for r in rows if r[0] is not None]
+
+    def results(self, **kw):
+        c = ContentComparison(self.org, self.ids, **kw)
+        return {r['metric']: r for r in c.execute()}
+
+    def close(self, a, b):
+        if a is None or b is None:
+            return a == b
+        return abs(float(a) - b) <= 0.01
+
+    def test_every_metric(self):
+        res = self.results()
+        assert(set(res.keys()) ==
+               set(self.org.content_metric_comparisons.keys()))
+
+    def test_summary_stats(self):
+        res = self.results()
+        for metric, r in res.items():
+            values = self.values(metric)
+            if not len(values):
+                assert(r['mean'] is None)
+                continue
+            assert(self.close(r['mean'], sum(values) / len(values)))
+            assert(self.close(r['min'], min(values)))
+            assert(self.close(r['max'], max(values)))
+            assert(self.close(r['median'], percentile(values, 50)))
+
+    def test_percentiles_skip_zeros(self):
+        res = self.results(percentiles=[25, 75])
+        for metric, r in res.items():
+            values = self.values(metric)
+            non_zero = [v for v in values if v != 0]
+            if not len(values):
+                assert(r['per_25'] is None)
+            elif not len(non_zero):
+                assert(r['per_25'] == 0)
+            else:
+                assert(self.close(r['per_25'], percentile(non_zero, 25)))
+                assert(self.close(r['per_75'], percentile(non_zero, 75)))
+
+    def test_rm_null_keeps_zeros(self):
+        res = self.results(rm_null=True)
+        for metric, r in res.items():
+            values = self.values(metric)
+            if not len(values):
+                assert(r['min'] is None)
+                continue
+            assert(self.close(r['min'], min(values)))
+            assert(self.close(r['mean'], sum(values) / len(values)))
+            assert(self.close(r['median'], percentile(values, 50)))
+
+    def test_rm_null_plan_key(self):
+        c1 = ContentComparison(self.org, self.ids)
+        c2 = ContentComparison(self.org, self.ids, rm_null=True)
+        assert(c1.plan_key != c2.plan_key)
+        assert(c1.queries != c2.queries)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import unittest
+from random import choice
+
+from newslynx.exc import RequestError
+from newslynx.models import Org
+from newslynx.tasks import ingest_metric
+
+
+class TestContentItemMembership(unittest.TestCase):
+    org = Org.query.get(1)
+
+    def setUp(self):
+        self.ids = set(self.org.content_item_ids)
+        self.lookup = self.org.content_timeseries_metrics
+
+    def record(self, content_item_id):
+        return {
+            'content_item_id': content_item_id,
+            'datetime': '2001-01-01T05:00:00+00:00',
+            'twitter_shares': 1
+        }
+
+    def test_content_item_ids(self):
+        ids = self.org.content_item_ids
+        assert(len(ids) == len(self.org.content_items))
+        assert(set(ids) == set(c.id for c in self.org.content_items))
+
+    def test_member(self):
+        content_item_id = choice(list(self.ids))
+        r = ingest_metric.content_timeseries_record(
+            self.record(content_item_id),
+            org_id=self.org.id,
+            metrics_lookup=self.lookup,
+            content_item_ids=self.ids)
+        assert(r['content_item_id'] == content_item_id)
+
+    def test_non_member(self):
+        content_item_id = max(self.ids) + 1
+        try:
+            ingest_metric.content_timeseries_record(
+                self.record(content_item_id),
+                org_id=self.org.id,
+                metrics_lookup=self.lookup,
+                content_item_ids=self.ids)
+        except RequestError as e:
+            assert(str(content_item_id) in e.message)
+        else:
+            assert False
+
+    def test_check_skipped_without_ids(self):
+        content_item_id = max(self.ids) + 1
+        r = ingest_metric.content_timeseries_record(
+            self.record(content_item_id),
+            org_id=self.org.id,
+            metrics_lookup=self.lookup)
+        assert(r['content_item_id'] == content_item_id)
+
+
+if __name__ == '__main__':
+    unittest.main()
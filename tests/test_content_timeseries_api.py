@@ -0,0 +1,53 @@
+import unittest
+from random import sample
+
+from newslynx.client import API
+from newslynx.models import Org, ContentItem, Tag
+
+
+class TestListContentTimeseries(unittest.TestCase):
+    org = Org.query.get(1)
+    api = API(org=1)
+
+    def ids(self, rows):
+        return set([r['content_item_id'] for r in rows])
+
+    def test_ids(self):
+        ids = sample(list(self.org.content_item_ids), 3)
+        rows = self.api.content.list_timeseries(
+            ids=",".join(map(str, ids)), unit='day')
+        assert(self.ids(rows).issubset(set(ids)))
+
+    def test_foreign_ids_are_ignored(self):
+        rows = self.api.content.list_timeseries(ids='999999999', unit='day')
+        assert(rows == [])
+
+    def test_subject_tag_filter(self):
+        tag = Tag.query.filter_by(org_id=self.org.id, type='subject').first()
+        tagged = set([
+            c.id for c in ContentItem.query.filter_by(org_id=self.org.id)
+            if tag.id in c.subject_tag_ids])
+        rows = self.api.content.list_timeseries(
+            subject_tag_ids=tag.id, unit='day')
+        assert(self.ids(rows).issubset(tagged))
+        rows = self.api.content.list_timeseries(
+            subject_tag_ids='!{}'.format(tag.id), unit='day')
+        assert(not len(self.ids(rows) & tagged))
+
+    def test_group_by_id(self):
+        ids = sample(list(self.org.content_item_ids), 3)
+        rows = self.api.content.list_timeseries(
+            ids=",".join(map(str, ids)), unit='day', group_by_id=False)
+        assert(all(['content_item_id' not in r for r in rows]))
+
+    def test_invalid_unit(self):
+        try:
+            self.api.content.list_timeseries(unit='fortnight')
+        except Exception as e:
+            assert('fortnight' in e.message)
+        else:
+            assert False
+
+
+if __name__ == '__main__':
+    unittest.main()
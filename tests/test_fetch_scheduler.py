@@ -0,0 +1,155 @@
+import gevent
+import gevent.monkey
+gevent.monkey.patch_all()
+
+import unittest
+import time
+
+from newslynx.lib.network import TokenBucket, FetchScheduler, host_key
+
+
+class TestTokenBucket(unittest.TestCase):
+
+    def test_burst(self):
+        b = TokenBucket(rate=1, capacity=3)
+        assert([b.take() for _ in range(3)] == [0, 0, 0])
+        assert(b.take() > 0)
+
+    def test_refill(self):
+        b = TokenBucket(rate=100, capacity=1)
+        assert(b.take() == 0)
+        wait = b.take()
+        assert(0 < wait <= 0.01)
+        time.sleep(wait + 0.005)
+        assert(b.take() == 0)
+
+    def test_full(self):
+        b = TokenBucket(rate=100, capacity=1)
+        assert(b.full)
+        b.take()
+        assert(not b.full)
+        time.sleep(0.02)
+        assert(b.full)
+
+
+class TestFetchScheduler(unittest.TestCase):
+
+    def fetch(self, scheduler, url, log, hold=0.02):
+        with scheduler.slot(url):
+            log.append((host_key(url), time.time()))
+            gevent.sleep(hold)
+
+    def test_host_key(self):
+        assert(host_key('http://www.Example.com:80/a') == 'example.com')
+        assert(host_key('https://example.com/b') == 'example.com')
+
+    def test_max_per_host(self):
+        s = FetchScheduler(max_per_host=2, max_concurrency=10,
+                           rate=1000, burst=1000)
+        state = {'max': 0}
+
+        def fetch():
+            with s.slot('http://example.com/'):
+                state['max'] = max(state['max'], s.active['example.com'])
+                gevent.sleep(0.02)
+
+        gevent.joinall([gevent.spawn(fetch) for _ in range(6)])
+        assert(state['max'] == 2)
+        assert(not len(s.active))
+        assert(s.waiting == 0)
+
+    def test_max_concurrency(self):
+        s = FetchScheduler(max_per_host=10, max_concurrency=3,
+                           rate=1000, burst=1000)
+        state = {'max': 0}
+
+        def fetch(i):
+            with s.slot('http://{}.com/'.format(i)):
+                state['max'] = max(state['max'], sum(s.active.values()))
+                gevent.sleep(0.02)
+
+        gevent.joinall([gevent.spawn(fetch, i) for i in range(9)])
+        assert(state['max'] == 3)
+
+    def test_rate_limit(self):
+        s = FetchScheduler(max_per_host=10, max_concurrency=10,
+                           rate=20, burst=1)
+        log = []
+        start = time.time()
+        gevent.joinall([
+            gevent.spawn(self.fetch, s, 'http://example.com/', log, 0)
+            for _ in range(4)])
+        # one from the burst, then one every 50ms.
+        assert(time.time() - start >= 0.14)
+        assert(len(log) == 4)
+
+    def test_fair_turns(self):
+        s = FetchScheduler(max_per_host=1, max_concurrency=1,
+                           rate=1000, burst=1000)
+        log = []
+        jobs = [gevent.spawn(self.fetch, s, 'http://big.com/', log)
+                for _ in range(5)]
+        jobs.append(gevent.spawn(self.fetch, s, 'http://small.com/', log))
+        gevent.joinall(jobs)
+        hosts = [h for h, _ in log]
+        # small.com doesn't wait behind all of big.com.
+        assert(hosts.index('small.com') <= 2)
+
+    def test_killed_while_waiting(self):
+        s = FetchScheduler(max_per_host=1, max_concurrency=1,
+                           rate=1000, burst=1000)
+        log = []
+        first = gevent.spawn(self.fetch, s, 'http://example.com/', log, 0.05)
+        waiting = gevent.spawn(self.fetch, s, 'http://example.com/', log)
+        gevent.sleep(0.01)
+        waiting.kill()
+        first.join()
+        assert(len(log) == 1)
+        assert(s.waiting == 0)
+        assert(not len(s.active))
+
+    def test_prune_idle_buckets(self):
+        s = FetchScheduler(max_per_host=10, max_concurrency=10,
+                           rate=100, burst=1)
+        log = []
+        self.fetch(s, 'http://idle.com/', log, 0)
+        with s.slot('http://busy.com/'):
+            time.sleep(0.02)
+            s.prune(every=0)
+            assert('idle.com' not in s.buckets)
+            assert('busy.com' in s.buckets)
+
+    def test_prune_keeps_draining_buckets(self):
+        s = FetchScheduler(max_per_host=10, max_concurrency=10,
+                           rate=1, burst=1)
+        self.fetch(s, 'http://example.com/', [], 0)
+        s.prune(every=0)
+        assert('example.com' in s.buckets)
+
+    def test_earlier_wait_reschedules(self):
+        s = FetchScheduler()
+        s.schedule(10)
+        late = s.timer
+        s.schedule(0.01)
+        assert(late.dead)
+        gevent.sleep(0.05)
+        assert(s.timer.ready())
+        s.schedule(10)
+        s.schedule(20)
+        assert(s.timer_due - time.time() < 11)
+        s.timer.kill()
+
+    def test_rate_limited_host_is_woken(self):
+        s = FetchScheduler(max_per_host=10, max_concurrency=10,
+                           rate=100, burst=1)
+        log = []
+        start = time.time()
+        gevent.joinall([
+            gevent.spawn(self.fetch, s, 'http://example.com/', log, 0)
+            for _ in range(3)], timeout=1)
+        assert(len(log) == 3)
+        assert(time.time() - start < 0.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
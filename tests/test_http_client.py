@@ -0,0 +1,82 @@
+import gevent
+import gevent.monkey
+gevent.monkey.patch_all()
+
+import unittest
+import os
+
+from gevent.pywsgi import WSGIServer
+
+from newslynx.lib import network
+
+
+class TestHTTPClient(unittest.TestCase):
+
+    def setUp(self):
+        self.state = {'active': 0, 'max': 0, 'cookies': []}
+
+        def app(environ, start_response):
+            self.state['active'] += 1
+            self.state['max'] = max(self.state['max'], self.state['active'])
+            self.state['cookies'].append(environ.get('HTTP_COOKIE'))
+            gevent.sleep(0.05)
+            self.state['active'] -= 1
+            start_response('200 OK', [
+                ('Content-Type', 'text/html'),
+                ('Set-Cookie', 'session=abc')])
+            return ['<html></html>']
+
+        self.server = WSGIServer(('127.0.0.1', 0), app, log=None)
+        self.server.start()
+        self.url = 'http://127.0.0.1:{}/'.format(self.server.server_port)
+        self.client = network.HTTPClient(max_per_host=2, max_concurrency=10)
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_reuses_connections(self):
+        for _ in range(5):
+            r = self.client.request('GET', self.url)
+            assert(r.status_code == 200)
+        stats = self.client.stats()
+        assert(stats['requests'] == 5)
+        assert(stats['pooled_hosts'] == 1)
+        assert(stats['connections_reused'] >= 4)
+
+    def test_no_cookies_between_requests(self):
+        self.client.request('GET', self.url)
+        self.client.request('GET', self.url)
+        assert(self.state['cookies'] == [None, None])
+
+    def test_max_per_host(self):
+        jobs = [gevent.spawn(self.client.request, 'GET', self.url)
+                for _ in range(6)]
+        gevent.joinall(jobs)
+        assert(all([j.value.status_code == 200 for j in jobs]))
+        assert(self.state['max'] <= 2)
+        assert(self.client.stats()['active'] == 0)
+
+    def test_errors_are_counted(self):
+        try:
+            self.client.request('GET', 'http://127.0.0.1:1/')
+        except Exception:
+            pass
+        stats = self.client.stats()
+        assert(stats['errors'] == 1)
+        assert(stats['active'] == 0)
+
+    def test_reset_after_fork(self):
+        session = self.client.session
+        self.client.pid = os.getpid() + 1
+        self.client.request('GET', self.url)
+        assert(self.client.session is not session)
+        assert(self.client.pid == os.getpid())
+
+    def test_module_client(self):
+        r = network.request('GET', self.url)
+        assert(r.status_code == 200)
+        assert(network.stats()['requests'] >= 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
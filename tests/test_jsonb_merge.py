@@ -0,0 +1,41 @@
+import unittest
+
+from newslynx.core import db
+
+
+class TestJsonbMerge(unittest.TestCase):
+
+    def merge(self, left, right, fx='jsonb_merge', cast='jsonb'):
+        q = "SELECT {0}({1}, {2})".format(
+            fx,
+            "NULL" if left is None else "'{}'::{}".format(left, cast),
+            "NULL" if right is None else "'{}'::{}".format(right, cast))
+        return db.session.execute(q).scalar()
+
+    def test_right_wins(self):
+        m = self.merge('{"a": 1, "b": 2}', '{"b": 3, "c": 4}')
+        assert(m == {'a': 1, 'b': 3, 'c': 4})
+
+    def test_nulls(self):
+        assert(self.merge(None, '{"a": 1}') == {'a': 1})
+        assert(self.merge('{"a": 1}', None) == {'a': 1})
+        assert(self.merge(None, None) == {})
+
+    def test_json_wrapper(self):
+        m = self.merge('{"a": 1}', '{"a": 2}', fx='json_merge', cast='json')
+        assert(m == {'a': 2})
+
+    def test_metric_columns_are_jsonb(self):
+        rows = db.session.execute(
+            """SELECT table_name, data_type FROM information_schema.columns
+               WHERE column_name = 'metrics' AND table_name IN (
+                    'content_metric_timeseries', 'content_metric_summary',
+                    'org_metric_timeseries', 'org_metric_summary')
+            """).fetchall()
+        assert(len(rows) == 4)
+        for table, data_type in rows:
+            assert(data_type == 'jsonb')
+
+
+if __name__ == '__main__':
+    unittest.main()
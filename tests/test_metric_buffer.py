@@ -0,0 +1,108 @@
+import unittest
+from random import choice
+
+from newslynx.core import db, rds
+from newslynx.models import Org
+from newslynx.tasks import buffer_metric, ingest_metric
+
+
+class TestMetricBuffer(unittest.TestCase):
+    org = Org.query.get(1)
+    datetime = '2001-01-01T05:00:00+00:00'
+
+    def setUp(self):
+        self.content_item_id = choice(list(self.org.content_item_ids))
+        self.clear()
+
+    def tearDown(self):
+        self.clear()
+
+    def clear(self):
+        rds.delete(buffer_metric._bucket_key(self.record()))
+        rds.srem(buffer_metric.PENDING_KEY,
+                 buffer_metric._bucket_key(self.record()))
+        db.session.execute(
+            """DELETE FROM content_metric_timeseries
+               WHERE content_item_id = {} AND datetime = '{}'
+            """.format(self.content_item_id, self.datetime))
+        db.session.commit()
+
+    def record(self, **metrics):
+        return {
+            'org_id': self.org.id,
+            'content_item_id': self.content_item_id,
+            'datetime': self.datetime,
+            'metrics': metrics
+        }
+
+    def buffered(self):
+        key = buffer_metric._bucket_key(self.record())
+        return rds.hgetall(key)
+
+    def test_coalesces_in_redis(self):
+        buffer_metric.content_timeseries([
+            self.record(twitter_shares=1),
+            self.record(twitter_shares=2, facebook_shares=3)
+        ])
+        b = self.buffered()
+        assert(b['twitter_shares'] == '2')
+        assert(b['facebook_shares'] == '3')
+        key = buffer_metric._bucket_key(self.record())
+        assert(rds.sismember(buffer_metric.PENDING_KEY, key))
+
+    def test_flush(self):
+        buffer_metric.content_timeseries([
+            self.record(twitter_shares=4)])
+        assert(buffer_metric.flush() >= 1)
+        assert(self.buffered() == {})
+        rows = db.session.execute(
+            """SELECT metrics FROM content_metric_timeseries
+               WHERE content_item_id = {} AND datetime = '{}'
+            """.format(self.content_item_id, self.datetime)).fetchall()
+        assert(rows[0][0]['twitter_shares'] == 4)
+
+    def test_failed_flush_keeps_newer_values(self):
+        buffer_metric.content_timeseries([
+            self.record(twitter_shares=1, facebook_shares=1)])
+
+        # buffer a newer value while the write is in flight.
+        def fail(records, session=None):
+            buffer_metric.content_timeseries([
+                self.record(twitter_shares=5)])
+            raise Exception('boom')
+
+        bulk = ingest_metric.bulk_content_timeseries
+        ingest_metric.bulk_content_timeseries = fail
+        try:
+            buffer_metric.flush()
+        except Exception:
+            pass
+        else:
+            assert False
+        finally:
+            ingest_metric.bulk_content_timeseries = bulk
+
+        b = self.buffered()
+        assert(b['twitter_shares'] == '5')
+        assert(b['facebook_shares'] == '1')
+        key = buffer_metric._bucket_key(self.record())
+        assert(rds.sismember(buffer_metric.PENDING_KEY, key))
+
+    def test_flusher_survives_errors(self):
+        buffer_metric.content_timeseries([
+            self.record(twitter_shares=1)])
+        bulk = ingest_metric.bulk_content_timeseries
+
+        def fail(records, session=None):
+            raise Exception('boom')
+
+        ingest_metric.bulk_content_timeseries = fail
+        try:
+            assert(buffer_metric.MetricBufferFlusher().flush() == 0)
+        finally:
+            ingest_metric.bulk_content_timeseries = bulk
+        assert(self.buffered()['twitter_shares'] == '1')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import unittest
+
+import gevent
+
+from newslynx.client import API
+from newslynx.models import Org
+from newslynx.models.org import metric_catalog_cache
+from newslynx.models.metric_catalog import build_catalog, MetricCatalogCache
+
+
+class NoRedis(object):
+
+    """
+    Fail on any redis call.
+    """
+
+    def __getattr__(self, attr):
+        raise AssertionError('redis.{} was called'.format(attr))
+
+
+class TestMetricCatalog(unittest.TestCase):
+    org = Org.query.get(1)
+    api = API(org=1)
+
+    def test_views_are_copies(self):
+        metrics = self.org.content_timeseries_metrics
+        name = metrics.keys()[0]
+        metrics[name]['display_name'] = 'clobbered'
+        metrics.pop(name)
+        fresh = self.org.content_timeseries_metrics
+        assert(name in fresh)
+        assert(fresh[name]['display_name'] != 'clobbered')
+
+    def test_bump(self):
+        v = self.org.metric_catalog_version
+        key = metric_catalog_cache.format_key(self.org.id)
+        metric_catalog_cache.bump(self.org.id)
+        assert(self.org.metric_catalog_version == v + 1)
+        assert(metric_catalog_cache.format_key(self.org.id) != key)
+
+    def test_local_hits_skip_redis(self):
+        self.org.content_timeseries_metrics
+        redis = MetricCatalogCache.redis
+        MetricCatalogCache.redis = NoRedis()
+        try:
+            self.org.content_timeseries_metrics
+            self.org.metric_catalog_version
+        finally:
+            MetricCatalogCache.redis = redis
+
+    def test_bump_drops_local_version(self):
+        v = self.org.metric_catalog_version
+        metric_catalog_cache.redis.incr(
+            metric_catalog_cache.version_key.format(
+                metric_catalog_cache.key_prefix, self.org.id))
+        # another process bumped it without telling us yet.
+        assert(self.org.metric_catalog_version == v)
+        metric_catalog_cache.bump(self.org.id)
+        assert(self.org.metric_catalog_version == v + 2)
+
+    def test_catalog_matches_metrics(self):
+        catalog = build_catalog([m.to_dict() for m in self.org.metrics])
+        for view in catalog:
+            assert(self.org.metric_catalog(view) == catalog[view])
+
+    def test_update_metric_bumps(self):
+        m = self.api.metrics.list()['metrics'][0]
+        v = self.org.metric_catalog_version
+        self.api.metrics.update(m['id'], display_name=m['display_name'])
+        # let the listener pick up the bump.
+        gevent.sleep(0.1)
+        assert(self.org.metric_catalog_version > v)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import gevent
+import gevent.monkey
+gevent.monkey.patch_all()
+
+import unittest
+
+from gevent.pywsgi import WSGIServer
+
+from newslynx.lib import network
+from newslynx.models import PageCache
+from newslynx import settings
+
+PAGE = """<html><head>
+<link rel="canonical" href="http://example.com/canonical" />
+</head><body><p>hello</p></body></html>
+"""
+
+
+class TestPageCache(unittest.TestCase):
+
+    def setUp(self):
+        PageCache.flush().join()
+        self.hits = []
+
+        def app(environ, start_response):
+            path = environ['PATH_INFO']
+            self.hits.append(path)
+            gevent.sleep(0.05)
+            if path == '/short':
+                start_response('302 Found', [('Location', self.url + 'page')])
+                return ['']
+            if path == '/missing':
+                start_response('404 Not Found', [('Content-Type', 'text/html')])
+                return ['<html>gone</html>']
+            start_response('200 OK', [('Content-Type', 'text/html')])
+            return [PAGE]
+
+        self.server = WSGIServer(('127.0.0.1', 0), app, log=None)
+        self.server.start()
+        self.url = 'http://127.0.0.1:{}/'.format(self.server.server_port)
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_fetches_once(self):
+        page = network.get_page(self.url + 'page')
+        assert(page['status_code'] == 200)
+        assert('hello' in page['html'])
+        assert(network.get_page(self.url + 'page') == page)
+        assert(self.hits == ['/page'])
+
+    def test_concurrent_fetches_once(self):
+        jobs = [gevent.spawn(network.get_page, self.url + 'page')
+                for _ in range(5)]
+        gevent.joinall(jobs)
+        assert(all([j.value['status_code'] == 200 for j in jobs]))
+        assert(self.hits == ['/page'])
+
+    def test_redirect_aliases(self):
+        page = network.get_page(self.url + 'short')
+        assert(page['url'] == self.url + 'page')
+        assert(page['history'] == [self.url + 'short'])
+        network.get_page(self.url + 'page')
+        network.get_page(self.url + 'short')
+        assert(self.hits == ['/short', '/page'])
+
+    def test_alias_page(self):
+        page = network.get_page(self.url + 'page')
+        network.alias_page(page, 'http://example.com/canonical')
+        assert(network.get_page('http://example.com/canonical') == page)
+        assert(self.hits == ['/page'])
+
+    def test_errors_are_not_pages(self):
+        assert(network.get_page(self.url + 'missing') is None)
+        cr = PageCache().get(self.url + 'missing')
+        assert(cr.value is None)
+        assert(cr.error == 'fetch_failed')
+        assert(self.hits == ['/missing'])
+
+    def test_flush(self):
+        c = PageCache()
+        network.get_page(self.url + 'page')
+        key = c.format_key(self.url + 'page')
+        assert(key.startswith(settings.PAGE_CACHE_PREFIX))
+        assert(0 < c.redis.ttl(key) <= settings.PAGE_CACHE_TTL)
+        PageCache.flush().join()
+        network.get_page(self.url + 'page')
+        assert(self.hits == ['/page', '/page'])
+
+
+if __name__ == '__main__':
+    unittest.main()
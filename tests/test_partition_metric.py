@@ -0,0 +1,85 @@
+import unittest
+from random import choice
+
+from newslynx.core import db
+from newslynx.models import Org
+from newslynx.tasks import ingest_metric, partition_metric
+
+
+class TestPartitionMetric(unittest.TestCase):
+    org = Org.query.get(1)
+    partition = 'content_metric_timeseries_y2001m01'
+
+    def setUp(self):
+        self.content_item_id = choice(list(self.org.content_item_ids))
+        self.clear()
+
+    def tearDown(self):
+        self.clear()
+
+    def clear(self):
+        db.session.execute(
+            'DROP TABLE IF EXISTS "{}"'.format(self.partition))
+        db.session.commit()
+
+    def record(self, datetime, **metrics):
+        return {
+            'org_id': self.org.id,
+            'content_item_id': self.content_item_id,
+            'datetime': datetime,
+            'metrics': metrics
+        }
+
+    def count(self, table, only=False):
+        return db.session.execute(
+            'SELECT count(*) FROM {} "{}" WHERE content_item_id = {}'
+            .format('ONLY' if only else '', table, self.content_item_id))\
+            .scalar()
+
+    def test_create_partitions(self):
+        names = partition_metric.create_partitions(months_ahead=2)
+        assert(len(names) == 3)
+        # idempotent
+        assert(partition_metric.create_partitions(months_ahead=2) == names)
+        listed = [p['name'] for p in partition_metric.partitions()]
+        assert(all([n in listed for n in names]))
+
+    def test_inserts_are_routed(self):
+        ingest_metric.bulk_content_timeseries([
+            self.record('2001-01-01T05:00:00+00:00', twitter_shares=1),
+            self.record('2001-01-31T23:00:00+00:00', twitter_shares=2)
+        ])
+        db.session.commit()
+        assert(self.count(self.partition) == 2)
+        assert(self.count('content_metric_timeseries', only=True) == 0)
+        assert(self.count('content_metric_timeseries') == 2)
+
+    def test_downsample_org(self):
+        ingest_metric.bulk_content_timeseries([
+            self.record('2001-01-01T05:00:00+00:00', twitter_shares=1),
+            self.record('2001-01-01T06:00:00+00:00', twitter_shares=3),
+            self.record('2001-01-02T06:00:00+00:00', twitter_shares=4)
+        ])
+        db.session.commit()
+        partition_metric.downsample_org(self.org, self.partition)
+        rows = db.session.execute(
+            """SELECT datetime, metrics FROM "{}"
+               WHERE content_item_id = {} ORDER BY datetime
+            """.format(self.partition, self.content_item_id)).fetchall()
+        assert(len(rows) == 2)
+        assert(rows[0][0].hour == 0)
+        assert(int(rows[0][1]['twitter_shares']) == 3)
+
+    def test_downsample_marks_partition(self):
+        ingest_metric.bulk_content_timeseries([
+            self.record('2001-01-01T05:00:00+00:00', twitter_shares=1)
+        ])
+        db.session.commit()
+        done = partition_metric.downsample(older_than=1)
+        assert(self.partition in done)
+        ps = partition_metric.partitions(downsampled=True)
+        assert(self.partition in [p['name'] for p in ps])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import unittest
+from random import sample
+
+from newslynx.core import db
+from newslynx.models import Org
+from newslynx.tasks.util import PlanCache, positional, execute_prepared
+from newslynx.tasks.query_metric import QueryContentMetricTimeseries
+from newslynx.tasks.compare_metric import ContentComparison
+
+
+class TestPositional(unittest.TestCase):
+
+    def test_named_to_positional(self):
+        q, names = positional(
+            "SELECT * FROM t WHERE id = ANY(:ids) AND d >= :after")
+        assert(q == "SELECT * FROM t WHERE id = ANY($1) AND d >= $2")
+        assert(names == ['ids', 'after'])
+
+    def test_repeated_names(self):
+        q, names = positional("SELECT :a, :b, :a")
+        assert(q == "SELECT $1, $2, $1")
+        assert(names == ['a', 'b'])
+
+    def test_ignores_casts(self):
+        q, names = positional("SELECT x::numeric, :a::text")
+        assert(q == "SELECT x::numeric, $1::text")
+        assert(names == ['a'])
+
+
+class TestPlanCache(unittest.TestCase):
+
+    def test_compiles_once(self):
+        calls = []
+
+        def compile_fx():
+            calls.append(1)
+            return 'SELECT 1'
+
+        cache = PlanCache(size=10)
+        assert(cache.get('a', compile_fx) == 'SELECT 1')
+        assert(cache.get('a', compile_fx) == 'SELECT 1')
+        assert(len(calls) == 1)
+
+    def test_bounded(self):
+        cache = PlanCache(size=2)
+        for k in ['a', 'b', 'c']:
+            cache.get(k, lambda: k)
+        assert(len(cache._plans) <= 2)
+
+
+class TestQueryPlans(unittest.TestCase):
+    org = Org.query.get(1)
+
+    def setUp(self):
+        self.ids = sample(list(self.org.content_item_ids), 2)
+
+    def test_ids_are_bound(self):
+        q1 = QueryContentMetricTimeseries(self.org, [self.ids[0]], unit='day')
+        q2 = QueryContentMetricTimeseries(self.org, [self.ids[1]], unit='day')
+        assert(q1.plan_key == q2.plan_key)
+        assert(q1.query == q2.query)
+        assert(str(self.ids[0]) not in q1.query)
+
+    def test_plan_key_changes(self):
+        q1 = QueryContentMetricTimeseries(self.org, self.ids, unit='day')
+        q2 = QueryContentMetricTimeseries(self.org, self.ids, unit='month')
+        q3 = QueryContentMetricTimeseries(
+            self.org, self.ids, unit='day', after='2015-01-01')
+        assert(len(set([q1.plan_key, q2.plan_key, q3.plan_key])) == 3)
+
+    def test_prepared_matches_plain(self):
+        q = QueryContentMetricTimeseries(self.org, self.ids, unit='day')
+        plain = db.session.execute(q.query, q.params).fetchall()
+        prepared = execute_prepared(q.query, q.params).fetchall()
+        assert(plain == prepared)
+        # and again, from the prepared statement.
+        assert(execute_prepared(q.query, q.params).fetchall() == plain)
+
+    def test_comparison_ids_are_bound(self):
+        c1 = ContentComparison(self.org, [self.ids[0]])
+        c2 = ContentComparison(self.org, [self.ids[1]])
+        assert(c1.queries == c2.queries)
+        assert(c1.plan_key == c2.plan_key)
+
+
+if __name__ == '__main__':
+    unittest.main()
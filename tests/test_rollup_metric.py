@@ -0,0 +1,136 @@
+import unittest
+from random import choice
+
+from newslynx.core import db
+from newslynx.models import Org
+from newslynx.tasks import ingest_metric, rollup_metric
+from newslynx.tasks.query_metric import QueryContentMetricTimeseries
+
+
+class TestRollupMetric(unittest.TestCase):
+    org = Org.query.get(1)
+
+    def setUp(self):
+        self.content_item_id = choice(list(self.org.content_item_ids))
+        self.clear()
+
+    def tearDown(self):
+        self.clear()
+
+    def clear(self):
+        for table in ['content_metric_timeseries',
+                      'content_metric_rollup_day',
+                      'content_metric_rollup_month']:
+            db.session.execute(
+                """DELETE FROM {} WHERE content_item_id = {}
+                   AND datetime < '2002-01-01'
+                """.format(table, self.content_item_id))
+        db.session.execute(
+            """DELETE FROM metric_rollup_queue
+               WHERE level = 'content' AND id = {}
+            """.format(self.content_item_id))
+        db.session.commit()
+
+    def record(self, datetime, **metrics):
+        return {
+            'org_id': self.org.id,
+            'content_item_id': self.content_item_id,
+            'datetime': datetime,
+            'metrics': metrics
+        }
+
+    def load(self, *records):
+        ingest_metric.bulk_content_timeseries(list(records))
+        db.session.commit()
+        rollup_metric.timeseries_to_rollups(
+            session=db.session, org_id=self.org.id)
+
+    def rollup(self, unit):
+        return db.session.execute(
+            """SELECT datetime, metrics FROM content_metric_rollup_{}
+               WHERE content_item_id = {} ORDER BY datetime
+            """.format(unit, self.content_item_id)).fetchall()
+
+    def test_writes_are_queued(self):
+        ingest_metric.bulk_content_timeseries([
+            self.record('2001-01-01T05:00:00+00:00', twitter_shares=1)])
+        db.session.commit()
+        n = db.session.execute(
+            """SELECT count(*) FROM metric_rollup_queue
+               WHERE level = 'content' AND id = {}
+            """.format(self.content_item_id)).scalar()
+        assert(n == 1)
+
+    def test_queued_days_are_utc(self):
+        db.session.execute("SET TIMEZONE TO 'America/New_York'")
+        try:
+            ingest_metric.bulk_content_timeseries([
+                self.record('2001-01-01T23:00:00+00:00', twitter_shares=1)])
+            db.session.commit()
+            day = db.session.execute(
+                """SELECT datetime = '2001-01-01T00:00:00+00:00'
+                   FROM metric_rollup_queue
+                   WHERE level = 'content' AND id = {}
+                """.format(self.content_item_id)).scalar()
+        finally:
+            db.session.execute("SET TIMEZONE TO UTC")
+        assert(day)
+
+    def test_cumulative_rollups(self):
+        self.load(
+            self.record('2001-01-01T05:00:00+00:00', twitter_shares=2),
+            self.record('2001-01-01T06:00:00+00:00', twitter_shares=5),
+            self.record('2001-01-02T06:00:00+00:00', twitter_shares=9))
+        days = self.rollup('day')
+        assert(len(days) == 2)
+        assert(int(days[0][1]['twitter_shares']) == 5)
+        assert(int(days[1][1]['twitter_shares']) == 4)
+        months = self.rollup('month')
+        assert(len(months) == 1)
+        assert(int(months[0][1]['twitter_shares']) == 9)
+
+    def test_only_claimed_days_are_refreshed(self):
+        self.load(
+            self.record('2001-01-01T05:00:00+00:00', twitter_shares=2),
+            self.record('2001-01-03T05:00:00+00:00', twitter_shares=6))
+
+        # a later write is counted from the previous hourly value.
+        self.load(
+            self.record('2001-01-05T05:00:00+00:00', twitter_shares=10))
+        days = self.rollup('day')
+        assert([int(d[1]['twitter_shares']) for d in days] == [2, 4, 4])
+
+    def test_backfill(self):
+        self.load(
+            self.record('2001-01-01T05:00:00+00:00', twitter_shares=2))
+        db.session.execute(
+            """DELETE FROM content_metric_rollup_day
+               WHERE content_item_id = {}
+            """.format(self.content_item_id))
+        db.session.commit()
+        assert(rollup_metric.backfill_rollups() >= 1)
+        rollup_metric.timeseries_to_rollups(
+            session=db.session, org_id=self.org.id)
+        assert(len(self.rollup('day')) == 1)
+
+    def test_rollups_match_hourly(self):
+        self.load(
+            self.record('2001-01-01T05:00:00+00:00', twitter_shares=2),
+            self.record('2001-01-01T06:00:00+00:00', twitter_shares=5),
+            self.record('2001-01-02T06:00:00+00:00', twitter_shares=9))
+        kw = dict(unit='day', before='2001-12-31', after='2001-01-01')
+        rolled = QueryContentMetricTimeseries(
+            self.org, [self.content_item_id], **kw)
+        assert(rolled.store_unit == 'day')
+        raw = QueryContentMetricTimeseries(
+            self.org, [self.content_item_id], rollups=False, **kw)
+        assert(list(rolled.execute()) == list(raw.execute()))
+
+    def test_unit_without_rollup(self):
+        q = QueryContentMetricTimeseries(
+            self.org, [self.content_item_id], unit='week')
+        assert(q.store_unit == 'hour')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import gevent
+import gevent.monkey
+gevent.monkey.patch_all()
+
+import unittest
+
+from gevent.pywsgi import WSGIServer
+
+from newslynx.lib import rss
+from newslynx.exc import RequestError
+
+FEED = """<?xml version="1.0" encoding="UTF-8"?>
+<rss version="2.0">
+  <channel>
+    <title>Test Feed</title>
+    <link>http://example.com/</link>
+    <item>
+      <title>An Article</title>
+      <link>http://example.com/2015/01/01/an-article</link>
+      <pubDate>Thu, 01 Jan 2015 05:00:00 GMT</pubDate>
+    </item>
+  </channel>
+</rss>
+"""
+
+
+class TestRSSConditionalGet(unittest.TestCase):
+
+    def setUp(self):
+        self.requests = []
+
+        def app(environ, start_response):
+            self.requests.append(environ.get('HTTP_IF_NONE_MATCH'))
+            if environ['PATH_INFO'] == '/missing':
+                start_response('404 Not Found', [])
+                return ['']
+            if environ.get('HTTP_IF_NONE_MATCH') == '"v1"':
+                start_response('304 Not Modified', [])
+                return ['']
+            start_response('200 OK', [
+                ('Content-Type', 'application/rss+xml'),
+                ('ETag', '"v1"'),
+                ('Last-Modified', 'Thu, 01 Jan 2015 05:00:00 GMT')])
+            return [FEED]
+
+        self.server = WSGIServer(('127.0.0.1', 0), app, log=None)
+        self.server.start()
+        self.url = 'http://127.0.0.1:{}/feed'.format(self.server.server_port)
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_validators(self):
+        f, validators = rss.fetch(self.url)
+        assert(len(f.entries) == 1)
+        assert(validators['etag'] == '"v1"')
+        assert(validators['modified'] == 'Thu, 01 Jan 2015 05:00:00 GMT')
+        assert(validators['size'] == len(FEED))
+
+    def test_not_modified(self):
+        _, validators = rss.fetch(self.url)
+        f, next_validators = rss.fetch(self.url, validators)
+        assert(f is None)
+        assert(next_validators == validators)
+        assert(self.requests == [None, '"v1"'])
+
+    def test_feed_extractor(self):
+        fe = rss.FeedExtractor(self.url, [])
+        assert(len(list(fe.run())) == 1)
+        assert(fe.status == 'changed')
+        assert(fe.validators['etag'] == '"v1"')
+
+        fe = rss.FeedExtractor(self.url, [], validators=fe.validators)
+        assert(list(fe.run()) == [])
+        assert(fe.status == 'unchanged')
+        assert(fe.bytes_saved == len(FEED))
+
+    def test_unchanged_feed_is_not_an_error(self):
+        _, validators = rss.fetch(self.url)
+        fe = rss.FeedExtractor(self.url, [], validators=validators)
+        assert(list(rss.get_entries(self.url, [], feed=fe)) == [])
+
+    def test_http_errors(self):
+        url = self.url.replace('/feed', '/missing')
+        try:
+            rss.fetch(url)
+        except RequestError as e:
+            assert('404' in e.message)
+        else:
+            assert(False)
+
+    def test_validators_are_not_shared(self):
+        # another recipe following the same feed still gets its entries.
+        rss.fetch(self.url)
+        fe = rss.FeedExtractor(self.url, [])
+        assert(len(list(fe.run())) == 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
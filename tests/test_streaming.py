@@ -0,0 +1,76 @@
+import unittest
+from random import choice
+
+from newslynx.core import app
+from newslynx.client import API
+from newslynx.lib.serialize import json_to_obj
+from newslynx.models import Org
+from newslynx.tasks.util import ResultIter, execute_stream, execute_prepared
+from newslynx.tasks.query_metric import QueryContentMetricTimeseries
+from newslynx.views.util import stream_response
+
+
+class TestResultIter(unittest.TestCase):
+    org = Org.query.get(1)
+
+    def setUp(self):
+        self.ids = list(self.org.content_item_ids)
+
+    def test_batches_match(self):
+        q = QueryContentMetricTimeseries(self.org, self.ids, unit='day')
+        plain = list(ResultIter(execute_prepared(q.query, q.params)))
+        streamed = list(ResultIter(
+            execute_stream(q.query, q.params), batch_size=3))
+        assert(plain == streamed)
+
+    def test_execute_stream(self):
+        q = QueryContentMetricTimeseries(self.org, self.ids, unit='day')
+        assert(list(q.execute(stream=True, batch_size=2)) ==
+               list(q.execute()))
+
+
+class TestStreamResponse(unittest.TestCase):
+
+    rows = [{'a': 1}, {'a': 2}, {'a': 3}]
+
+    def body(self, ndjson):
+        with app.test_request_context():
+            resp = stream_response(iter(self.rows), ndjson=ndjson)
+            return resp.mimetype, "".join(resp.response)
+
+    def test_json(self):
+        mimetype, body = self.body(False)
+        assert(mimetype == 'application/json')
+        assert(json_to_obj(body) == self.rows)
+
+    def test_ndjson(self):
+        mimetype, body = self.body(True)
+        assert(mimetype != 'application/json')
+        lines = body.strip().split("\n")
+        assert([json_to_obj(l) for l in lines] == self.rows)
+
+    def test_empty(self):
+        with app.test_request_context():
+            resp = stream_response(iter([]))
+            assert(json_to_obj("".join(resp.response)) == [])
+
+
+class TestStreamingEndpoints(unittest.TestCase):
+    org = Org.query.get(1)
+    api = API(org=1)
+
+    def test_content_timeseries(self):
+        content_item_id = choice(list(self.org.content_item_ids))
+        rows = self.api.content.get_timeseries(content_item_id, unit='day')
+        assert(isinstance(rows, list))
+        q = QueryContentMetricTimeseries(
+            self.org, [content_item_id], unit='day')
+        assert(len(rows) == len(list(q.execute())))
+
+    def test_org_timeseries(self):
+        rows = self.api.orgs.get_timeseries(unit='day')
+        assert(isinstance(rows, list))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+from random import choice
+
+from newslynx.exc import RequestError
+from newslynx.models import Org
+from newslynx.tasks.query_metric import QueryContentMetricTimeseries
+
+
+class TestTimeseriesSelect(unittest.TestCase):
+    org = Org.query.get(1)
+
+    def setUp(self):
+        self.content_item_id = choice(list(self.org.content_item_ids))
+
+    def query(self, **kw):
+        kw.setdefault('unit', 'day')
+        return QueryContentMetricTimeseries(
+            self.org, [self.content_item_id], **kw)
+
+    def columns(self, q):
+        rows = list(q.execute())
+        assert(len(rows))
+        return set(rows[0].keys())
+
+    def test_select(self):
+        q = self.query(select=['twitter_shares'])
+        assert(q.metrics.keys() == ['twitter_shares'])
+        assert('twitter_shares' in q.query)
+        assert('facebook_shares' not in q.query)
+        assert(self.columns(q) ==
+               set(['content_item_id', 'datetime', 'twitter_shares']))
+
+    def test_exclude(self):
+        q = self.query(exclude=['twitter_shares'])
+        assert('twitter_shares' not in q.metrics)
+        assert('facebook_shares' in q.metrics)
+        assert('twitter_shares' not in self.columns(q))
+
+    def test_select_missing(self):
+        try:
+            self.query(select=['not_a_metric'])
+        except RequestError:
+            pass
+        else:
+            assert False
+
+    def test_computed_requirements_are_hidden(self):
+        computed = self.org.computed_content_timeseries_metrics
+        if not len(computed):
+            return
+        name, metric = computed.items()[0]
+        q = self.query(select=[name])
+        required = set(metric.get('formula_requires', []))
+        assert(required.issubset(set(q.metrics.keys())))
+        assert(set(q.hidden_metrics) == required)
+        cols = self.columns(q)
+        assert(name in cols)
+        assert(not len(cols & required))
+
+    def test_plan_key(self):
+        q1 = self.query(select=['twitter_shares'])
+        q2 = self.query(select=['facebook_shares'])
+        assert(q1.plan_key != q2.plan_key)
+
+
+if __name__ == '__main__':
+    unittest.main()
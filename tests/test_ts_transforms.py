@@ -0,0 +1,101 @@
+import unittest
+from random import sample
+
+from newslynx.core import db
+from newslynx.models import Org
+from newslynx.tasks import ingest_metric
+from newslynx.tasks.query_metric import QueryContentMetricTimeseries
+
+
+class TestTimeseriesTransforms(unittest.TestCase):
+    org = Org.query.get(1)
+
+    # running totals per content item per day. as daily counts:
+    #   a: 2, 4, 1
+    #   b: 4, 0, 6
+    #   c: 10, 0, 0
+    totals = [
+        [2, 6, 7],
+        [4, 4, 10],
+        [10, 10, 10]
+    ]
+
+    def setUp(self):
+        self.ids = sample(list(self.org.content_item_ids), 3)
+        self.clear()
+        records = []
+        for i, totals in zip(self.ids, self.totals):
+            for day, total in enumerate(totals, start=1):
+                records.append({
+                    'org_id': self.org.id,
+                    'content_item_id': i,
+                    'datetime': '2001-01-0{}T05:00:00+00:00'.format(day),
+                    'metrics': {'twitter_shares': total}
+                })
+        ingest_metric.bulk_content_timeseries(records)
+        db.session.commit()
+
+    def tearDown(self):
+        self.clear()
+
+    def clear(self):
+        db.session.execute(
+            """DELETE FROM content_metric_timeseries
+               WHERE content_item_id IN ({}) AND datetime < '2002-01-01'
+            """.format(", ".join(map(str, self.ids))))
+        db.session.commit()
+
+    def query(self, transform, **kw):
+        q = QueryContentMetricTimeseries(
+            self.org, self.ids,
+            unit='day',
+            select='twitter_shares',
+            transform=transform,
+            after='2001-01-01',
+            before='2001-01-31',
+            rollups=False,
+            **kw)
+        return list(q.execute())
+
+    def series(self, rows, content_item_id=None):
+        if content_item_id:
+            rows = [r for r in rows if r['content_item_id'] == content_item_id]
+        rows = sorted(rows, key=lambda r: r['datetime'])
+        return [r['twitter_shares'] if r['twitter_shares'] is None
+                else float(r['twitter_shares']) for r in rows]
+
+    def test_cumulative(self):
+        rows = self.query('cumulative')
+        for i, totals in zip(self.ids, self.totals):
+            assert(self.series(rows, i) == totals)
+
+    def test_roll_avg(self):
+        rows = self.query('roll_avg', window=2)
+        assert(self.series(rows, self.ids[0]) == [2, 3, 2.5])
+        assert(self.series(rows, self.ids[1]) == [4, 2, 3])
+
+    def test_per_change(self):
+        rows = self.query('per_change')
+        assert(self.series(rows, self.ids[0]) == [None, 100, -75])
+        # no change from zero.
+        assert(self.series(rows, self.ids[1]) == [None, -100, None])
+
+    def test_avg(self):
+        rows = self.query('avg')
+        assert(len(rows) == 3)
+        assert(all(['content_item_id' not in r for r in rows]))
+        assert(self.series(rows) == [5.33, 1.33, 2.33])
+
+    def test_median(self):
+        rows = self.query('median')
+        assert(len(rows) == 3)
+        assert(all(['content_item_id' not in r for r in rows]))
+        assert(self.series(rows) == [4, 0, 1])
+
+    def test_cross_id_ignores_group_by_id(self):
+        rows = self.query('avg', group_by_id=False)
+        assert(self.series(rows) == [5.33, 1.33, 2.33])
+
+
+if __name__ == '__main__':
+    unittest.main()